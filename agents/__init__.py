@@ -5,11 +5,15 @@ Agent module initialization.
 from .environmental_agent import EnvironmentalAgent
 from .prediction_agent import PredictionAgent
 from .memory_agent import MemoryAgent
+from .model_registry import ModelRegistry
+from .prefetch_scheduler import PrefetchScheduler
 from .coordinator_agent import CoordinatorAgent
 
 __all__ = [
     'EnvironmentalAgent',
     'PredictionAgent',
     'MemoryAgent',
+    'ModelRegistry',
+    'PrefetchScheduler',
     'CoordinatorAgent'
 ] 
\ No newline at end of file
@@ -3,6 +3,7 @@ Coordinator Agent for managing the interaction between all agents.
 """
 
 import pandas as pd
+import numpy as np
 from typing import Dict, Any, List, Optional
 import datetime
 import sys
@@ -13,8 +14,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from agents.environmental_agent import EnvironmentalAgent
 from agents.prediction_agent import PredictionAgent
 from agents.memory_agent import MemoryAgent
+from agents.prefetch_scheduler import PrefetchScheduler
+from agents.model_registry import ModelRegistry
+from agents.similarity_index import condition_features
 from utils.nasa_data import NASAEarthdata
-from config import CROP_TEMP_RANGES
+from utils.power_cache import cell_key
+from config import CROP_TEMP_RANGES, CLIMATE_TRAINING_DAYS, HOURLY_TRAINING_DAYS, MEMORY_HISTORY_LIMIT
 
 class CoordinatorAgent:
     """
@@ -27,11 +32,20 @@ class CoordinatorAgent:
         self.prediction_agent = PredictionAgent()
         self.memory_agent = MemoryAgent()
         self.nasa_data = NASAEarthdata()
+        self.model_registry = ModelRegistry()
+        self.scheduler = PrefetchScheduler(self.nasa_data, registry=self.model_registry)
         
         self.current_data = None
         self.current_crop = None
+        self.current_location = None
+        self.current_site = None
         
-    def fetch_data(self, lat: float, lon: float, radius: float, days: int = 6) -> Dict[str, Any]:
+    def start_prefetch(self) -> None:
+        """Start warming the configured sites in the background."""
+        self.scheduler.start()
+        
+    def fetch_data(self, lat: float, lon: float, radius: float, days: int = 6,
+                   area: bool = False) -> Dict[str, Any]:
         """
         Fetch NASA data for the specified location.
         
@@ -40,22 +54,26 @@ class CoordinatorAgent:
             lon: Longitude
             radius: Radius in km
             days: Number of days of historical data
+            area: Average over the whole radius using the regional endpoint
+                  instead of fetching the single point
             
         Returns:
             Status dictionary
         """
         try:
-            # Fetch temperature data
-            temp_df = self.nasa_data.get_lst_data(lat, lon, radius, days)
-            
-            # Fetch soil moisture data
-            moisture_df = self.nasa_data.get_soil_moisture(lat, lon, radius, days)
+            if area:
+                # Area-weighted values over the circle from one regional request
+                climate_df = self.nasa_data.get_area_climate_data(lat, lon, radius, days)
+            else:
+                # Fetch temperature, soil moisture and weather data in one request
+                climate_df = self.nasa_data.get_climate_data(lat, lon, radius, days)
             
             # Process temperature data
-            temp_df = self.nasa_data.process_temperature_data(temp_df)
+            self.current_data = self.nasa_data.process_temperature_data(climate_df)
             
-            # Merge datasets
-            self.current_data = self.nasa_data.merge_datasets(temp_df, moisture_df)
+            # Area averages are not kept in the per-cell store
+            self.current_location = None if area else (lat, lon)
+            self.current_site = f"{cell_key(lat, lon)}~{radius:g}km" if area else cell_key(lat, lon)
             
             # Update actual temperatures in memory if we have a crop set
             if self.current_crop is not None:
@@ -95,12 +113,14 @@ class CoordinatorAgent:
             # Use a simple string conversion as fallback
             recent_data['date_str'] = recent_data['date'].astype(str)
         
-        # Update actual temperatures in memory
-        for _, row in recent_data.iterrows():
-            try:
-                self.memory_agent.update_actual_temperature(row['date_str'], float(row['temperature']))
-            except Exception as e:
-                print(f"Error updating temperature in memory: {e}")
+        # Update actual temperatures in memory in one write
+        try:
+            self.memory_agent.update_actual_temperatures(
+                dict(zip(recent_data['date_str'], recent_data['temperature'].astype(float))),
+                site=self.current_site
+            )
+        except Exception as e:
+            print(f"Error updating temperatures in memory: {e}")
             
     def set_crop(self, crop: str) -> Dict[str, Any]:
         """
@@ -157,18 +177,63 @@ class CoordinatorAgent:
         
     def train_prediction_model(self) -> Dict[str, Any]:
         """
-        Train the prediction model with current data.
+        Get an up-to-date prediction model for the current site and crop,
+        reusing the registered one when no new days have arrived.
         
         Returns:
-            Training results
+            Training results, with the 'action' the registry took
         """
         if self.current_data is None:
             return {
                 'status': 'error',
                 'message': 'No data available. Please fetch data first.'
             }
+        if self.current_data.empty:
+            return {'status': 'error', 'message': 'Not enough data for training'}
+            
+        temperatures = self.current_data['temperature'].to_numpy(dtype=float)
+        end_date = pd.to_datetime(self.current_data['date'].iloc[-1]).date()
+            
+        # Train on the longer local history of this location when we have one
+        if self.current_location is not None and self.nasa_data.store is not None:
+            store_end = datetime.date.today()
+            start_date = store_end - datetime.timedelta(days=CLIMATE_TRAINING_DAYS)
+            stored = self.nasa_data.store.read(
+                cell_key(*self.current_location), 'temperature', start_date, store_end
+            )
+            if np.count_nonzero(~np.isnan(stored)) > len(temperatures):
+                temperatures, end_date = stored, store_end
+            
+        # Reuse, fine-tune or retrain the registered model of this site and crop
+        agent, result = self.model_registry.get_or_train(
+            self.current_site, self.current_crop, temperatures, end_date
+        )
+        if agent is not None:
+            self.prediction_agent = agent
+        return result
+        
+    def train_hourly_model(self, days: int = HOURLY_TRAINING_DAYS) -> Dict[str, Any]:
+        """
+        Train the next-hour model by streaming hourly data for the current location.
+        
+        Args:
+            days: Number of days of hourly history to stream
+            
+        Returns:
+            Training results
+        """
+        if self.current_location is None:
+            return {
+                'status': 'error',
+                'message': 'No point location available. Please fetch point data first.'
+            }
             
-        return self.prediction_agent.train(self.current_data)
+        lat, lon = self.current_location
+        end_date = datetime.date.today()
+        start_date = end_date - datetime.timedelta(days=days)
+        return self.prediction_agent.train_hourly_stream(
+            lambda: self.nasa_data.iter_hourly_data(lat, lon, start_date, end_date)
+        )
         
     def get_recommendations(self) -> Dict[str, Any]:
         """
@@ -196,21 +261,36 @@ class CoordinatorAgent:
             self.current_crop, temp_metrics, soil_moisture
         )
         
-        # Try to predict next day temperature
-        prediction_result = self.prediction_agent.predict_next_day(self.current_data)
+        # Forecast the coming days in one pass; the first day is the next-day prediction
+        prediction_result = self.prediction_agent.predict_forecast(self.current_data)
         
         if prediction_result['status'] == 'success':
-            predicted_temp = prediction_result['temperature']
+            predicted_temp = prediction_result['temperatures'][0]
             
             # Store prediction in memory
             today = datetime.datetime.now().strftime('%Y-%m-%d')
             self.memory_agent.store_prediction(
-                today, self.current_crop, predicted_temp
+                today, self.current_crop, predicted_temp, site=self.current_site
             )
             
+            # Store the forecast from the last observed day so actuals can be matched per horizon day
+            if 'dates' in prediction_result:
+                last_observed = datetime.date.fromisoformat(prediction_result['dates'][0]) - datetime.timedelta(days=1)
+                self.memory_agent.store_forecast(
+                    last_observed.isoformat(), self.current_crop,
+                    prediction_result['temperatures'], site=self.current_site
+                )
+            
             # Store recommendation in memory
             self.memory_agent.store_recommendation(
-                today, self.current_crop, recommendations
+                today, self.current_crop, recommendations, site=self.current_site
+            )
+            
+            # Index today's conditions so similar days can be found later
+            self.memory_agent.store_conditions(
+                today, self.current_crop,
+                condition_features(self.current_data, self.current_crop, recommendations),
+                recommendations, site=self.current_site
             )
             
             # Get crop suitability for current crop
@@ -221,6 +301,10 @@ class CoordinatorAgent:
                 'crop': self.current_crop,
                 'current_temperature': temp_metrics['mean'],
                 'predicted_temperature': predicted_temp,
+                'forecast': pd.DataFrame({
+                    'date': prediction_result.get('dates'),
+                    'temperature': prediction_result['temperatures']
+                }),
                 'ideal_range': crop_suitability['ideal_range'],
                 'feasibility': crop_suitability['status'],
                 'actuator_recommendations': recommendations,
@@ -237,20 +321,55 @@ class CoordinatorAgent:
                 'soil_moisture': soil_moisture
             }
             
-    def get_historical_performance(self) -> Dict[str, Any]:
+    def find_similar_conditions(self, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Find past days whose conditions resembled the current ones for the current crop.
+        
+        Args:
+            k: Number of days to return
+            
+        Returns:
+            List of past days with their recommendations and prediction outcome
+        """
+        if self.current_data is None or self.current_crop is None:
+            return []
+            
+        soil_moisture = None
+        if 'soil_moisture' in self.current_data.columns:
+            soil_moisture = self.current_data['soil_moisture'].iloc[-1]
+            
+        recommendations = self.env_agent.get_recommendations(
+            self.current_crop, self.env_agent.analyze_temperature(self.current_data), soil_moisture
+        )
+        features = condition_features(self.current_data, self.current_crop, recommendations)
+        today = datetime.datetime.now().strftime('%Y-%m-%d')
+        return self.memory_agent.find_similar_days(
+            features, k, crop=self.current_crop,
+            exclude=(today, self.current_crop, self.current_site or '')
+        )
+        
+    def get_historical_performance(self, limit: int = MEMORY_HISTORY_LIMIT) -> Dict[str, Any]:
         """
         Get historical performance data.
         
+        Args:
+            limit: Number of latest predictions, and of history entries per crop, to include
+            
         Returns:
-            Historical performance data
+            Historical performance data; 'prediction_history' and 'crop_history'
+            are DataFrames and 'horizon_accuracy' maps each forecast day to its metrics
         """
-        crop_history = self.memory_agent.get_crop_history()
+        crop_history = self.memory_agent.query_crop_history(limit=limit)
         prediction_accuracy = self.memory_agent.get_prediction_accuracy()
+        prediction_history = self.memory_agent.query_predictions(limit=limit)
         recent_predictions = self.memory_agent.get_recent_predictions()
+        horizon_accuracy = self.memory_agent.get_horizon_accuracy()
         
         return {
             'status': 'success',
             'crop_history': crop_history,
             'prediction_accuracy': prediction_accuracy,
+            'horizon_accuracy': horizon_accuracy,
+            'prediction_history': prediction_history,
             'recent_predictions': recent_predictions
         } 
\ No newline at end of file
@@ -4,202 +4,975 @@ Memory Agent for maintaining history of predictions and decisions.
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+import atexit
+import bisect
 import json
 import os
-from datetime import datetime
+import sys
+import threading
+from datetime import date as date_type, datetime, timedelta
+from itertools import islice
+
+# Add the project root to the path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.memory_store import MemoryStore, MemoryJournal, PREDICTION_UPSERT, FORECAST_UPSERT
+from agents.similarity_index import SimilarityIndex
+from utils.file_lock import FileLock
+from config import (MEMORY_DB_FILE, MEMORY_LEGACY_FILE, MEMORY_FLUSH_INTERVAL_SECONDS,
+                    MEMORY_FLUSH_MAX_PENDING, MEMORY_RETENTION_DAYS, MEMORY_WEEKLY_ROLLUP_DAYS,
+                    MEMORY_COMPACT_INTERVAL_HOURS, MEMORY_SIMILARITY_BACKEND)
+
+class ErrorStats:
+    """Running prediction error totals from which MAE and RMSE follow in O(1)."""
+
+    __slots__ = ('count', 'sum_error', 'sum_squared_error')
+
+    def __init__(self):
+        self.count = 0
+        self.sum_error = 0.0
+        self.sum_squared_error = 0.0
+
+    def add(self, error: float, weight: int = 1) -> None:
+        """
+        Add (weight 1) or remove (weight -1) one prediction error.
+
+        Args:
+            error: Predicted minus actual temperature
+            weight: 1 to add the error, -1 to remove it
+        """
+        self.count += weight
+        if self.count == 0:
+            # Reset instead of accumulating floating point drift
+            self.sum_error = 0.0
+            self.sum_squared_error = 0.0
+            return
+        self.sum_error += weight * abs(error)
+        self.sum_squared_error += weight * error * error
+
+    def merge(self, other: 'ErrorStats') -> None:
+        """Add the totals of another ErrorStats."""
+        self.count += other.count
+        self.sum_error += other.sum_error
+        self.sum_squared_error += other.sum_squared_error
+
+    def metrics(self) -> Dict[str, float]:
+        """Get MAE, RMSE and the number of predictions."""
+        if self.count <= 0:
+            return {'mae': None, 'rmse': None, 'count': 0}
+        return {
+            'mae': self.sum_error / self.count,
+            'rmse': np.sqrt(max(self.sum_squared_error, 0.0) / self.count),
+            'count': self.count
+        }
 
 class MemoryAgent:
     """
     Agent for maintaining history of predictions and decisions.
+
+    Writes update the in-memory state and are appended to a journal right
+    away; a background thread flushes them to the database in batches.
+    Journaled writes that never reached the database are replayed on startup.
+    The same thread periodically compacts old recommendations and crop
+    history into daily and weekly rollups.
+
+    Several processes can share one memory database. Each keeps its own
+    journal, reloads its in-memory views from a consistent snapshot when
+    another process commits, and recovers the journals of processes that
+    exited without flushing.
     """
-    
-    def __init__(self, memory_file: str = 'data/memory.json'):
+
+    def __init__(self, memory_file: str = MEMORY_DB_FILE,
+                 legacy_file: Optional[str] = MEMORY_LEGACY_FILE,
+                 flush_interval: float = MEMORY_FLUSH_INTERVAL_SECONDS,
+                 flush_max_pending: int = MEMORY_FLUSH_MAX_PENDING,
+                 retention_days: int = MEMORY_RETENTION_DAYS,
+                 weekly_rollup_days: int = MEMORY_WEEKLY_ROLLUP_DAYS,
+                 compact_interval_hours: float = MEMORY_COMPACT_INTERVAL_HOURS,
+                 similarity_backend: str = MEMORY_SIMILARITY_BACKEND):
         """
         Initialize the memory agent.
-        
+
         Args:
-            memory_file: Path to the memory storage file
+            memory_file: Path to the memory database (a .json path is treated as
+                         a legacy file and imported into a .db next to it)
+            legacy_file: Legacy JSON memory file imported on first use
+            flush_interval: Seconds between background flushes (0 flushes every
+                            write immediately)
+            flush_max_pending: Number of pending writes that triggers an early flush
+            retention_days: Days of recommendations and crop history kept in full detail
+            weekly_rollup_days: Age in days after which daily rollups become weekly
+            compact_interval_hours: Hours between background compactions (0 disables them)
+            similarity_backend: Similar-conditions index backend ('chromadb', 'numpy' or 'auto')
         """
+        if memory_file.endswith('.json'):
+            legacy_file = memory_file
+            memory_file = os.path.splitext(memory_file)[0] + '.db'
+
         self.memory_file = memory_file
-        self.memory = self._load_memory()
-        
-    def _load_memory(self) -> Dict[str, Any]:
+        self.flush_interval = flush_interval
+        self.flush_max_pending = flush_max_pending
+        self.retention_days = retention_days
+        self.weekly_rollup_days = weekly_rollup_days
+        self.compact_interval = timedelta(hours=compact_interval_hours)
+        self.similarity_backend = similarity_backend
+        self.store = MemoryStore(memory_file)
+
+        if legacy_file and self.store.migrate_json(legacy_file):
+            print(f"Imported {legacy_file} into {memory_file}")
+
+        # Lock order: _flush_lock before _lock
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        journal_prefix = os.path.splitext(memory_file)[0] + '.journal'
+        self._recover_journals(journal_prefix)
+        self.journal = MemoryJournal(journal_prefix)
+        self._seq = 0
+
+        self._reset_index()
+        self._load_index()
+        self.store.changed()
+
+        compacted_at = self.store.get_meta('compacted_at')
+        self._compacted_at = datetime.fromisoformat(compacted_at) if compacted_at else datetime.min
+
+        self._closed = threading.Event()
+        self._flush_requested = threading.Event()
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name='memory-flush', daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    def _recover_journals(self, prefix: str) -> None:
+        """
+        Apply the journals of processes that exited before flushing them.
+
+        Args:
+            prefix: Path prefix of the journal files
+        """
+        for journal in MemoryJournal.orphans(prefix):
+            last_seq = int(self.store.get_meta(journal.seq_key) or 0)
+            entries = [entry for entry in journal.read() if entry['seq'] > last_seq]
+
+            with self.store.transaction() as cur:
+                for entry in entries:
+                    self._apply(cur, entry)
+                self.store.delete_meta(journal.seq_key, cur)
+                if entries:
+                    self.store.touch(cur)
+            if entries:
+                print(f"Replayed {len(entries)} journaled memory writes")
+
+            journal.discard(journal.rotate())
+            journal.release()
+
+    def _reset_index(self) -> None:
+        """Clear the in-memory views."""
+        # One prediction per (date, crop, site), in the order they were first stored
+        self._predictions: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._keys_by_date: Dict[str, List[Tuple[str, str, str]]] = {}
+        self._dates: List[str] = []  # Sorted distinct prediction dates
+        # Multi-day forecasts per (issue date, crop, site, horizon day), found by target date
+        self._forecasts: Dict[Tuple[str, str, str, int], Dict[str, Any]] = {}
+        self._forecast_keys_by_target: Dict[str, List[Tuple[str, str, str, int]]] = {}
+        # Error totals overall, per crop, month and site, and per (crop, month, site),
+        # plus forecast error totals per horizon day and per (horizon day, crop)
+        self._stats: Dict[Tuple, ErrorStats] = {}
+        self._crop_history: Dict[str, List[Dict[str, Any]]] = {}
+        # Conditions and decisions per (date, crop, site), searchable by similarity
+        self._conditions: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        if getattr(self, '_similarity', None) is not None:
+            self._similarity.close()
+        self._similarity = SimilarityIndex(backend=self.similarity_backend)
+
+    def _load_index(self) -> None:
+        """Load predictions and crop history from one snapshot of the store."""
+        with self.store.snapshot():
+            rows = self.store.query(
+                "SELECT date, crop, site, predicted_temp, actual_temp, recorded_at, updated_at "
+                "FROM predictions ORDER BY id"
+            )
+            self._crop_history = self._load_crop_history()
+            conditions = self.store.query(
+                "SELECT date, crop, site, features, recommendations FROM conditions ORDER BY date"
+            )
+            forecasts = self.store.query(
+                "SELECT issued_date, crop, site, horizon, target_date, predicted_temp, actual_temp, "
+                "recorded_at, updated_at FROM forecasts ORDER BY issued_date, horizon"
+            )
+
+        for row in rows:
+            self._index_prediction(dict(row))
+
+        for row in forecasts:
+            self._index_forecast(dict(row))
+
+        for row in conditions:
+            self._index_conditions((row['date'], row['crop'], row['site']),
+                                   json.loads(row['features']), json.loads(row['recommendations']))
+
+    def _reload(self) -> None:
+        """
+        Rebuild the in-memory views from the store plus this process's
+        unflushed writes. Must be called with both locks held.
         """
-        Load memory from file or initialize if not exists.
-        
+        self._reset_index()
+        self._load_index()
+        for entry in self._pending:
+            self._apply_in_memory(entry)
+
+    def _refresh(self) -> None:
+        """Reload the in-memory views if another process has committed changes."""
+        if self.store.changed():
+            with self._flush_lock:
+                with self._lock:
+                    self._reload()
+
+    def _load_crop_history(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Load crop performance history from the store, rolled-up periods first.
+
         Returns:
-            Memory dictionary
+            Dictionary of crop history; rolled-up entries carry the mean score
+            with the 'period' and 'count' they cover
+        """
+        history = {}
+        for row in self.store.query(
+            "SELECT period, start_date, crop, count, score_sum FROM crop_history_rollups "
+            "ORDER BY start_date, period DESC"
+        ):
+            history.setdefault(row['crop'], []).append({
+                'date': row['start_date'],
+                'score': row['score_sum'] / row['count'],
+                'period': row['period'],
+                'count': row['count']
+            })
+
+        for row in self.store.query("SELECT crop, date, score FROM crop_history ORDER BY id"):
+            history.setdefault(row['crop'], []).append({'date': row['date'], 'score': row['score']})
+        return history
+
+    def _index_prediction(self, prediction: Dict[str, Any]) -> None:
+        """Add or replace a prediction in the in-memory index."""
+        key = (prediction['date'], prediction['crop'], prediction['site'])
+        existing = self._predictions.get(key)
+        if existing is None:
+            if prediction['date'] not in self._keys_by_date:
+                bisect.insort(self._dates, prediction['date'])
+            self._keys_by_date.setdefault(prediction['date'], []).append(key)
+        else:
+            self._account(existing, -1)
+        self._predictions[key] = prediction
+        self._account(prediction, 1)
+
+    def _index_forecast(self, forecast: Dict[str, Any]) -> None:
+        """Add or replace one horizon day of a forecast in the in-memory index."""
+        key = (forecast['issued_date'], forecast['crop'], forecast['site'], forecast['horizon'])
+        existing = self._forecasts.get(key)
+        if existing is None:
+            self._forecast_keys_by_target.setdefault(forecast['target_date'], []).append(key)
+        else:
+            self._account_forecast(existing, -1)
+        self._forecasts[key] = forecast
+        self._account_forecast(forecast, 1)
+
+    def _account_forecast(self, forecast: Dict[str, Any], weight: int) -> None:
+        """
+        Add a forecast day's error to (or remove it from) the per-horizon totals.
+
+        Args:
+            forecast: Forecast record for one horizon day
+            weight: 1 to add, -1 to remove
         """
-        if os.path.exists(self.memory_file):
+        if forecast['actual_temp'] is None:
+            return
+
+        error = forecast['predicted_temp'] - forecast['actual_temp']
+        horizon = forecast['horizon']
+        for key in (('horizon', horizon), ('horizon_crop', horizon, forecast['crop'])):
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = ErrorStats()
+            stats.add(error, weight)
+
+    def _index_conditions(self, key: Tuple[str, str, str], features: List[float],
+                          recommendations: Dict[str, Any]) -> None:
+        """Add or replace a day's conditions in the similarity index."""
+        # Vectors built with a different feature layout cannot be compared
+        if len(features) != self._similarity.dimension:
+            return
+        self._conditions[key] = {'features': features, 'recommendations': recommendations}
+        self._similarity.add(key, features)
+
+    def _account(self, prediction: Dict[str, Any], weight: int) -> None:
+        """
+        Add a prediction's error to (or remove it from) the running totals.
+
+        Args:
+            prediction: Prediction record
+            weight: 1 to add, -1 to remove
+        """
+        if prediction['actual_temp'] is None or prediction['predicted_temp'] is None:
+            return
+
+        error = prediction['predicted_temp'] - prediction['actual_temp']
+        crop, month, site = prediction['crop'], prediction['date'][:7], prediction['site']
+        for key in (('all',), ('crop', crop), ('month', month), ('site', site), ('cell', crop, month, site)):
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = ErrorStats()
+            stats.add(error, weight)
+
+    def _record(self, entry: Dict[str, Any]) -> None:
+        """
+        Journal a write and queue it for the next flush. Must be called with
+        the lock held.
+
+        Args:
+            entry: Journal entry with an 'op' and its arguments
+        """
+        self._seq += 1
+        entry['seq'] = self._seq
+        self.journal.append(entry)
+        self._pending.append(entry)
+
+        if len(self._pending) >= self.flush_max_pending:
+            self._flush_requested.set()
+
+    def _write_through(self) -> None:
+        """Flush right away when background flushing is disabled. Must be called without the lock."""
+        if self.flush_interval <= 0:
+            self.flush()
+
+    def _apply_in_memory(self, entry: Dict[str, Any]) -> None:
+        """
+        Apply a journal entry to the in-memory views. Must be called with the
+        lock held.
+
+        Args:
+            entry: Journal entry
+        """
+        op = entry['op']
+        if op == 'prediction':
+            self._index_prediction({'site': '', **entry['prediction']})
+        elif op == 'actual_temps':
+            for date, crop, site, actual_temp in entry['updates']:
+                prediction = self._predictions.get((date, crop, site))
+                if prediction is None:
+                    continue
+                self._account(prediction, -1)
+                prediction['actual_temp'] = actual_temp
+                prediction['updated_at'] = entry['updated_at']
+                self._account(prediction, 1)
+            for issued_date, crop, site, horizon, actual_temp in entry.get('forecast_updates', []):
+                forecast = self._forecasts.get((issued_date, crop, site, horizon))
+                if forecast is None:
+                    continue
+                self._account_forecast(forecast, -1)
+                forecast['actual_temp'] = actual_temp
+                forecast['updated_at'] = entry['updated_at']
+                self._account_forecast(forecast, 1)
+        elif op == 'forecast':
+            for forecast in entry['forecasts']:
+                self._index_forecast(dict(forecast))
+        elif op == 'crop_performance':
+            self._crop_history.setdefault(entry['crop'], []).append({'date': entry['date'], 'score': entry['score']})
+        elif op == 'conditions':
+            self._index_conditions((entry['date'], entry['crop'], entry['site']),
+                                   entry['features'], entry['recommendations'])
+
+    @staticmethod
+    def _apply(cur, entry: Dict[str, Any]) -> None:
+        """
+        Apply a journal entry to the database.
+
+        Args:
+            cur: Cursor of an open transaction
+            entry: Journal entry
+        """
+        op = entry['op']
+        if op == 'prediction':
+            p = entry['prediction']
+            cur.execute(PREDICTION_UPSERT, (p['date'], p['crop'], p.get('site', ''), p['predicted_temp'],
+                                            p['actual_temp'], p['recorded_at'], p['updated_at']))
+        elif op == 'actual_temps':
+            # Entries journaled before sites were tracked have no site
+            updates = [update if len(update) == 4 else (*update[:2], '', update[2])
+                       for update in entry['updates']]
+            cur.executemany(
+                "UPDATE predictions SET actual_temp = ?, updated_at = ? WHERE date = ? AND crop = ? AND site = ?",
+                [(actual_temp, entry['updated_at'], date, crop, site)
+                 for date, crop, site, actual_temp in updates]
+            )
+            cur.executemany(
+                "UPDATE forecasts SET actual_temp = ?, updated_at = ? "
+                "WHERE issued_date = ? AND crop = ? AND site = ? AND horizon = ?",
+                [(actual_temp, entry['updated_at'], issued_date, crop, site, horizon)
+                 for issued_date, crop, site, horizon, actual_temp in entry.get('forecast_updates', [])]
+            )
+        elif op == 'forecast':
+            cur.executemany(FORECAST_UPSERT, [
+                (f['issued_date'], f['crop'], f['site'], f['horizon'], f['target_date'], f['predicted_temp'],
+                 f['actual_temp'], f['recorded_at'], f['updated_at'])
+                for f in entry['forecasts']
+            ])
+        elif op == 'recommendation':
+            cur.execute(
+                "INSERT INTO recommendations (date, crop, site, recommendations, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                (entry['date'], entry['crop'], entry.get('site', ''),
+                 json.dumps(entry['recommendations']), entry['recorded_at'])
+            )
+        elif op == 'crop_performance':
+            cur.execute(
+                "INSERT INTO crop_history (crop, date, score) VALUES (?, ?, ?)",
+                (entry['crop'], entry['date'], entry['score'])
+            )
+        elif op == 'conditions':
+            cur.execute(
+                "INSERT OR REPLACE INTO conditions (date, crop, site, features, recommendations, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (entry['date'], entry['crop'], entry['site'], json.dumps(entry['features']),
+                 json.dumps(entry['recommendations']), entry['recorded_at'])
+            )
+        else:
+            raise ValueError(f"Unknown journal operation: {op}")
+
+    def flush(self) -> int:
+        """
+        Write all pending changes to the database.
+
+        Returns:
+            Number of journal entries written
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        """Write all pending changes to the database. Must be called with the flush lock held."""
+        with self._lock:
+            entries, self._pending = self._pending, []
+            if not entries:
+                return 0
+            keep_from = self.journal.rotate()
+
+        try:
+            with self.store.transaction() as cur:
+                for entry in entries:
+                    self._apply(cur, entry)
+                self.store.set_meta(self.journal.seq_key, entries[-1]['seq'], cur)
+                self.store.touch(cur)
+        except Exception:
+            # Keep the entries (and their journal segments) for the next attempt
+            with self._lock:
+                self._pending = entries + self._pending
+            raise
+
+        self.journal.discard(keep_from)
+        return len(entries)
+
+    def _flush_loop(self) -> None:
+        """Flush pending changes periodically until closed."""
+        while not self._closed.is_set():
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
             try:
-                with open(self.memory_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                pass
-                
-        # Initialize empty memory
-        return {
-            'predictions': [],
-            'recommendations': [],
-            'crop_history': {},
-            'metadata': {
-                'created_at': datetime.now().isoformat(),
-                'last_updated': datetime.now().isoformat()
-            }
-        }
-        
-    def _save_memory(self) -> None:
-        """Save memory to file."""
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(self.memory_file), exist_ok=True)
-        
-        # Update last_updated timestamp
-        self.memory['metadata']['last_updated'] = datetime.now().isoformat()
-        
-        with open(self.memory_file, 'w') as f:
-            json.dump(self.memory, f, indent=2)
-            
-    def store_prediction(self, date: str, crop: str, 
-                        predicted_temp: float, actual_temp: float = None) -> None:
-        """
-        Store a temperature prediction.
-        
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing memory journal: {e}")
+
+            if self.compact_interval and datetime.now() - self._compacted_at >= self.compact_interval:
+                try:
+                    self.compact()
+                except Exception as e:
+                    print(f"Error compacting memory: {e}")
+                self._compacted_at = datetime.now()
+
+    def compact(self, vacuum: bool = False) -> Dict[str, int]:
+        """
+        Drop superseded recommendations and roll up old recommendations and
+        crop history, keeping full detail for the retention period.
+
+        Args:
+            vacuum: Reclaim the freed space in the database file afterwards
+
+        Returns:
+            Number of rows dropped or rolled up per kind (empty if another
+            process is compacting)
+        """
+        # Only one process compacts at a time; the others skip
+        maintenance_lock = FileLock(self.memory_file + '.compact.lock')
+        if not maintenance_lock.acquire(blocking=False):
+            return {}
+
+        try:
+            with self._flush_lock:
+                self._flush()
+                summary = self.store.compact(self.retention_days, self.weekly_rollup_days, vacuum=vacuum)
+                self._compacted_at = datetime.now()
+
+                # Reload the rolled-up history, keeping entries written since the flush
+                with self._lock:
+                    self._reload()
+                    self.store.changed()
+        finally:
+            maintenance_lock.release()
+
+        return summary
+
+    def close(self) -> None:
+        """Stop the background flusher and write out all pending changes."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flush_requested.set()
+        if self._flusher is not None:
+            self._flusher.join()
+
+        self.flush()
+        with self._lock:
+            if not self._pending:
+                with self.store.transaction() as cur:
+                    self.store.delete_meta(self.journal.seq_key, cur)
+            self.journal.discard(self.journal.rotate())
+            self.journal.release()
+
+    def store_prediction(self, date: str, crop: str,
+                        predicted_temp: float, actual_temp: float = None,
+                        site: Optional[str] = None) -> None:
+        """
+        Store a temperature prediction, replacing any earlier prediction for
+        the same date, crop and site.
+
         Args:
             date: Date of prediction
             crop: Crop being grown
             predicted_temp: Predicted temperature
             actual_temp: Actual temperature (if known)
+            site: Site the prediction is for (e.g. its grid cell key)
         """
-        # Check if we already have a prediction for this date
-        existing_index = None
-        for i, pred in enumerate(self.memory['predictions']):
-            if pred['date'] == date:
-                existing_index = i
-                break
-        
-        if existing_index is not None:
-            # Update existing prediction with actual temperature
-            self.memory['predictions'][existing_index]['actual_temp'] = actual_temp
-            self.memory['predictions'][existing_index]['updated_at'] = datetime.now().isoformat()
-        else:
-            # Create new prediction
+        predicted_temp = float(predicted_temp)
+        actual_temp = None if actual_temp is None else float(actual_temp)
+        site = site or ''
+        self._refresh()
+
+        with self._lock:
+            existing = self._predictions.get((date, crop, site))
+            if existing is not None:
+                if actual_temp is None:
+                    actual_temp = existing['actual_temp']
+                # Storing the same prediction again is a no-op
+                if existing['predicted_temp'] == predicted_temp and existing['actual_temp'] == actual_temp:
+                    return
+
+            now = datetime.now().isoformat()
             prediction = {
                 'date': date,
                 'crop': crop,
+                'site': site,
                 'predicted_temp': predicted_temp,
                 'actual_temp': actual_temp,
-                'recorded_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
+                'recorded_at': existing['recorded_at'] if existing is not None else now,
+                'updated_at': now
             }
-            
-            self.memory['predictions'].append(prediction)
-        
-        self._save_memory()
-        
-    def store_recommendation(self, date: str, crop: str, 
-                           recommendations: Dict[str, Any]) -> None:
+
+            entry = {'op': 'prediction', 'prediction': prediction}
+            self._apply_in_memory(entry)
+            self._record(entry)
+
+        self._write_through()
+
+    def store_forecast(self, date: str, crop: str, temperatures: List[float],
+                       site: Optional[str] = None) -> None:
+        """
+        Store a multi-day temperature forecast, replacing any earlier forecast
+        made from the same day for the same crop and site. Each horizon day is
+        scored once the actual temperature of its target date arrives.
+
+        Args:
+            date: Last observed day the forecast starts from ('YYYY-MM-DD')
+            crop: Crop being grown
+            temperatures: Forecast temperatures, the day after date first
+            site: Site the forecast is for (e.g. its grid cell key)
+        """
+        site = site or ''
+        issued = datetime.strptime(date, '%Y-%m-%d').date()
+        self._refresh()
+
+        with self._lock:
+            now = datetime.now().isoformat()
+            forecasts = []
+            for horizon, predicted_temp in enumerate(temperatures, start=1):
+                existing = self._forecasts.get((date, crop, site, horizon))
+                forecasts.append({
+                    'issued_date': date,
+                    'crop': crop,
+                    'site': site,
+                    'horizon': horizon,
+                    'target_date': (issued + timedelta(days=horizon)).isoformat(),
+                    'predicted_temp': float(predicted_temp),
+                    'actual_temp': existing['actual_temp'] if existing is not None else None,
+                    'recorded_at': existing['recorded_at'] if existing is not None else now,
+                    'updated_at': now
+                })
+
+            entry = {'op': 'forecast', 'forecasts': forecasts}
+            self._apply_in_memory(entry)
+            self._record(entry)
+
+        self._write_through()
+
+    def store_recommendation(self, date: str, crop: str,
+                           recommendations: Dict[str, Any],
+                           site: Optional[str] = None) -> None:
         """
         Store actuator recommendations.
-        
+
         Args:
             date: Date of recommendation
             crop: Crop being grown
             recommendations: Dictionary of recommendations
+            site: Site the recommendations are for (e.g. its grid cell key)
         """
-        recommendation = {
-            'date': date,
-            'crop': crop,
-            'recommendations': recommendations,
-            'recorded_at': datetime.now().isoformat()
-        }
-        
-        self.memory['recommendations'].append(recommendation)
-        self._save_memory()
-        
+        with self._lock:
+            self._record({
+                'op': 'recommendation',
+                'date': date,
+                'crop': crop,
+                'site': site or '',
+                'recommendations': recommendations,
+                'recorded_at': datetime.now().isoformat()
+            })
+
+        self._write_through()
+
     def update_crop_performance(self, crop: str, performance_score: float) -> None:
         """
         Update crop performance history.
-        
+
         Args:
             crop: Crop name
             performance_score: Performance score (0-100)
         """
-        if crop not in self.memory['crop_history']:
-            self.memory['crop_history'][crop] = []
-            
         entry = {
+            'op': 'crop_performance',
+            'crop': crop,
             'date': datetime.now().isoformat(),
-            'score': performance_score
+            'score': float(performance_score)
         }
-        
-        self.memory['crop_history'][crop].append(entry)
-        self._save_memory()
-        
-    def get_prediction_accuracy(self) -> Dict[str, float]:
-        """
-        Calculate prediction accuracy metrics.
-        
-        Returns:
-            Dictionary of accuracy metrics
-        """
-        predictions = [p for p in self.memory['predictions'] 
-                     if p['actual_temp'] is not None]
-                     
-        if not predictions:
-            return {'mae': None, 'rmse': None}
-            
-        errors = [abs(p['predicted_temp'] - p['actual_temp']) for p in predictions]
-        mae = sum(errors) / len(errors)
-        rmse = np.sqrt(sum(e**2 for e in errors) / len(errors))
-        
-        return {
-            'mae': mae,
-            'rmse': rmse
+
+        with self._lock:
+            self._apply_in_memory(entry)
+            self._record(entry)
+
+        self._write_through()
+
+    def store_conditions(self, date: str, crop: str, features: List[float],
+                         recommendations: Dict[str, Any], site: Optional[str] = None) -> None:
+        """
+        Store a day's condition vector and decision for similarity search.
+
+        Args:
+            date: Date of the decision
+            crop: Crop being grown
+            features: Feature vector (see agents.similarity_index.condition_features)
+            recommendations: Actuator recommendations made for the day
+            site: Site the decision is for (e.g. its grid cell key)
+        """
+        entry = {
+            'op': 'conditions',
+            'date': date,
+            'crop': crop,
+            'site': site or '',
+            'features': [float(value) for value in features],
+            'recommendations': recommendations,
+            'recorded_at': datetime.now().isoformat()
         }
-        
+
+        with self._lock:
+            self._apply_in_memory(entry)
+            self._record(entry)
+
+        self._write_through()
+
+    def find_similar_days(self, features: List[float], k: int = 5, crop: str = None,
+                          exclude: Optional[Tuple[str, str, str]] = None) -> List[Dict[str, Any]]:
+        """
+        Find past days whose conditions resembled the given ones.
+
+        Args:
+            features: Feature vector of the conditions to match
+            k: Number of days to return
+            crop: Only days for this crop
+            exclude: (date, crop, site) key to leave out, e.g. today's
+
+        Returns:
+            List of past days, closest first, with the distance, the
+            recommendations made and the prediction outcome for that day
+        """
+        self._refresh()
+        with self._lock:
+            matches = []
+            for key, distance in self._similarity.query(features, k, crop, exclude):
+                prediction = self._predictions.get(key, {})
+                matches.append({
+                    'date': key[0],
+                    'crop': key[1],
+                    'site': key[2],
+                    'distance': distance,
+                    'recommendations': self._conditions[key]['recommendations'],
+                    'predicted_temp': prediction.get('predicted_temp'),
+                    'actual_temp': prediction.get('actual_temp')
+                })
+        return matches
+
+    def get_prediction_accuracy(self, crop: str = None, month: str = None,
+                                site: str = None) -> Dict[str, float]:
+        """
+        Get prediction accuracy metrics from the running error totals.
+
+        Args:
+            crop: Only predictions for this crop
+            month: Only predictions in this month ('YYYY-MM')
+            site: Only predictions for this site
+
+        Returns:
+            Dictionary with 'mae', 'rmse' and 'count'
+        """
+        filters = {'crop': crop, 'month': month, 'site': site}
+        given = [(name, value) for name, value in filters.items() if value is not None]
+        self._refresh()
+
+        with self._lock:
+            if len(given) <= 1:
+                stats = self._stats.get(given[0] if given else ('all',), ErrorStats())
+                return stats.metrics()
+
+            # Combine the (crop, month, site) totals matching every filter
+            stats = ErrorStats()
+            for key, cell_stats in self._stats.items():
+                if key[0] == 'cell' and all(value is None or value == key_value
+                                            for value, key_value in zip((crop, month, site), key[1:])):
+                    stats.merge(cell_stats)
+            return stats.metrics()
+
+    def get_accuracy_breakdown(self, by: str = 'crop') -> Dict[str, Dict[str, float]]:
+        """
+        Get prediction accuracy metrics for every crop, month or site, or
+        forecast accuracy for every horizon day.
+
+        Args:
+            by: 'crop', 'month', 'site' or 'horizon'
+
+        Returns:
+            Dictionary mapping each crop, month, site or horizon day to its metrics
+        """
+        if by not in ('crop', 'month', 'site', 'horizon'):
+            raise ValueError(f"Unknown breakdown: {by}")
+
+        self._refresh()
+        with self._lock:
+            return {key[1]: stats.metrics() for key, stats in sorted(self._stats.items())
+                    if key[0] == by and stats.count > 0}
+
+    def get_horizon_accuracy(self, crop: str = None) -> Dict[int, Dict[str, float]]:
+        """
+        Get forecast accuracy metrics for each day of the forecast horizon.
+
+        Args:
+            crop: Only forecasts for this crop
+
+        Returns:
+            Dictionary mapping each horizon day (1 = next day) to its metrics
+        """
+        self._refresh()
+        with self._lock:
+            if crop is None:
+                return {key[1]: stats.metrics() for key, stats in sorted(self._stats.items())
+                        if key[0] == 'horizon' and stats.count > 0}
+            return {key[1]: stats.metrics() for key, stats in sorted(self._stats.items())
+                    if key[0] == 'horizon_crop' and key[2] == crop and stats.count > 0}
+
     def get_crop_history(self, crop: str = None) -> Dict[str, List[Dict[str, Any]]]:
         """
         Get crop performance history.
-        
+
         Args:
             crop: Specific crop to get history for (None for all)
-            
+
         Returns:
             Dictionary of crop history
         """
-        if crop is not None:
-            return {crop: self.memory['crop_history'].get(crop, [])}
-        return self.memory['crop_history']
-        
+        self._refresh()
+        with self._lock:
+            if crop is not None:
+                return {crop: list(self._crop_history.get(crop, []))}
+            return {name: list(entries) for name, entries in self._crop_history.items()}
+
     def get_recent_predictions(self, n: int = 5) -> List[Dict[str, Any]]:
         """
         Get recent predictions.
-        
+
         Args:
             n: Number of predictions to return
-            
+
         Returns:
             List of recent predictions
         """
-        return self.memory['predictions'][-n:]
-        
-    def update_actual_temperature(self, date: str, actual_temp: float) -> bool:
+        self._refresh()
+        with self._lock:
+            recent = [dict(p) for p in islice(reversed(self._predictions.values()), n)]
+        return recent[::-1]
+
+    @staticmethod
+    def _date_key(value: Any) -> Optional[str]:
+        """Convert a date, datetime or ISO string to a 'YYYY-MM-DD' key."""
+        if value is None:
+            return None
+        if isinstance(value, (date_type, datetime)):
+            return value.isoformat()[:10]
+        return str(value)[:10]
+
+    def query_predictions(self, start: Any = None, end: Any = None, crop: str = None,
+                          site: str = None, limit: int = None) -> pd.DataFrame:
         """
-        Update a prediction with the actual temperature.
-        
+        Get predictions in a date range, located by binary search over the
+        sorted prediction dates.
+
+        Args:
+            start: First date (inclusive), None for no lower bound
+            end: Last date (inclusive), None for no upper bound
+            crop: Only predictions for this crop
+            site: Only predictions for this site
+            limit: Only the latest this many matching predictions
+
+        Returns:
+            DataFrame with date, crop, site, predicted_temp, actual_temp and
+            error (predicted minus actual) columns, ordered by date
+        """
+        start, end = self._date_key(start), self._date_key(end)
+        columns = {name: [] for name in ('date', 'crop', 'site', 'predicted_temp', 'actual_temp')}
+        self._refresh()
+
+        with self._lock:
+            lo = 0 if start is None else bisect.bisect_left(self._dates, start)
+            hi = len(self._dates) if end is None else bisect.bisect_right(self._dates, end)
+
+            # Walk backwards from the end of the range so a limit stops early
+            rows = []
+            for i in range(hi - 1, lo - 1, -1):
+                day_rows = [self._predictions[key] for key in self._keys_by_date[self._dates[i]]
+                            if (crop is None or key[1] == crop) and (site is None or key[2] == site)]
+                rows.extend(reversed(day_rows))
+                if limit is not None and len(rows) >= limit:
+                    rows = rows[:limit]
+                    break
+
+            for prediction in reversed(rows):
+                for name, values in columns.items():
+                    values.append(prediction[name])
+
+        df = pd.DataFrame(columns)
+        df['date'] = pd.to_datetime(df['date'])
+        df['predicted_temp'] = df['predicted_temp'].astype(float)
+        df['actual_temp'] = df['actual_temp'].astype(float)
+        df['error'] = df['predicted_temp'] - df['actual_temp']
+        return df
+
+    def query_crop_history(self, crop: str = None, start: Any = None, end: Any = None,
+                           limit: int = None) -> pd.DataFrame:
+        """
+        Get crop performance history in a date range, located by binary search
+        over each crop's chronological history.
+
+        Args:
+            crop: Only history for this crop
+            start: First date (inclusive), None for no lower bound
+            end: Last date (inclusive), None for no upper bound
+            limit: Only the latest this many entries per crop
+
+        Returns:
+            DataFrame with crop, date, score, count and period columns; period
+            is 'day' or 'week' for rolled-up entries and empty otherwise
+        """
+        start, end = self._date_key(start), self._date_key(end)
+        columns = {name: [] for name in ('crop', 'date', 'score', 'count', 'period')}
+        self._refresh()
+
+        with self._lock:
+            crops = [crop] if crop is not None else list(self._crop_history)
+            for name in crops:
+                entries = self._crop_history.get(name, [])
+                lo = 0 if start is None else bisect.bisect_left(entries, start, key=lambda e: e['date'][:10])
+                hi = len(entries) if end is None else bisect.bisect_right(entries, end, key=lambda e: e['date'][:10])
+                if limit is not None:
+                    lo = max(lo, hi - limit)
+
+                for entry in entries[lo:hi]:
+                    columns['crop'].append(name)
+                    columns['date'].append(entry['date'])
+                    columns['score'].append(entry['score'])
+                    columns['count'].append(entry.get('count', 1))
+                    columns['period'].append(entry.get('period', ''))
+
+        df = pd.DataFrame(columns)
+        df['date'] = pd.to_datetime(df['date'], format='ISO8601')
+        df['score'] = df['score'].astype(float)
+        return df
+
+    def update_actual_temperature(self, date: str, actual_temp: float,
+                                  site: Optional[str] = None) -> bool:
+        """
+        Update the predictions for a date with the actual temperature.
+
         Args:
             date: Date of prediction
             actual_temp: Actual temperature
-            
+            site: Only update predictions for this site (None for all sites)
+
         Returns:
             True if prediction was found and updated, False otherwise
         """
-        for pred in self.memory['predictions']:
-            if pred['date'] == date:
-                pred['actual_temp'] = actual_temp
-                pred['updated_at'] = datetime.now().isoformat()
-                self._save_memory()
-                return True
-                
-        return False 
\ No newline at end of file
+        return self.update_actual_temperatures({date: actual_temp}, site) > 0
+
+    def update_actual_temperatures(self, actual_temps: Dict[str, float],
+                                   site: Optional[str] = None) -> int:
+        """
+        Update the predictions, and the forecast days targeting the same
+        dates, with actual temperatures in a single write.
+
+        Args:
+            actual_temps: Mapping of date to actual temperature
+            site: Only update predictions for this site (None for all sites)
+
+        Returns:
+            Number of predictions matched
+        """
+        self._refresh()
+        with self._lock:
+            matched = 0
+            changed = []
+            forecast_changed = []
+            for date, actual_temp in actual_temps.items():
+                actual_temp = float(actual_temp)
+                for key in self._keys_by_date.get(date, []):
+                    if site is not None and key[2] != site:
+                        continue
+                    matched += 1
+                    if self._predictions[key]['actual_temp'] != actual_temp:
+                        changed.append((*key, actual_temp))
+                for key in self._forecast_keys_by_target.get(date, []):
+                    if (site is None or key[2] == site) and self._forecasts[key]['actual_temp'] != actual_temp:
+                        forecast_changed.append((*key, actual_temp))
+
+            if not changed and not forecast_changed:
+                return matched
+
+            entry = {'op': 'actual_temps', 'updates': changed, 'forecast_updates': forecast_changed,
+                     'updated_at': datetime.now().isoformat()}
+            self._apply_in_memory(entry)
+            self._record(entry)
+
+        self._write_through()
+        return matched
@@ -0,0 +1,627 @@
+"""
+SQLite storage backend for the Memory Agent.
+"""
+
+import sqlite3
+import threading
+import json
+import glob
+import os
+import secrets
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Add the project root to the path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.file_lock import FileLock
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    crop TEXT NOT NULL,
+    predicted_temp REAL,
+    actual_temp REAL,
+    recorded_at TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS recommendations (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    crop TEXT NOT NULL,
+    recommendations TEXT NOT NULL,
+    recorded_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_recommendations_date_crop ON recommendations (date, crop);
+
+CREATE TABLE IF NOT EXISTS crop_history (
+    id INTEGER PRIMARY KEY,
+    crop TEXT NOT NULL,
+    date TEXT NOT NULL,
+    score REAL
+);
+CREATE INDEX IF NOT EXISTS idx_crop_history_crop_date ON crop_history (crop, date);
+
+CREATE TABLE IF NOT EXISTS recommendation_rollups (
+    period TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    crop TEXT NOT NULL,
+    site TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    actuators TEXT NOT NULL,
+    PRIMARY KEY (period, start_date, crop, site)
+);
+
+CREATE TABLE IF NOT EXISTS crop_history_rollups (
+    period TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    crop TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    score_min REAL,
+    score_max REAL,
+    PRIMARY KEY (period, start_date, crop)
+);
+
+CREATE TABLE IF NOT EXISTS conditions (
+    date TEXT NOT NULL,
+    crop TEXT NOT NULL,
+    site TEXT NOT NULL,
+    features TEXT NOT NULL,
+    recommendations TEXT NOT NULL,
+    recorded_at TEXT,
+    PRIMARY KEY (date, crop, site)
+);
+
+CREATE TABLE IF NOT EXISTS forecasts (
+    issued_date TEXT NOT NULL,
+    crop TEXT NOT NULL,
+    site TEXT NOT NULL,
+    horizon INTEGER NOT NULL,
+    target_date TEXT NOT NULL,
+    predicted_temp REAL NOT NULL,
+    actual_temp REAL,
+    recorded_at TEXT,
+    updated_at TEXT,
+    PRIMARY KEY (issued_date, crop, site, horizon)
+);
+CREATE INDEX IF NOT EXISTS idx_forecasts_target_date ON forecasts (target_date, site);
+
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Current schema version, stored in the metadata table
+SCHEMA_VERSION = 3
+
+# One prediction per (date, crop, site); a known actual temperature is never cleared
+PREDICTION_UPSERT = (
+    "INSERT INTO predictions (date, crop, site, predicted_temp, actual_temp, recorded_at, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (date, crop, site) DO UPDATE SET "
+    "predicted_temp = excluded.predicted_temp, "
+    "actual_temp = COALESCE(excluded.actual_temp, predictions.actual_temp), "
+    "updated_at = excluded.updated_at"
+)
+
+# One forecast per (issue date, crop, site, horizon day); reissuing keeps a known actual temperature
+FORECAST_UPSERT = (
+    "INSERT INTO forecasts (issued_date, crop, site, horizon, target_date, predicted_temp, actual_temp, "
+    "recorded_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (issued_date, crop, site, horizon) DO UPDATE SET "
+    "target_date = excluded.target_date, "
+    "predicted_temp = excluded.predicted_temp, "
+    "actual_temp = COALESCE(excluded.actual_temp, forecasts.actual_temp), "
+    "updated_at = excluded.updated_at"
+)
+
+class MemoryStore:
+    """
+    SQLite database in WAL mode holding predictions, recommendations and crop
+    history. Each write touches only the affected rows, and WAL lets readers
+    proceed while another session or process is writing.
+    """
+
+    def __init__(self, db_file: str):
+        """
+        Open (and create if needed) the memory database.
+
+        Args:
+            db_file: Path to the SQLite database
+        """
+        self.db_file = db_file
+        directory = os.path.dirname(db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        self._data_version = None
+
+        with self.transaction() as cur:
+            if self.get_meta('created_at', cur) is None:
+                now = datetime.now().isoformat()
+                self.set_meta('created_at', now, cur)
+                self.set_meta('last_updated', now, cur)
+            self._upgrade(cur)
+
+    def _upgrade(self, cur: sqlite3.Cursor) -> None:
+        """Bring an older database up to the current schema."""
+        version = int(self.get_meta('schema_version', cur) or 1)
+
+        if version < 2:
+            # Collapse duplicate predictions into the latest row per (date, crop),
+            # keeping any actual temperature recorded on an older duplicate
+            cur.execute(
+                "UPDATE predictions SET actual_temp = ("
+                "    SELECT p.actual_temp FROM predictions p"
+                "    WHERE p.date = predictions.date AND p.crop = predictions.crop"
+                "    AND p.actual_temp IS NOT NULL ORDER BY p.id DESC LIMIT 1"
+                ") WHERE actual_temp IS NULL"
+            )
+            cur.execute(
+                "DELETE FROM predictions WHERE id NOT IN "
+                "(SELECT MAX(id) FROM predictions GROUP BY date, crop)"
+            )
+            cur.execute("DROP INDEX IF EXISTS idx_predictions_date_crop")
+            cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_predictions_key ON predictions (date, crop)")
+
+        if version < 3:
+            # Predictions and recommendations are kept per site (grid cell);
+            # rows recorded before sites were tracked have an empty site
+            cur.execute("ALTER TABLE predictions ADD COLUMN site TEXT NOT NULL DEFAULT ''")
+            cur.execute("ALTER TABLE recommendations ADD COLUMN site TEXT NOT NULL DEFAULT ''")
+            cur.execute("DROP INDEX IF EXISTS idx_predictions_key")
+            cur.execute("CREATE UNIQUE INDEX idx_predictions_key ON predictions (date, crop, site)")
+
+        if version < SCHEMA_VERSION:
+            self.set_meta('schema_version', SCHEMA_VERSION, cur)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Run statements in one write transaction.
+
+        Yields:
+            Cursor for the transaction
+        """
+        with self._lock:
+            cur = self._conn.cursor()
+            try:
+                cur.execute("BEGIN IMMEDIATE")
+                yield cur
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            finally:
+                cur.close()
+
+    @contextmanager
+    def snapshot(self) -> Iterator[None]:
+        """
+        Run several reads against one consistent snapshot of the database.
+
+        In WAL mode the snapshot does not block writers in other processes.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield
+            finally:
+                self._conn.commit()
+
+    def changed(self) -> bool:
+        """
+        Check whether another connection (in this or another process) has
+        committed since the last check.
+
+        Returns:
+            True if the database changed
+        """
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        changed = self._data_version is not None and version != self._data_version
+        self._data_version = version
+        return changed
+
+    def query(self, sql: str, args: Tuple = ()) -> List[sqlite3.Row]:
+        """
+        Run a read query.
+
+        Args:
+            sql: SQL statement
+            args: Statement parameters
+
+        Returns:
+            List of rows
+        """
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def get_meta(self, key: str, cur: Optional[sqlite3.Cursor] = None) -> Optional[str]:
+        """Get a metadata value."""
+        row = (cur or self._conn).execute("SELECT value FROM metadata WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_meta(self, key: str, value: Any, cur: sqlite3.Cursor) -> None:
+        """Set a metadata value inside a transaction."""
+        cur.execute("INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def delete_meta(self, key: str, cur: sqlite3.Cursor) -> None:
+        """Delete a metadata value inside a transaction."""
+        cur.execute("DELETE FROM metadata WHERE key = ?", (key,))
+
+    def touch(self, cur: sqlite3.Cursor) -> None:
+        """Update the last_updated timestamp inside a transaction."""
+        self.set_meta('last_updated', datetime.now().isoformat(), cur)
+
+    def migrate_json(self, json_file: str) -> bool:
+        """
+        Import a legacy memory.json file once.
+
+        Args:
+            json_file: Path to the JSON memory file
+
+        Returns:
+            True if the file was imported, False if there was nothing to do
+        """
+        if not os.path.exists(json_file):
+            return False
+
+        with self.transaction() as cur:
+            if self.get_meta('migrated_from', cur) is not None:
+                return False
+
+            try:
+                with open(json_file, 'r') as f:
+                    memory = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Could not migrate {json_file}: {e}")
+                return False
+
+            cur.executemany(
+                PREDICTION_UPSERT,
+                [(p['date'], p['crop'], '', p.get('predicted_temp'), p.get('actual_temp'),
+                  p.get('recorded_at'), p.get('updated_at', p.get('recorded_at')))
+                 for p in memory.get('predictions', [])]
+            )
+            cur.executemany(
+                "INSERT INTO recommendations (date, crop, recommendations, recorded_at) VALUES (?, ?, ?, ?)",
+                [(r['date'], r['crop'], json.dumps(r['recommendations']), r.get('recorded_at'))
+                 for r in memory.get('recommendations', [])]
+            )
+            cur.executemany(
+                "INSERT INTO crop_history (crop, date, score) VALUES (?, ?, ?)",
+                [(crop, entry['date'], entry['score'])
+                 for crop, entries in memory.get('crop_history', {}).items() for entry in entries]
+            )
+
+            created_at = memory.get('metadata', {}).get('created_at')
+            if created_at:
+                self.set_meta('created_at', created_at, cur)
+            self.set_meta('migrated_from', json_file, cur)
+            self.set_meta('migrated_at', datetime.now().isoformat(), cur)
+            self.touch(cur)
+
+        return True
+
+    def compact(self, retention_days: int, weekly_after_days: int,
+                today: Optional[date] = None, vacuum: bool = False) -> Dict[str, int]:
+        """
+        Bound the size of the recommendation and crop performance history.
+
+        Superseded recommendations (all but the latest per date, crop and
+        site) are dropped. Entries older than the retention period are rolled
+        up into daily aggregates, and daily aggregates older than
+        weekly_after_days into weekly ones.
+
+        Args:
+            retention_days: Days of full detail to keep
+            weekly_after_days: Age in days after which rollups become weekly
+            today: Reference date (defaults to today)
+            vacuum: Reclaim the freed space in the database file afterwards
+
+        Returns:
+            Number of rows dropped or rolled up per kind
+        """
+        today = today or date.today()
+        cutoff = (today - timedelta(days=retention_days)).isoformat()
+        weekly_cutoff = (today - timedelta(days=max(weekly_after_days, retention_days))).isoformat()
+
+        with self.transaction() as cur:
+            summary = {
+                'superseded_recommendations': cur.execute(
+                    "DELETE FROM recommendations WHERE id NOT IN "
+                    "(SELECT MAX(id) FROM recommendations GROUP BY date, crop, site)"
+                ).rowcount,
+                'recommendations_rolled_up': self._rollup_recommendations(cur, cutoff, weekly_cutoff),
+                'crop_history_rolled_up': self._rollup_crop_history(cur, cutoff, weekly_cutoff)
+            }
+            self.set_meta('compacted_at', datetime.now().isoformat(), cur)
+
+        if vacuum:
+            with self._lock:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self._conn.execute("VACUUM")
+        return summary
+
+    @staticmethod
+    def _period(day: str, weekly_cutoff: str) -> Tuple[str, str]:
+        """Get the rollup period and its first day for an ISO date or timestamp."""
+        d = date.fromisoformat(day[:10])
+        if day < weekly_cutoff:
+            return 'week', (d - timedelta(days=d.weekday())).isoformat()
+        return 'day', d.isoformat()
+
+    def _rollup_recommendations(self, cur: sqlite3.Cursor, cutoff: str, weekly_cutoff: str) -> int:
+        """Roll recommendations older than the cutoff into actuator state counts."""
+        groups: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {}
+
+        def merge(key, count, actuators):
+            group = groups.setdefault(key, {'count': 0, 'actuators': {}})
+            group['count'] += count
+            for actuator, states in actuators.items():
+                for state, n in states.items():
+                    group['actuators'].setdefault(actuator, {})
+                    group['actuators'][actuator][state] = group['actuators'][actuator].get(state, 0) + n
+
+        rows = cur.execute(
+            "SELECT date, crop, site, recommendations FROM recommendations WHERE date < ?", (cutoff,)
+        ).fetchall()
+        for row in rows:
+            # Keep the actuator states; the free-text reasoning is dropped
+            states = {actuator: {str(state): 1} for actuator, state in json.loads(row['recommendations']).items()
+                      if actuator != 'reasoning'}
+            merge((*self._period(row['date'], weekly_cutoff), row['crop'], row['site']), 1, states)
+
+        # Daily rollups that have aged into the weekly range
+        for row in cur.execute(
+            "SELECT start_date, crop, site, count, actuators FROM recommendation_rollups "
+            "WHERE period = 'day' AND start_date < ?", (weekly_cutoff,)
+        ).fetchall():
+            merge((*self._period(row['start_date'], weekly_cutoff), row['crop'], row['site']),
+                  row['count'], json.loads(row['actuators']))
+        cur.execute("DELETE FROM recommendation_rollups WHERE period = 'day' AND start_date < ?", (weekly_cutoff,))
+
+        for key in list(groups):
+            existing = cur.execute(
+                "SELECT count, actuators FROM recommendation_rollups "
+                "WHERE period = ? AND start_date = ? AND crop = ? AND site = ?", key
+            ).fetchone()
+            if existing is not None:
+                merge(key, existing['count'], json.loads(existing['actuators']))
+        cur.executemany(
+            "INSERT OR REPLACE INTO recommendation_rollups (period, start_date, crop, site, count, actuators) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(*key, group['count'], json.dumps(group['actuators'])) for key, group in groups.items()]
+        )
+
+        cur.execute("DELETE FROM recommendations WHERE date < ?", (cutoff,))
+        return len(rows)
+
+    def _rollup_crop_history(self, cur: sqlite3.Cursor, cutoff: str, weekly_cutoff: str) -> int:
+        """Roll crop performance entries older than the cutoff into score aggregates."""
+        groups: Dict[Tuple[str, str, str], List[float]] = {}
+
+        def merge(key, count, score_sum, score_min, score_max):
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [count, score_sum, score_min, score_max]
+            else:
+                group[0] += count
+                group[1] += score_sum
+                group[2] = min(group[2], score_min)
+                group[3] = max(group[3], score_max)
+
+        rows = cur.execute("SELECT crop, date, score FROM crop_history WHERE date < ?", (cutoff,)).fetchall()
+        for row in rows:
+            merge((*self._period(row['date'], weekly_cutoff), row['crop']),
+                  1, row['score'], row['score'], row['score'])
+
+        rollup_columns = "count, score_sum, score_min, score_max"
+        for row in cur.execute(
+            f"SELECT start_date, crop, {rollup_columns} FROM crop_history_rollups "
+            "WHERE period = 'day' AND start_date < ?", (weekly_cutoff,)
+        ).fetchall():
+            merge((*self._period(row['start_date'], weekly_cutoff), row['crop']), *tuple(row)[2:])
+        cur.execute("DELETE FROM crop_history_rollups WHERE period = 'day' AND start_date < ?", (weekly_cutoff,))
+
+        for key in list(groups):
+            existing = cur.execute(
+                f"SELECT {rollup_columns} FROM crop_history_rollups "
+                "WHERE period = ? AND start_date = ? AND crop = ?", key
+            ).fetchone()
+            if existing is not None:
+                merge(key, *tuple(existing))
+        cur.executemany(
+            f"INSERT OR REPLACE INTO crop_history_rollups (period, start_date, crop, {rollup_columns}) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(*key, *group) for key, group in groups.items()]
+        )
+
+        cur.execute("DELETE FROM crop_history WHERE date < ?", (cutoff,))
+        return len(rows)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class MemoryJournal:
+    """
+    Append-only journal of one process's memory writes that have not reached
+    the database yet, one JSON object per line.
+
+    Every process writes its own journal, identified by an owner id and held
+    under a file lock for the life of the process. The journal is split into
+    numbered segment files; rotating starts a new segment, so writes can
+    continue while older segments are flushed, and flushed segments are
+    deleted as a whole. Journals whose lock is free were left behind by a
+    process that exited without flushing, and are recovered by the next one.
+    """
+
+    def __init__(self, prefix: str, owner: Optional[str] = None,
+                 lock: Optional[FileLock] = None):
+        """
+        Open a journal.
+
+        Args:
+            prefix: Path prefix of the journal files
+            owner: Owner id of an existing journal (None starts a new journal
+                   for this process)
+            lock: Already acquired lock of an existing journal
+        """
+        self.prefix = prefix
+        if owner is None:
+            owner = f"{os.getpid()}-{secrets.token_hex(4)}"
+            lock = FileLock(self._lock_path(prefix, owner))
+            lock.acquire()
+        self.owner = owner
+        self._lock = lock
+
+        indices = [index for index, _ in self._segments()]
+        self._segment = max(indices, default=0) + 1
+        self._file = None
+
+    @staticmethod
+    def _lock_path(prefix: str, owner: str) -> str:
+        """Get the lock file path of a journal ('' is the unowned journal of older versions)."""
+        return f"{prefix}.{owner}.lock" if owner else f"{prefix}.lock"
+
+    @property
+    def seq_key(self) -> str:
+        """Metadata key holding the last sequence number flushed from this journal."""
+        return f"journal_seq:{self.owner}" if self.owner else 'journal_seq'
+
+    def _segment_path(self, index: int) -> str:
+        """Get the file path of a segment."""
+        return f"{self.prefix}.{self.owner}.{index}" if self.owner else f"{self.prefix}.{index}"
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        """List this journal's segments as sorted (index, path) pairs."""
+        base = f"{self.prefix}.{self.owner}" if self.owner else self.prefix
+        segments = []
+        for path in glob.glob(glob.escape(base) + '.*'):
+            suffix = path[len(base) + 1:]
+            if suffix.isdigit():
+                segments.append((int(suffix), path))
+        return sorted(segments)
+
+    @classmethod
+    def orphans(cls, prefix: str) -> List['MemoryJournal']:
+        """
+        Find journals left behind by processes that are no longer running.
+
+        Args:
+            prefix: Path prefix of the journal files
+
+        Returns:
+            Orphaned journals, locked by this process for recovery
+        """
+        owners = set()
+        for path in glob.glob(glob.escape(prefix) + '.*'):
+            suffix = path[len(prefix) + 1:]
+            if suffix.isdigit():
+                owners.add('')
+                continue
+            owner, _, ext = suffix.rpartition('.')
+            if owner and (ext.isdigit() or ext == 'lock'):
+                owners.add(owner)
+
+        journals = []
+        for owner in sorted(owners):
+            lock = FileLock(cls._lock_path(prefix, owner))
+            # A held lock means the owning process is still running
+            if lock.acquire(blocking=False):
+                journals.append(cls(prefix, owner, lock))
+        return journals
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """
+        Append an entry to the current segment.
+
+        The entry is handed to the operating system but not fsynced.
+
+        Args:
+            entry: JSON-serializable journal entry
+        """
+        if self._file is None:
+            self._file = open(self._segment_path(self._segment), 'a')
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+
+    def rotate(self) -> int:
+        """
+        Close the current segment and start a new one.
+
+        Returns:
+            Index of the new segment; all older segments may be discarded once
+            their entries are in the database
+        """
+        self.close()
+        self._segment += 1
+        return self._segment
+
+    def read(self) -> List[Dict[str, Any]]:
+        """
+        Read all entries from all segments, oldest first.
+
+        A torn last line from a crash is skipped.
+
+        Returns:
+            List of journal entries
+        """
+        entries = []
+        for _, path in self._segments():
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        return entries
+
+    def discard(self, before: int) -> None:
+        """
+        Delete segments older than a segment index.
+
+        Args:
+            before: First segment index to keep
+        """
+        for index, path in self._segments():
+            if index < before:
+                os.remove(path)
+
+    def close(self) -> None:
+        """Close the current segment file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def release(self) -> None:
+        """
+        Close the journal and give up its lock, removing the lock file when no
+        segments are left to recover.
+        """
+        self.close()
+        if self._lock is None:
+            return
+        if not self._segments():
+            try:
+                os.remove(self._lock.path)
+            except OSError:
+                pass
+        self._lock.release()
+        self._lock = None
@@ -0,0 +1,280 @@
+"""
+Persistent registry of trained prediction models per site and crop.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+# Add the project root to the path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.prediction_agent import PredictionAgent
+from config import (MODEL_REGISTRY_DIR, MODEL_RETRAIN_DAYS, MODEL_FINE_TUNE_EPOCHS, MODEL_DRIFT_FACTOR,
+                    FORECAST_HORIZON_DAYS)
+
+# Input sequence length of the temperature model
+SEQUENCE_LENGTH = 5
+
+
+class ModelRegistry:
+    """
+    Trained prediction models on disk, one per (site, crop), each saved with
+    its fitted scaler and a hash of the data it was trained on.
+
+    A model is reused as is while no new days have arrived, fine-tuned on the
+    days that arrived since it was trained, and retrained from scratch when
+    its error on those days shows drift, it is older than the retrain
+    interval or it forecasts a different horizon than configured. A model
+    registered without a crop is shared by all crops of its site and seeds a
+    crop's own model until that crop has one.
+    """
+
+    def __init__(self, directory: str = MODEL_REGISTRY_DIR,
+                 retrain_days: float = MODEL_RETRAIN_DAYS,
+                 fine_tune_epochs: int = MODEL_FINE_TUNE_EPOCHS,
+                 drift_factor: float = MODEL_DRIFT_FACTOR):
+        """
+        Initialize the registry.
+
+        Args:
+            directory: Root directory of the saved models
+            retrain_days: Days after which a model is retrained from scratch
+            fine_tune_epochs: Epochs when fine-tuning on new days
+            drift_factor: Retrain when the error on new days exceeds this
+                          multiple of the model's training error
+        """
+        self.directory = directory
+        self.retrain_interval = datetime.timedelta(days=retrain_days)
+        self.fine_tune_epochs = fine_tune_epochs
+        self.drift_factor = drift_factor
+        os.makedirs(directory, exist_ok=True)
+
+        # Training is serialized; loaded agents are never modified once published
+        self._lock = threading.RLock()
+        self._models: Dict[Tuple[str, Optional[str]], Tuple[PredictionAgent, Dict[str, Any]]] = {}
+
+    def _path(self, site: str, crop: Optional[str]) -> str:
+        """Get the directory of a model."""
+        name = crop.replace(' ', '_') if crop else 'all-crops'
+        return os.path.join(self.directory, site, name)
+
+    def _read(self, site: str, crop: Optional[str]) -> Optional[Tuple[PredictionAgent, Dict[str, Any]]]:
+        """
+        Get a model, loading it from disk the first time it is asked for.
+
+        Args:
+            site: Site key (e.g. its grid cell key)
+            crop: Crop, or None for the site's shared model
+
+        Returns:
+            Tuple of (prediction agent, model info), or None if there is no model
+        """
+        key = (site, crop)
+        if key in self._models:
+            return self._models[key]
+
+        path = self._path(site, crop)
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            return None
+
+        try:
+            with open(os.path.join(path, 'meta.json'), 'r') as f:
+                info = json.load(f)
+            # Serving only needs the NumPy copy; fine-tuning loads the full model
+            agent = PredictionAgent()
+            agent.load_models(path, engine_only=True)
+        except Exception as e:
+            print(f"Could not load model for {site} ({crop or 'all crops'}): {e}")
+            return None
+
+        self._models[key] = (agent, info)
+        return self._models[key]
+
+    def _write(self, site: str, crop: Optional[str], agent: PredictionAgent, info: Dict[str, Any]) -> None:
+        """
+        Save a model and publish it in place of the previous one.
+
+        Args:
+            site: Site key
+            crop: Crop, or None for the site's shared model
+            agent: Trained prediction agent
+            info: Model info saved alongside it
+        """
+        path = self._path(site, crop)
+        staging = path + '.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        agent.save_models(staging)
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(info, f, indent=2)
+
+        # Swap the finished directory in so a crash never leaves a partial model
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(staging, path)
+        self._models[(site, crop)] = (agent, info)
+
+    def get(self, site: str, crop: Optional[str] = None) -> Tuple[Optional[PredictionAgent], Dict[str, Any]]:
+        """
+        Get the registered model of a site, without training.
+
+        Args:
+            site: Site key
+            crop: Crop (falls back to the site's shared model)
+
+        Returns:
+            Tuple of (prediction agent or None, model info)
+        """
+        with self._lock:
+            entry = self._read(site, crop)
+            if entry is None and crop is not None:
+                entry = self._read(site, None)
+            return entry if entry is not None else (None, {})
+
+    def get_or_train(self, site: str, crop: Optional[str], temperatures: np.ndarray,
+                     end_date: datetime.date) -> Tuple[Optional[PredictionAgent], Dict[str, Any]]:
+        """
+        Get an up-to-date model of a site, training only as much as needed.
+
+        Args:
+            site: Site key
+            crop: Crop, or None for the site's shared model
+            temperatures: Array of daily temperatures ending at end_date (NaN for missing days)
+            end_date: Date of the last value
+
+        Returns:
+            Tuple of (prediction agent or None, training results with the
+            'action' taken: 'reused', 'fine_tuned' or 'trained')
+        """
+        temperatures = np.asarray(temperatures, dtype=float)
+
+        # Trailing missing days have not arrived yet
+        valid = np.flatnonzero(~np.isnan(temperatures))
+        # Need at least 10 data points for meaningful training, and a full horizon after a sequence
+        if len(valid) < max(10, SEQUENCE_LENGTH + FORECAST_HORIZON_DAYS):
+            return None, {'status': 'error', 'message': 'Not enough data for training'}
+        end_date = end_date - datetime.timedelta(days=len(temperatures) - 1 - int(valid[-1]))
+        temperatures = temperatures[:valid[-1] + 1]
+        data_hash = hashlib.sha256(temperatures.astype(np.float32).tobytes()).hexdigest()
+
+        with self._lock:
+            entry = self._read(site, crop)
+            if entry is None and crop is not None:
+                entry = self._read(site, None)
+
+            reason = 'new'
+            if entry is not None:
+                agent, info = entry
+                new_days = (end_date - datetime.date.fromisoformat(info['end_date'])).days
+                age = datetime.datetime.now() - datetime.datetime.fromisoformat(info['trained_at'])
+
+                # Sequences whose targets include a new day
+                window = new_days + SEQUENCE_LENGTH + FORECAST_HORIZON_DAYS - 1
+
+                if info.get('horizon', 1) != FORECAST_HORIZON_DAYS:
+                    reason = 'horizon'
+                elif info['data_hash'] == data_hash or new_days <= 0:
+                    return agent, {'status': 'success', **info, 'action': 'reused'}
+                elif age > self.retrain_interval:
+                    reason = 'schedule'
+                elif window > len(temperatures) or np.isnan(temperatures[-window:]).any():
+                    # Missing days among the new ones leave too little to fine-tune on
+                    reason = 'gap'
+                else:
+                    result = self._fine_tune(site, crop, info, temperatures[-window:], end_date, data_hash)
+                    if result is not None:
+                        return result
+                    reason = 'drift'
+
+            return self._train(site, crop, temperatures, end_date, data_hash, reason)
+
+    def _fine_tune(self, site: str, crop: Optional[str], info: Dict[str, Any], window: np.ndarray,
+                   end_date: datetime.date, data_hash: str) -> Optional[Tuple[PredictionAgent, Dict[str, Any]]]:
+        """
+        Fine-tune a copy of a registered model on newly arrived days.
+
+        Args:
+            site: Site key
+            crop: Crop the fine-tuned model is registered for
+            info: Info of the model to start from
+            window: Daily temperatures covering every sequence whose targets include a new day
+            end_date: Date of the last value
+            data_hash: Hash of the full training series
+
+        Returns:
+            Tuple of (prediction agent, training results), or None if the
+            model has drifted and should be retrained
+        """
+        # Work on a fresh copy so callers holding the published agent are unaffected
+        agent = PredictionAgent()
+        agent.load_models(self._path(site, info['crop']))
+        predictor = agent.temperature_predictor
+
+        try:
+            error = predictor.evaluate_values(window, SEQUENCE_LENGTH)
+            if error > self.drift_factor * info['mae']:
+                return None
+            history = predictor.fine_tune(window, SEQUENCE_LENGTH, self.fine_tune_epochs)
+        except ValueError:
+            # Too few valid new days to judge drift
+            return None
+
+        info = {
+            **info,
+            'crop': crop,
+            'data_hash': data_hash,
+            'end_date': end_date.isoformat(),
+            'updated_at': datetime.datetime.now().isoformat(),
+            'fine_tune_error': error,
+            'temperature_loss': history['loss'][-1]
+        }
+        self._write(site, crop, agent, info)
+        return agent, {'status': 'success', **info, 'action': 'fine_tuned'}
+
+    def _train(self, site: str, crop: Optional[str], temperatures: np.ndarray, end_date: datetime.date,
+               data_hash: str, reason: str) -> Tuple[Optional[PredictionAgent], Dict[str, Any]]:
+        """
+        Train a model from scratch and register it.
+
+        Args:
+            site: Site key
+            crop: Crop, or None for the site's shared model
+            temperatures: Array of daily temperatures
+            end_date: Date of the last value
+            data_hash: Hash of the training series
+            reason: Why the model is (re)trained
+
+        Returns:
+            Tuple of (prediction agent or None, training results)
+        """
+        agent = PredictionAgent()
+        result = agent.train_values(temperatures)
+        if result['status'] != 'success':
+            return None, result
+        try:
+            mae = agent.temperature_predictor.evaluate_values(temperatures, SEQUENCE_LENGTH)
+        except ValueError as e:
+            return None, {'status': 'error', 'message': str(e)}
+
+        now = datetime.datetime.now().isoformat()
+        info = {
+            'site': site,
+            'crop': crop,
+            'data_hash': data_hash,
+            'end_date': end_date.isoformat(),
+            'days': int(np.count_nonzero(~np.isnan(temperatures))),
+            'horizon': agent.temperature_predictor.horizon,
+            'trained_at': now,
+            'updated_at': now,
+            'mae': mae,
+            'temperature_loss': result['temperature_loss'],
+            'epochs': result['epochs'],
+            'reason': reason
+        }
+        self._write(site, crop, agent, info)
+        return agent, {'status': 'success', **info, 'action': 'trained'}
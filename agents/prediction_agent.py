@@ -4,13 +4,16 @@ Prediction Agent for forecasting environmental conditions.
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterable, Hashable, List, Optional, Tuple
+import datetime
 import os
 import sys
 
 # Add the project root to the path so we can import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from models.temperature_predictor import TemperaturePredictor
+from models.gru_engine import GRUEngine
+from config import FORECAST_HORIZON_DAYS
 
 class PredictionAgent:
     """
@@ -19,9 +22,14 @@ class PredictionAgent:
     
     def __init__(self):
         """Initialize the prediction agent."""
-        self.temperature_predictor = TemperaturePredictor()
+        # Daily model forecasting the whole horizon in one pass
+        self.temperature_predictor = TemperaturePredictor(horizon=FORECAST_HORIZON_DAYS)
         self.is_trained = False
         
+        # Separate next-hour model trained on streamed hourly data
+        self.hourly_predictor = TemperaturePredictor(interval='1h')
+        self.is_hourly_trained = False
+        
     def train(self, df: pd.DataFrame) -> Dict[str, Any]:
         """
         Train the prediction models with historical data.
@@ -46,6 +54,76 @@ class PredictionAgent:
             'epochs': len(history['loss'])
         }
         
+    def train_values(self, temperatures: np.ndarray) -> Dict[str, Any]:
+        """
+        Train the prediction models on an array of daily temperatures, such as
+        a slice of the local climate store.
+        
+        Args:
+            temperatures: Array of daily temperatures (NaN for missing days)
+            
+        Returns:
+            Training metrics
+        """
+        # Check if we have enough data
+        if np.count_nonzero(~np.isnan(temperatures)) < 10:  # Need at least 10 data points for meaningful training
+            return {'status': 'error', 'message': 'Not enough data for training'}
+            
+        # Train temperature model
+        history = self.temperature_predictor.train_values(temperatures)
+        if self.temperature_predictor.model is None:
+            # Enough days in total, but no run of consecutive days long enough for a sequence
+            return {'status': 'error', 'message': 'Not enough consecutive days for training'}
+        self.is_trained = True
+        
+        return {
+            'status': 'success',
+            'temperature_loss': history['loss'][-1],
+            'epochs': len(history['loss'])
+        }
+        
+    def train_hourly_stream(self, chunk_factory: Callable[[], Iterable[pd.DataFrame]]) -> Dict[str, Any]:
+        """
+        Train the next-hour model on a stream of hourly data chunks.
+        
+        Args:
+            chunk_factory: Callable returning a fresh iterable of hourly DataFrames
+            
+        Returns:
+            Training metrics
+        """
+        history = self.hourly_predictor.train_stream(chunk_factory)
+        if history['loss'] == [0]:
+            return {'status': 'error', 'message': 'Not enough hourly data for training'}
+        self.is_hourly_trained = True
+        
+        return {
+            'status': 'success',
+            'temperature_loss': history['loss'][-1],
+            'epochs': len(history['loss'])
+        }
+        
+    def predict_next_hour(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Predict the temperature for the next hour.
+        
+        Args:
+            df: DataFrame with recent hourly data
+            
+        Returns:
+            Dictionary of predictions
+        """
+        if not self.is_hourly_trained:
+            return {'status': 'error', 'message': 'Hourly model not trained yet'}
+            
+        try:
+            return {
+                'status': 'success',
+                'temperature': self.hourly_predictor.predict_next_day(df)
+            }
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
+        
     def predict_next_day(self, df: pd.DataFrame) -> Dict[str, Any]:
         """
         Predict environmental conditions for the next day.
@@ -70,6 +148,92 @@ class PredictionAgent:
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
             
+    def predict_forecast(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Forecast the temperature of each of the next days in one forward pass.
+        
+        Args:
+            df: DataFrame with recent environmental data
+            
+        Returns:
+            Dictionary with the forecast temperatures, day 1 first, and their
+            dates when df has a 'date' column
+        """
+        if not self.is_trained:
+            return {'status': 'error', 'message': 'Model not trained yet'}
+            
+        try:
+            temperatures = self.temperature_predictor.predict_horizon(df)
+            result = {'status': 'success', 'temperatures': temperatures}
+            
+            if 'date' in df.columns and len(df):
+                last_date = pd.to_datetime(df['date'].iloc[-1]).date()
+                result['dates'] = [(last_date + datetime.timedelta(days=day)).isoformat()
+                                   for day in range(1, len(temperatures) + 1)]
+            return result
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
+            
+    def predict_many(self, frames: Dict[Hashable, pd.DataFrame],
+                     agents: Optional[Dict[Hashable, 'PredictionAgent']] = None,
+                     sequence_length: int = 5) -> Dict[Hashable, Dict[str, Any]]:
+        """
+        Predict the next day's temperature for many sites in one forward pass.
+        
+        The latest window of every site is stacked into a (sites, sequence_length, 1)
+        batch. Sites scored by different models (e.g. each site's registry model)
+        have their weights and scalers stacked alongside, so each row is scaled
+        and scored by its own model in the same vectorized pass. Models of
+        different shapes (e.g. another horizon) are batched separately.
+        
+        Args:
+            frames: DataFrame with recent data for each site
+            agents: Prediction agent to use for each site (defaults to this agent)
+            sequence_length: Length of input sequences
+            
+        Returns:
+            Dictionary of predictions for each site, with the next day's
+            'temperature' and the full 'forecast'
+        """
+        agents = agents or {}
+        results = {}
+        # Sites whose models have the same shapes are stacked into one batch
+        groups: Dict[tuple, List[Tuple[Hashable, np.ndarray, GRUEngine]]] = {}
+        
+        for key, df in frames.items():
+            agent = agents.get(key, self)
+            engine = agent.temperature_predictor.engine
+            if not agent.is_trained:
+                results[key] = {'status': 'error', 'message': 'Model not trained yet'}
+                continue
+            if engine is None:
+                # Models without a NumPy copy are scored one at a time
+                results[key] = agent.predict_next_day(df)
+                continue
+                
+            # The window must be the latest consecutive days
+            try:
+                window = agent.temperature_predictor.latest_window(df, sequence_length)
+            except ValueError as e:
+                results[key] = {'status': 'error', 'message': str(e)}
+                continue
+                
+            groups.setdefault(engine.signature, []).append((key, window, engine))
+            
+        for group in groups.values():
+            keys, windows, engines = zip(*group)
+            # One engine scores the whole group when every site shares a model
+            if all(engine is engines[0] for engine in engines):
+                engine = engines[0]
+            else:
+                engine = GRUEngine.stack(list(engines))
+            predictions = engine.predict_horizon(np.stack(windows))
+            for key, forecast in zip(keys, predictions):
+                results[key] = {'status': 'success', 'temperature': float(forecast[0]),
+                                'forecast': forecast.tolist()}
+                
+        return {key: results[key] for key in frames}
+        
     def save_models(self, directory: str) -> None:
         """
         Save trained models to disk.
@@ -81,14 +245,20 @@ class PredictionAgent:
             raise ValueError("Models not trained yet")
             
         os.makedirs(directory, exist_ok=True)
-        self.temperature_predictor.save_model(os.path.join(directory, 'temperature_model'))
+        self.temperature_predictor.save_model(os.path.join(directory, 'temperature_model.keras'))
         
-    def load_models(self, directory: str) -> None:
+    def load_models(self, directory: str, engine_only: bool = False) -> None:
         """
         Load trained models from disk.
         
         Args:
             directory: Directory containing saved models
+            engine_only: Load only the NumPy copy used for prediction, which
+                         is faster and does not need TensorFlow
         """
-        self.temperature_predictor.load_model(os.path.join(directory, 'temperature_model'))
+        filepath = os.path.join(directory, 'temperature_model.keras')
+        if engine_only:
+            self.temperature_predictor.load_engine(filepath)
+        else:
+            self.temperature_predictor.load_model(filepath)
         self.is_trained = True 
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""
+Prefetch Scheduler for warming data and models of configured sites.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Tuple, Optional
+import datetime
+import threading
+import sys
+import os
+
+# Add the project root to the path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.model_registry import ModelRegistry
+from utils.nasa_data import NASAEarthdata, RequestBudget
+from utils.power_cache import cell_key
+from config import (PREFETCH_SITES, PREFETCH_DAYS, PREFETCH_UPDATE_HOUR_UTC,
+                    PREFETCH_INTERVAL_HOURS, PREFETCH_REQUEST_BUDGET, POWER_MAX_WORKERS,
+                    CLIMATE_TRAINING_DAYS)
+
+class PrefetchScheduler:
+    """
+    Background scheduler that refreshes configured sites shortly after NASA
+    POWER's daily update, warming the response cache, the climate store and the
+    registered prediction model of each site.
+    """
+
+    def __init__(self, nasa_data: NASAEarthdata,
+                 sites: List[Tuple[float, float]] = PREFETCH_SITES,
+                 days: int = PREFETCH_DAYS,
+                 update_hour_utc: int = PREFETCH_UPDATE_HOUR_UTC,
+                 interval_hours: float = PREFETCH_INTERVAL_HOURS,
+                 request_budget: int = PREFETCH_REQUEST_BUDGET,
+                 train_models: bool = True,
+                 registry: ModelRegistry = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            nasa_data: NASA data client shared with the coordinator
+            sites: List of (lat, lon) pairs to keep warm
+            days: Days of data refreshed per site
+            update_hour_utc: Hour (UTC) after which POWER has published the day's update
+            interval_hours: Hours between refresh cycles
+            request_budget: Maximum POWER request attempts, retries included, per refresh cycle
+            train_models: Whether to keep a prediction model per site up to date
+            registry: Model registry shared with the coordinator
+        """
+        self.nasa_data = nasa_data
+        self.sites = list(sites)
+        self.days = days
+        self.update_hour_utc = update_hour_utc
+        self.interval = datetime.timedelta(hours=interval_hours)
+        self.request_budget = request_budget
+        self.train_models = train_models
+        self.registry = registry or ModelRegistry()
+
+        self.last_run: Optional[Dict[str, Any]] = None
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, run_now: bool = True) -> None:
+        """
+        Start refreshing in a background thread.
+
+        Args:
+            run_now: Run a refresh cycle immediately instead of waiting for the next slot
+        """
+        if not self.sites or (self._thread is not None and self._thread.is_alive()):
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(run_now,),
+                                        name='prefetch-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None) -> None:
+        """
+        Stop the background thread after the current cycle.
+
+        Args:
+            timeout: Seconds to wait for the thread to finish
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def next_run(self, now: datetime.datetime = None) -> datetime.datetime:
+        """
+        Get the time of the next refresh cycle.
+
+        Args:
+            now: Current UTC time (defaults to now)
+
+        Returns:
+            UTC time of the next cycle
+        """
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        slot = now.replace(hour=self.update_hour_utc, minute=0, second=0, microsecond=0)
+
+        # Step from today's update slot to the first slot in the future
+        if slot > now:
+            slot -= datetime.timedelta(days=1)
+        while slot <= now:
+            slot += self.interval
+        return slot
+
+    def _loop(self, run_now: bool) -> None:
+        """Run refresh cycles until stopped."""
+        if run_now:
+            self._run_safely()
+
+        while not self._stop.is_set():
+            delay = (self.next_run() - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+            if self._stop.wait(max(delay, 0)):
+                break
+            self._run_safely()
+
+    def _run_safely(self) -> None:
+        """Run one cycle without letting errors kill the thread."""
+        try:
+            self.run_once()
+        except Exception as e:
+            print(f"Error in prefetch cycle: {e}")
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        Refresh all configured sites once, within the request budget.
+
+        Sites are fetched in concurrent batches, each site started only while
+        the budget can cover a request with all its retries; once it is used up
+        the remaining sites wait for the next cycle. Every attempt is reserved
+        from the budget before it is made, so a cycle never exceeds it, and
+        foreground fetches made meanwhile do not use it up.
+
+        Returns:
+            Summary of the cycle
+        """
+        started = datetime.datetime.now(datetime.timezone.utc)
+        budget = RequestBudget(self.request_budget)
+        per_site = self.nasa_data.max_retries + 1
+        refreshed, skipped, errors = [], [], {}
+        frames = {}
+
+        pending = list(self.sites)
+        while pending:
+            # Never start more site fetches than the remaining budget allows
+            allowance = min(POWER_MAX_WORKERS, budget.remaining // per_site)
+            if self._stop.is_set() or allowance <= 0:
+                skipped.extend(pending)
+                break
+            batch, pending = pending[:allowance], pending[allowance:]
+
+            result = self.nasa_data.fetch_many([(lat, lon, self.days) for lat, lon in batch], budget=budget)
+            for (lat, lon, _), message in result['errors'].items():
+                errors[(lat, lon)] = message
+            for lat, lon, _ in result['results']:
+                refreshed.append((lat, lon))
+                frames[(lat, lon)] = result['results'][(lat, lon, self.days)]
+
+            if self.train_models:
+                for lat, lon, _ in result['results']:
+                    # One site's failure must not cost the others their refresh
+                    try:
+                        self._warm_model(lat, lon, result['results'][(lat, lon, self.days)])
+                    except Exception as e:
+                        errors[(lat, lon)] = f"Model update failed: {e}"
+
+        summary = {
+            'started_at': started.isoformat(),
+            'refreshed': refreshed,
+            'skipped': skipped,
+            'errors': errors,
+            'requests': budget.used,
+            'predictions': self._predict_sites(frames) if self.train_models else {}
+        }
+        self.last_run = summary
+        return summary
+
+    def _predict_sites(self, frames: Dict[Tuple[float, float], pd.DataFrame]) -> Dict[Tuple[float, float], float]:
+        """
+        Predict tomorrow's temperature at every refreshed site in one batch.
+
+        Args:
+            frames: Freshly fetched data for each (lat, lon)
+
+        Returns:
+            Predicted temperature for each site that has a registered model
+        """
+        agents = {}
+        for lat, lon in frames:
+            agent, _ = self.registry.get(cell_key(lat, lon))
+            if agent is not None:
+                agents[(lat, lon)] = agent
+        if not agents:
+            return {}
+
+        # Each site is scored by its own model, all in one forward pass
+        results = next(iter(agents.values())).predict_many(
+            {site: frames[site] for site in agents}, agents
+        )
+        return {site: result['temperature'] for site, result in results.items() if result['status'] == 'success'}
+
+    def _warm_model(self, lat: float, lon: float, df) -> None:
+        """
+        Bring the registered prediction model of a site up to date.
+
+        Args:
+            lat: Latitude
+            lon: Longitude
+            df: Freshly fetched data for the site
+        """
+        cell = cell_key(lat, lon)
+        temperatures = df['temperature'].to_numpy(dtype=float)
+        end_date = pd.to_datetime(df['date'].iloc[-1]).date()
+
+        # Prefer the longer history kept in the local store
+        if self.nasa_data.store is not None:
+            store_end = datetime.date.today()
+            start_date = store_end - datetime.timedelta(days=CLIMATE_TRAINING_DAYS)
+            stored = self.nasa_data.store.read(cell, 'temperature', start_date, store_end)
+            if np.count_nonzero(~np.isnan(stored)) > len(temperatures):
+                temperatures, end_date = stored, store_end
+
+        # The temperature model does not depend on the crop, so one shared model per site is warmed
+        agent, result = self.registry.get_or_train(cell, None, temperatures, end_date)
+        if agent is None:
+            print(f"Could not warm model for ({lat}, {lon}): {result['message']}")
@@ -0,0 +1,236 @@
+"""
+Nearest-neighbour index over the conditions of past decisions.
+"""
+
+import itertools
+import os
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to the path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import CROP_TEMP_RANGES
+from utils.lazy import lazy_import, is_available
+
+# The NumPy index is used when chromadb is not installed
+chromadb = lazy_import('chromadb') if is_available('chromadb') else None
+
+# Actuators whose recommended state is part of the feature vector
+ACTUATORS = ['fan', 'heater', 'water_pump']
+
+# Window statistics in the feature vector and the scale each is divided by,
+# so that a typical day-to-day difference counts about the same in every one
+WINDOW_FEATURES = [
+    ('temperature_mean', 5.0),
+    ('temperature_min', 5.0),
+    ('temperature_max', 5.0),
+    ('temperature_std', 2.0),
+    ('temperature_trend', 1.0),
+    ('soil_moisture_last', 20.0),
+    ('soil_moisture_mean', 20.0),
+    ('humidity_mean', 20.0),
+    ('precipitation_sum', 10.0)
+]
+
+FEATURE_NAMES = ([name for name, _ in WINDOW_FEATURES]
+                 + [f"crop_{crop}" for crop in CROP_TEMP_RANGES]
+                 + [f"{actuator}_on" for actuator in ACTUATORS])
+
+Key = Tuple[str, str, str]
+
+
+def condition_features(df: pd.DataFrame, crop: str,
+                       recommendations: Optional[Dict[str, Any]] = None) -> List[float]:
+    """
+    Build the feature vector describing a day's conditions and decision.
+
+    Args:
+        df: Recent daily data with a 'temperature' column and optionally
+            'soil_moisture', 'humidity' and 'precipitation'
+        crop: Crop being grown
+        recommendations: Actuator recommendations made for the day
+
+    Returns:
+        Scaled feature vector in FEATURE_NAMES order
+    """
+    def column(name: str) -> np.ndarray:
+        if name not in df.columns:
+            return np.array([])
+        values = df[name].to_numpy(dtype=float)
+        return values[~np.isnan(values)]
+
+    temperature = column('temperature')
+    soil_moisture = column('soil_moisture')
+    humidity = column('humidity')
+    precipitation = column('precipitation')
+
+    trend = 0.0
+    if len(temperature) > 1:
+        trend = float(np.polyfit(np.arange(len(temperature)), temperature, 1)[0])
+
+    # Missing columns contribute 0 rather than dominating the distance
+    stats = {
+        'temperature_mean': temperature.mean() if len(temperature) else 0.0,
+        'temperature_min': temperature.min() if len(temperature) else 0.0,
+        'temperature_max': temperature.max() if len(temperature) else 0.0,
+        'temperature_std': temperature.std() if len(temperature) else 0.0,
+        'temperature_trend': trend,
+        'soil_moisture_last': soil_moisture[-1] if len(soil_moisture) else 0.0,
+        'soil_moisture_mean': soil_moisture.mean() if len(soil_moisture) else 0.0,
+        'humidity_mean': humidity.mean() if len(humidity) else 0.0,
+        'precipitation_sum': precipitation.sum() if len(precipitation) else 0.0
+    }
+
+    features = [float(stats[name]) / scale for name, scale in WINDOW_FEATURES]
+    features += [1.0 if crop == name else 0.0 for name in CROP_TEMP_RANGES]
+    features += [1.0 if (recommendations or {}).get(actuator) == 'ON' else 0.0 for actuator in ACTUATORS]
+    return features
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour index of condition vectors keyed by (date, crop, site).
+
+    Uses a chromadb HNSW collection (approximate search) when chromadb is
+    installed. Otherwise, or if a chromadb query fails, it falls back to an
+    exact brute-force search over a NumPy matrix, which scans every vector on
+    each query rather than using an approximate nearest-neighbour index; at
+    the size of the memory store that takes well under a millisecond. Either
+    way the index is held in memory and rebuilt from the memory store.
+    """
+
+    _collection_ids = itertools.count()
+
+    def __init__(self, dimension: int = len(FEATURE_NAMES), backend: str = 'auto'):
+        """
+        Initialize the index.
+
+        Args:
+            dimension: Length of the feature vectors
+            backend: 'chromadb', 'numpy' or 'auto' (chromadb if installed)
+        """
+        if backend == 'chromadb' and chromadb is None:
+            raise ImportError("chromadb is not installed")
+        self.dimension = dimension
+        self.backend = 'chromadb' if backend != 'numpy' and chromadb is not None else 'numpy'
+
+        self._keys: List[Key] = []
+        self._positions: Dict[Key, int] = {}
+        # Entries per crop, so filtered chromadb queries never ask for more than exist
+        self._crop_counts: Dict[str, int] = {}
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._client = None
+        self._collection = None
+        if self.backend == 'chromadb':
+            self._client = chromadb.EphemeralClient()
+            self._collection = self._client.create_collection(
+                f"conditions-{os.getpid()}-{next(self._collection_ids)}",
+                metadata={'hnsw:space': 'l2'},
+                embedding_function=None
+            )
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: Key, vector: Sequence[float]) -> None:
+        """
+        Add or replace the vector of a key.
+
+        Args:
+            key: (date, crop, site)
+            vector: Feature vector
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        if vector.shape != (self.dimension,):
+            raise ValueError(f"Expected a vector of length {self.dimension}, got {vector.shape}")
+
+        position = self._positions.get(key)
+        if position is None:
+            position = len(self._keys)
+            self._keys.append(key)
+            self._positions[key] = position
+            self._crop_counts[key[1]] = self._crop_counts.get(key[1], 0) + 1
+            if position >= len(self._vectors):
+                # Grow the matrix geometrically so adds stay amortized O(1)
+                grown = np.empty((max(16, 2 * len(self._vectors)), self.dimension), dtype=np.float32)
+                grown[:len(self._vectors)] = self._vectors
+                self._vectors = grown
+        self._vectors[position] = vector
+
+        if self._collection is not None:
+            self._collection.upsert(
+                ids=['|'.join(key)],
+                embeddings=[vector.tolist()],
+                metadatas=[{'date': key[0], 'crop': key[1], 'site': key[2]}]
+            )
+
+    def query(self, vector: Sequence[float], k: int = 5, crop: Optional[str] = None,
+              exclude: Optional[Key] = None) -> List[Tuple[Key, float]]:
+        """
+        Find the keys whose vectors are closest to a vector.
+
+        Args:
+            vector: Query feature vector
+            k: Number of neighbours
+            crop: Only keys for this crop
+            exclude: Key to leave out (e.g. the query day itself)
+
+        Returns:
+            List of (key, Euclidean distance), closest first
+        """
+        if not self._keys or k <= 0:
+            return []
+        vector = np.asarray(vector, dtype=np.float32)
+        wanted = k + (exclude is not None)
+
+        available = self._crop_counts.get(crop, 0) if crop is not None else len(self._keys)
+        if available == 0:
+            return []
+
+        neighbours = None
+        if self._collection is not None:
+            try:
+                result = self._collection.query(
+                    query_embeddings=[vector.tolist()],
+                    n_results=min(wanted, available),
+                    where={'crop': crop} if crop is not None else None
+                )
+                # chromadb reports squared L2 distances
+                neighbours = [(tuple(id_.split('|', 2)), float(np.sqrt(max(distance, 0.0))))
+                              for id_, distance in zip(result['ids'][0], result['distances'][0])]
+            except Exception as e:
+                print(f"chromadb query failed, searching exactly instead: {e}")
+        if neighbours is None:
+            neighbours = self._exact_query(vector, wanted, crop)
+
+        return [(key, distance) for key, distance in neighbours if key != exclude][:k]
+
+    def _exact_query(self, vector: np.ndarray, count: int, crop: Optional[str]) -> List[Tuple[Key, float]]:
+        """
+        Find the nearest keys by brute force over every stored vector.
+
+        Args:
+            vector: Query feature vector
+            count: Number of neighbours
+            crop: Only keys for this crop
+
+        Returns:
+            List of (key, Euclidean distance), closest first
+        """
+        vectors = self._vectors[:len(self._keys)]
+        distances = np.sqrt(((vectors - vector) ** 2).sum(axis=1))
+        if crop is not None:
+            distances[[key[1] != crop for key in self._keys]] = np.inf
+        count = min(count, len(distances))
+        nearest = np.argpartition(distances, count - 1)[:count]
+        nearest = nearest[np.argsort(distances[nearest])]
+        return [(self._keys[i], float(distances[i])) for i in nearest if np.isfinite(distances[i])]
+
+    def close(self) -> None:
+        """Drop the chromadb collection, if any."""
+        if self._collection is not None:
+            self._client.delete_collection(self._collection.name)
+            self._collection = None
@@ -3,12 +3,8 @@ Main Streamlit application for the Greenhouse Intelligence System.
 """
 
 import streamlit as st
-import folium
-from streamlit_folium import st_folium
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import sys
 import os
 from datetime import datetime, timedelta
@@ -312,6 +308,12 @@ st.markdown("""
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from agents.coordinator_agent import CoordinatorAgent
 from config import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_RADIUS, CROP_TEMP_RANGES
+from utils.lazy import lazy_import
+
+# Plotting and map libraries are imported when first drawn, not at startup
+folium = lazy_import('folium')
+streamlit_folium = lazy_import('streamlit_folium')
+plt = lazy_import('matplotlib.pyplot')
 
 # Initialize the coordinator agent
 @st.cache_resource
@@ -335,50 +337,52 @@ with st.sidebar.expander("Select Location on Map", expanded=True):
     if 'longitude' not in st.session_state:
         st.session_state.longitude = DEFAULT_LONGITUDE
     
-    # Create a container div for better alignment
-    st.markdown('<div class="map-container">', unsafe_allow_html=True)
+    # The map (and folium) is only loaded once it is asked for
+    if st.checkbox("Show map", value=False, key='show_map'):
+        # Create a container div for better alignment
+        st.markdown('<div class="map-container">', unsafe_allow_html=True)
     
-    # Create a map centered at the default location
-    m = folium.Map(
-        location=[st.session_state.latitude, st.session_state.longitude], 
-        zoom_start=10,
-        tiles=None,  # Start with no tiles
-        width='100%',
-        height='100%'
-    )
+        # Create a map centered at the default location
+        m = folium.Map(
+            location=[st.session_state.latitude, st.session_state.longitude], 
+            zoom_start=10,
+            tiles=None,  # Start with no tiles
+            width='100%',
+            height='100%'
+        )
     
-    # Add OpenStreetMap tile layer
-    folium.TileLayer(
-        tiles='https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png',
-        attr='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors',
-        name='OpenStreetMap',
-        overlay=False,
-        control=True
-    ).add_to(m)
+        # Add OpenStreetMap tile layer
+        folium.TileLayer(
+            tiles='https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png',
+            attr='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors',
+            name='OpenStreetMap',
+            overlay=False,
+            control=True
+        ).add_to(m)
     
-    # Add layer control
-    folium.LayerControl().add_to(m)
+        # Add layer control
+        folium.LayerControl().add_to(m)
     
-    # Add a marker for the selected location
-    folium.Marker(
-        [st.session_state.latitude, st.session_state.longitude],
-        popup="Selected Location",
-        tooltip="Selected Location",
-        icon=folium.Icon(color="green")
-    ).add_to(m)
+        # Add a marker for the selected location
+        folium.Marker(
+            [st.session_state.latitude, st.session_state.longitude],
+            popup="Selected Location",
+            tooltip="Selected Location",
+            icon=folium.Icon(color="green")
+        ).add_to(m)
     
-    # Add circle to show radius
-    folium.Circle(
-        location=[st.session_state.latitude, st.session_state.longitude],
-        radius=DEFAULT_RADIUS * 1000,  # Convert km to meters
-        color="#4CAF50",
-        fill=True,
-        fill_opacity=0.2
-    ).add_to(m)
+        # Add circle to show radius
+        folium.Circle(
+            location=[st.session_state.latitude, st.session_state.longitude],
+            radius=DEFAULT_RADIUS * 1000,  # Convert km to meters
+            color="#4CAF50",
+            fill=True,
+            fill_opacity=0.2
+        ).add_to(m)
     
-    # Display the map with full width
-    st_folium(m, width=None, height=300)
-    st.markdown('</div>', unsafe_allow_html=True)
+        # Display the map with full width
+        streamlit_folium.st_folium(m, width=None, height=300)
+        st.markdown('</div>', unsafe_allow_html=True)
     
     # Manual coordinate input with better alignment
     st.markdown("#### Coordinates")
@@ -415,6 +419,11 @@ st.sidebar.markdown(f"""
 # Data fetching with improved button
 st.sidebar.header("Data")
 days = st.sidebar.slider("Days of Historical Data", min_value=1, max_value=30, value=6)
+area_average = st.sidebar.checkbox(
+    "Average over radius",
+    value=False,
+    help="Fetch the whole area from NASA POWER's regional endpoint and average the grid cells inside the radius"
+)
 
 fetch_button = st.sidebar.button("Fetch NASA Data", use_container_width=True)
 if fetch_button:
@@ -423,7 +432,8 @@ if fetch_button:
             st.session_state.latitude,
             st.session_state.longitude,
             radius,
-            days
+            days,
+            area=area_average
         )
         
         if result['status'] == 'success':
@@ -581,6 +591,14 @@ with tab1:
                     </div>
                     """, unsafe_allow_html=True)
                 
+                # Display the multi-day forecast
+                if 'forecast' in recommendations and len(recommendations['forecast']) > 1:
+                    forecast_df = recommendations['forecast']
+                    st.markdown(f"#### {len(forecast_df)}-Day Forecast")
+                    if forecast_df['date'].notna().all():
+                        forecast_df = forecast_df.set_index('date')
+                    st.line_chart(forecast_df['temperature'].rename('Forecast (°C)'))
+                
                 # Display actuator recommendations with animated status indicators
                 actuators = recommendations['actuator_recommendations']
                 
@@ -892,22 +910,24 @@ with tab3:
             
             st.markdown('</div>', unsafe_allow_html=True)
             
+            # Display forecast accuracy for each day ahead
+            if history['horizon_accuracy']:
+                st.subheader("Forecast Accuracy by Horizon")
+                horizon_df = pd.DataFrame([{
+                    'Days Ahead': horizon,
+                    'MAE (°C)': round(metrics['mae'], 2),
+                    'RMSE (°C)': round(metrics['rmse'], 2),
+                    'Forecasts Scored': metrics['count']
+                } for horizon, metrics in history['horizon_accuracy'].items()])
+                st.dataframe(horizon_df, use_container_width=True)
+            
             # Create a visualization for error trends if we have prediction data
-            if len(history['recent_predictions']) > 1:
-                # Extract data for visualization
-                pred_data = []
-                for pred in history['recent_predictions']:
-                    if pred['actual_temp'] is not None:
-                        pred_data.append({
-                            'date': pred['date'],
-                            'predicted': pred['predicted_temp'],
-                            'actual': pred['actual_temp'],
-                            'error': abs(pred['predicted_temp'] - pred['actual_temp'])
-                        })
+            if len(history['prediction_history']) > 1:
+                # Predictions with a known actual temperature
+                error_df = history['prediction_history'].dropna(subset=['actual_temp'])
+                error_df = error_df.assign(error=error_df['error'].abs()).reset_index(drop=True)
                 
-                if pred_data:
-                    error_df = pd.DataFrame(pred_data)
-                    
+                if not error_df.empty:
                     # Create error trend chart
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                     st.subheader("Prediction Error Trend")
@@ -955,18 +975,15 @@ with tab3:
         # Display recent predictions
         st.subheader("Recent Predictions")
         
-        if history['recent_predictions']:
-            # Create a DataFrame for recent predictions
-            pred_data = []
-            for pred in history['recent_predictions']:
-                pred_data.append({
-                    'Date': pred['date'],
-                    'Crop': pred['crop'],
-                    'Predicted Temperature': pred['predicted_temp'],
-                    'Actual Temperature': pred['actual_temp'] if pred['actual_temp'] is not None else 'N/A'
-                })
-                
-            pred_df = pd.DataFrame(pred_data)
+        if not history['prediction_history'].empty:
+            # Latest predictions as a display table
+            recent = history['prediction_history'].tail(5)
+            pred_df = pd.DataFrame({
+                'Date': recent['date'].dt.strftime('%Y-%m-%d'),
+                'Crop': recent['crop'],
+                'Predicted Temperature': recent['predicted_temp'],
+                'Actual Temperature': recent['actual_temp'].astype(object).where(recent['actual_temp'].notna(), 'N/A')
+            }).reset_index(drop=True)
             
             # Display as a table with improved styling
             st.markdown('<div class="chart-container">', unsafe_allow_html=True)
@@ -1096,23 +1113,36 @@ with tab3:
                 </div>
             </div>
             """, unsafe_allow_html=True)
-            
+
+        # Display past days with conditions like today's
+        similar_days = coordinator.find_similar_conditions()
+        if similar_days:
+            st.subheader("Similar Past Conditions")
+            similar_df = pd.DataFrame([{
+                'Date': day['date'],
+                'Site': day['site'] or 'N/A',
+                'Distance': round(day['distance'], 3),
+                'Fan': day['recommendations'].get('fan', 'N/A'),
+                'Heater': day['recommendations'].get('heater', 'N/A'),
+                'Water Pump': day['recommendations'].get('water_pump', 'N/A'),
+                'Predicted (°C)': f"{day['predicted_temp']:.2f}" if day['predicted_temp'] is not None else 'N/A',
+                'Actual (°C)': f"{day['actual_temp']:.2f}" if day['actual_temp'] is not None else 'N/A'
+            } for day in similar_days])
+            st.dataframe(similar_df, use_container_width=True)
+
         # Display crop history
         st.subheader("Crop Performance History")
         
-        if any(history['crop_history'].values()):
+        if not history['crop_history'].empty:
             # Create tabs for each crop
-            crop_tabs = st.tabs(list(history['crop_history'].keys()))
+            crops = list(history['crop_history']['crop'].unique())
+            crop_tabs = st.tabs(crops)
             
-            for i, crop in enumerate(history['crop_history'].keys()):
+            for i, crop in enumerate(crops):
                 with crop_tabs[i]:
-                    crop_data = history['crop_history'][crop]
+                    df = history['crop_history'][history['crop_history']['crop'] == crop].reset_index(drop=True)
                     
-                    if crop_data:
-                        # Create a DataFrame for the crop history
-                        df = pd.DataFrame(crop_data)
-                        df['date'] = pd.to_datetime(df['date'])
-                        
+                    if not df.empty:
                         # Create a line chart with improved styling
                         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                         
@@ -1244,4 +1274,8 @@ with tab3:
 st.markdown("<div class='footer'>", unsafe_allow_html=True)
 st.markdown("Powered by codexcherry")
 st.markdown("© 2025 Greenhouse Intelligence System")
-st.markdown("</div>", unsafe_allow_html=True) 
\ No newline at end of file
+st.markdown("</div>", unsafe_allow_html=True)
+
+# Warm the configured sites in the background once the first page has rendered,
+# so the refresh and model training never delay it (a no-op while already running)
+coordinator.start_prefetch()
@@ -0,0 +1,87 @@
+"""
+Load-test the POWER fetch, cache and retry paths against the offline stand-in.
+
+Usage:
+    python benchmarks/bench_fetch.py [--sites 24] [--latency 0.2] [--error-rate 0.1]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add the project root to the path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.nasa_data import NASAEarthdata
+from utils.power_cache import PowerCache
+from utils.climate_store import ClimateStore
+from utils.power_stub_server import PowerStubServer
+
+
+def fleet(n_sites: int, days: int):
+    """Spread sites over a band of grid cells, a few of them sharing a cell."""
+    return [(round(10.0 + (i // 2) * 0.7 + (i % 2) * 0.01, 4), round(75.0 + (i // 2) * 0.9, 4), days)
+            for i in range(n_sites)]
+
+
+def run(label: str, func) -> float:
+    """Time a call and print the result line."""
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    errors = len(result['errors']) if isinstance(result, dict) and 'errors' in result else 0
+    print(f"{label:<34} {elapsed * 1000:>9.1f} ms   errors: {errors}")
+    return elapsed
+
+
+def main():
+    """Run the load test and print timings and client latency stats."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sites', type=int, default=24)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.1)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='power-bench-')
+    sites = fleet(args.sites, args.days)
+    try:
+        with PowerStubServer(latency=args.latency, jitter=args.jitter,
+                             error_rate=args.error_rate, seed=1) as server:
+            def client(**kwargs):
+                return NASAEarthdata(
+                    base_url=server.base_url,
+                    cache=PowerCache(os.path.join(workdir, 'cache.db')),
+                    store=ClimateStore(os.path.join(workdir, 'store')),
+                    max_requests_per_second=0,
+                    **kwargs
+                )
+
+            nasa_data = client()
+            sequential = client(use_cache=False)
+
+            print(f"{len(sites)} sites, {args.days} days, latency {args.latency}s, "
+                  f"error rate {args.error_rate:.0%}\n")
+            run("sequential, no cache", lambda: {
+                'errors': [site for site in sites if sequential.get_climate_data(*site[:2], 0, site[2]).empty]
+            })
+            run("concurrent, cold cache", lambda: nasa_data.fetch_many(sites, args.workers))
+            run("concurrent, warm cache", lambda: nasa_data.fetch_many(sites, args.workers))
+
+            # Serve from cache while the API is failing every request
+            server.error_rate = 1.0
+            nasa_data.cache.ttl_seconds = 0
+            run("API down, stale cache", lambda: nasa_data.fetch_many(sites, args.workers))
+
+            print("\nclient stats:", nasa_data.get_request_stats())
+            print("server stats:", server.stats)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Profile the cold-start import time of the app and check it against a budget.
+
+Runs the module-level imports of app/main.py and creates its coordinator in a
+fresh interpreter with ``python -X importtime``, so nothing is cached, against
+a scratch data directory. Prints the slowest imports, and fails (exit status 1)
+when startup exceeds the budget or pulls in a dependency that should be loaded
+lazily.
+
+Usage:
+    python benchmarks/bench_import_time.py [--budget 1.5] [--repeat 3] [--top 15]
+"""
+
+import argparse
+import ast
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP_FILE = os.path.join(ROOT, 'app', 'main.py')
+
+# Heavy dependencies that must only be imported on first use
+DEFERRED_MODULES = ['tensorflow', 'keras', 'sklearn', 'xarray', 'matplotlib', 'seaborn', 'folium', 'chromadb']
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def startup_statement(app_file: str = APP_FILE) -> str:
+    """
+    Build the code the app runs before its first render: its module-level
+    imports and the coordinator it creates.
+
+    Args:
+        app_file: Path of the Streamlit app
+
+    Returns:
+        Python statement
+    """
+    with open(app_file, 'r') as f:
+        tree = ast.parse(f.read())
+    imports = [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return '; '.join(imports + ['CoordinatorAgent()'])
+
+
+def profile(statement: str, data_dir: str) -> Tuple[float, List[Tuple[str, int, int, int]]]:
+    """
+    Run a statement in a fresh interpreter with import timing enabled.
+
+    Args:
+        statement: Python code to run
+        data_dir: Data directory the app writes to
+
+    Returns:
+        Tuple of (wall time in seconds, list of (module, self us, cumulative us, nesting depth))
+    """
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            cwd=ROOT, capture_output=True, text=True,
+                            env={**os.environ, 'GREENINTEL_DATA_DIR': data_dir})
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Import failed:\n{result.stderr[-2000:]}")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return elapsed, imports
+
+
+def main():
+    """Profile startup imports and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget', type=float, default=1.5, help="startup budget in seconds")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--statement', default=None, help="code to profile (defaults to the app's startup)")
+    args = parser.parse_args()
+    statement = args.statement or startup_statement()
+
+    # Best of several runs, reporting the import profile of the fastest; a
+    # scratch data directory keeps the real caches and stores untouched
+    data_dir = tempfile.mkdtemp(prefix='import-bench-')
+    try:
+        runs = [profile(statement, data_dir) for _ in range(args.repeat)]
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    elapsed, imports = min(runs, key=lambda run: run[0])
+
+    # Attribute every module's own import time to its top-level package
+    by_package: Dict[str, int] = {}
+    for module, self_us, _, _ in imports:
+        root = module.split('.')[0]
+        by_package[root] = by_package.get(root, 0) + self_us
+
+    print(f"{statement}\n")
+    print(f"{'package':<34} {'self time':>12}")
+    for module, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{module:<34} {self_us / 1000:>9.1f} ms")
+
+    loaded = sorted({module.split('.')[0] for module, *_ in imports} & set(DEFERRED_MODULES))
+    print(f"\nmodules imported: {len(imports)}")
+    print(f"startup time:     {elapsed * 1000:.0f} ms (budget {args.budget * 1000:.0f} ms)")
+    print(f"deferred modules imported eagerly: {', '.join(loaded) or 'none'}")
+
+    if elapsed > args.budget or loaded:
+        print("\nFAIL")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark the vectorized POWER JSON parser against the original per-key loop.
+
+Usage:
+    python benchmarks/bench_power_parser.py [--years 5] [--repeat 5]
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to the path so we can import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import POWER_DAILY_PARAMETERS
+from utils.nasa_data import NASAEarthdata
+
+
+def make_payload(years: int, seed: int = 0) -> dict:
+    """Build a synthetic POWER parameter dictionary covering several years."""
+    rng = np.random.default_rng(seed)
+    start = datetime.date(2000, 1, 1)
+    stamps = [(start + datetime.timedelta(days=i)).strftime("%Y%m%d") for i in range(365 * years)]
+
+    payload = {}
+    for parameter in POWER_DAILY_PARAMETERS:
+        values = rng.uniform(0.1, 35.0, len(stamps)).round(2)
+        values[rng.random(len(stamps)) < 0.02] = -999  # Sprinkle missing values
+        payload[parameter] = dict(zip(stamps, values.tolist()))
+    return payload
+
+
+def legacy_parse(parameter_data: dict) -> pd.DataFrame:
+    """The original loop: strptime, -999 check and list appends for every entry."""
+    columns = {}
+    for parameter, values in parameter_data.items():
+        dates = []
+        parsed = []
+        for date_str, value in values.items():
+            if date_str != 'units':
+                try:
+                    date = datetime.datetime.strptime(date_str, "%Y%m%d")
+                    if float(value) == -999:
+                        continue
+                    dates.append(date)
+                    parsed.append(float(value))
+                except (ValueError, TypeError):
+                    pass
+        columns[parameter] = pd.Series(parsed, index=dates, dtype=float)
+    return pd.DataFrame(columns).sort_index()
+
+
+def time_call(func, payload: dict, repeat: int) -> float:
+    """Return the best wall time of several runs in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(payload)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000.0
+
+
+def main():
+    """Run the benchmark and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Parsing only; keep the synthetic payloads out of the real cache and climate store
+    nasa_data = NASAEarthdata(use_cache=False, use_store=False)
+
+    print(f"{'years':>6} {'values':>9} {'loop ms':>10} {'vectorized ms':>14} {'speedup':>8}")
+    for years in args.years:
+        payload = make_payload(years)
+
+        # Both parsers must keep the same temperature values
+        expected = legacy_parse(payload)['T2M'].dropna()
+        actual = nasa_data._parse_daily_parameters(payload).set_index('date')['temperature']
+        np.testing.assert_allclose(actual.values, expected.values)
+
+        loop_ms = time_call(legacy_parse, payload, args.repeat)
+        vectorized_ms = time_call(nasa_data._parse_daily_parameters, payload, args.repeat)
+        n_values = sum(len(values) for values in payload.values())
+        print(f"{years:>6} {n_values:>9} {loop_ms:>10.1f} {vectorized_ms:>14.1f} {loop_ms / vectorized_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
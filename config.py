@@ -2,6 +2,8 @@
 Configuration settings for the Greenhouse Intelligence System.
 """
 
+import os
+
 # NASA Earthdata API credentials
 NASA_API_KEY = "Your_API_KEY"
 
@@ -11,8 +13,18 @@ DEFAULT_LONGITUDE = 77.59
 DEFAULT_RADIUS = 10  # km
 
 # Data settings
+# Root of the caches, stores and models the app writes; point it at a scratch
+# directory when running against the offline stand-in
+DATA_DIR = os.environ.get("GREENINTEL_DATA_DIR", "data")
 DATA_DAYS = 6  # Number of days of historical data to fetch
 
+# Background prefetch of configured sites
+PREFETCH_SITES = [(DEFAULT_LATITUDE, DEFAULT_LONGITUDE)]  # (lat, lon) pairs
+PREFETCH_DAYS = 30  # Days of data refreshed per site
+PREFETCH_UPDATE_HOUR_UTC = 6  # Refresh shortly after POWER's daily update
+PREFETCH_INTERVAL_HOURS = 24
+PREFETCH_REQUEST_BUDGET = 100  # Maximum POWER request attempts (retries included) per refresh cycle
+
 # Crop temperature ranges (°C)
 CROP_TEMP_RANGES = {
     "Lettuce": (16, 20),
@@ -25,6 +37,62 @@ CROP_TEMP_RANGES = {
 # NASA POWER API parameters
 # We don't need specific dataset IDs for the POWER API
 # as we specify parameters directly in the API call
+# Set POWER_BASE_URL to point at the offline stand-in (utils/power_stub_server.py)
+POWER_BASE_URL = os.environ.get("POWER_BASE_URL", "https://power.larc.nasa.gov/api")
+POWER_COMMUNITY = "AG"  # Agricultural community
+
+# Daily parameters requested together in a single call per location
+POWER_DAILY_PARAMETERS = [
+    "T2M", "T2M_MAX", "T2M_MIN",  # Temperature
+    "GWETROOT", "GWETPROF", "GWETTOP",  # Soil moisture (root zone, profile, top layer)
+    "RH2M", "PRECTOTCORR"  # Humidity and precipitation
+]
+
+# Hourly parameters and the number of days fetched per streamed chunk
+POWER_HOURLY_PARAMETERS = ["T2M", "RH2M", "PRECTOTCORR"]
+POWER_HOURLY_CHUNK_DAYS = 30
+
+# POWER grid resolution in degrees (latitude, longitude)
+POWER_GRID_RESOLUTION = (0.5, 0.625)
+
+# Regional (bounding box) requests
+POWER_REGIONAL_PARAMETERS = ["T2M", "T2M_MAX", "T2M_MIN", "GWETROOT"]
+POWER_REGIONAL_PARAMETERS_PER_REQUEST = 1  # POWER limits parameters per regional request
+POWER_REGIONAL_MIN_SPAN = 2.0  # Minimum bounding box size in degrees accepted by POWER
+
+# POWER response cache
+POWER_CACHE_FILE = os.path.join(DATA_DIR, "power_cache.db")
+POWER_PROVISIONAL_DAYS = 7  # Trailing days NASA may still revise
+POWER_CACHE_TTL_HOURS = 6  # Lifetime of cached provisional values
+
+# Local columnar store of fetched daily climate data
+CLIMATE_STORE_DIR = os.path.join(DATA_DIR, "climate_store")
+CLIMATE_TRAINING_DAYS = 3 * 365  # History window used for training when available
+HOURLY_TRAINING_DAYS = 365  # History window streamed for the hourly model
+
+# NetCDF downloads for large backfills
+POWER_NETCDF_DIR = os.path.join(DATA_DIR, "netcdf")
+POWER_NETCDF_CHUNK_DAYS = 366  # Time chunk size when dask is available
+
+# POWER HTTP client
+POWER_CONNECT_TIMEOUT = 5  # seconds
+POWER_READ_TIMEOUT = 60  # seconds
+POWER_MAX_RETRIES = 3  # Retries on 429 and 5xx responses
+POWER_BACKOFF_FACTOR = 0.5  # Exponential backoff base in seconds
+POWER_POOL_SIZE = 10  # Keep-alive connections per host
+POWER_MAX_WORKERS = 8  # Concurrent site fetches in a batch
+POWER_MAX_REQUESTS_PER_SECOND = 5  # Global request rate limit
+
+# Prediction and recommendation memory
+MEMORY_DB_FILE = os.path.join(DATA_DIR, "memory.db")
+MEMORY_LEGACY_FILE = os.path.join(DATA_DIR, "memory.json")  # Imported once into MEMORY_DB_FILE
+MEMORY_FLUSH_INTERVAL_SECONDS = 2.0  # Delay before journaled writes reach the database (0 writes through)
+MEMORY_FLUSH_MAX_PENDING = 100  # Flush early once this many writes are waiting
+MEMORY_RETENTION_DAYS = 90  # Recommendations and crop history kept in full detail
+MEMORY_WEEKLY_ROLLUP_DAYS = 365  # Age after which daily rollups are merged into weekly ones
+MEMORY_COMPACT_INTERVAL_HOURS = 24
+MEMORY_HISTORY_LIMIT = 30  # Latest predictions and crop history entries shown in the History tab
+MEMORY_SIMILARITY_BACKEND = "auto"  # Similar-conditions index: "chromadb", "numpy" or "auto"
 
 # Model settings
 MODEL_PARAMS = {
@@ -36,4 +104,12 @@ MODEL_PARAMS = {
         "batch_size": 32,
         "validation_split": 0.2
     }
-} 
\ No newline at end of file
+}
+
+FORECAST_HORIZON_DAYS = 7  # Days forecast directly by the daily model's multi-output head
+
+# Per-site model registry
+MODEL_REGISTRY_DIR = os.path.join(DATA_DIR, "models")
+MODEL_RETRAIN_DAYS = 30  # Full retrain after this many days even without drift
+MODEL_FINE_TUNE_EPOCHS = 10  # Epochs when fine-tuning on newly arrived days
+MODEL_DRIFT_FACTOR = 2.0  # Full retrain when the error on new days exceeds this multiple of the training error
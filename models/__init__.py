@@ -3,7 +3,10 @@ Models module initialization.
 """
 
 from .temperature_predictor import TemperaturePredictor
+from .gru_engine import GRUEngine, export_gru
 
 __all__ = [
-    'TemperaturePredictor'
+    'TemperaturePredictor',
+    'GRUEngine',
+    'export_gru'
 ] 
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+NumPy inference engine for the trained GRU temperature model.
+"""
+
+import numpy as np
+from typing import Any, Dict, List
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    """Logistic sigmoid."""
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def gru_arrays(model: Any, scaler: Any) -> Dict[str, np.ndarray]:
+    """
+    Collect the weights of a trained GRU model and its scaler.
+
+    Args:
+        model: Keras Sequential model of GRU layers followed by a Dense layer
+        scaler: MinMaxScaler fitted on the training temperatures
+
+    Returns:
+        Dictionary of arrays for GRUEngine
+    """
+    arrays = {}
+    n_gru = 0
+    for layer in model.layers:
+        config = layer.get_config()
+        weights = layer.get_weights()
+        if not weights:
+            continue  # Dropout and other weightless layers do nothing at inference
+
+        if 'recurrent_activation' in config:
+            # Keras GRU defaults: z, r, h gate order with separate input and recurrent biases
+            if not config.get('reset_after', True) or config['activation'] != 'tanh' \
+                    or config['recurrent_activation'] != 'sigmoid':
+                raise ValueError(f"Unsupported GRU configuration in layer {layer.name}")
+            kernel, recurrent_kernel, bias = weights
+            arrays[f'gru{n_gru}_kernel'] = kernel
+            arrays[f'gru{n_gru}_recurrent_kernel'] = recurrent_kernel
+            arrays[f'gru{n_gru}_bias'] = bias
+            n_gru += 1
+        elif config.get('activation', 'linear') == 'linear' and len(weights) == 2:
+            arrays['dense_kernel'], arrays['dense_bias'] = weights
+        else:
+            raise ValueError(f"Unsupported layer {layer.name}")
+
+    if 'dense_kernel' not in arrays:
+        raise ValueError("Model has no output Dense layer")
+
+    arrays['n_gru'] = np.array(n_gru)
+    arrays['feature_range'] = np.array(scaler.feature_range, dtype=np.float64)
+    arrays['data_min'] = np.asarray(scaler.data_min_, dtype=np.float64)
+    arrays['data_max'] = np.asarray(scaler.data_max_, dtype=np.float64)
+    return arrays
+
+
+def export_gru(model: Any, scaler: Any, filepath: str) -> None:
+    """
+    Export the weights of a trained GRU model and its scaler to a .npz file.
+
+    Args:
+        model: Keras Sequential model of GRU layers followed by a Dense layer
+        scaler: MinMaxScaler fitted on the training temperatures
+        filepath: Path of the .npz file
+    """
+    np.savez(filepath, **gru_arrays(model, scaler))
+
+
+class GRUEngine:
+    """
+    Forward pass of the exported GRU model in plain NumPy.
+
+    Reproduces Keras inference (dropout off) for stacked GRU layers with
+    reset_after=True followed by a linear Dense layer, and applies the
+    model's MinMax scaling itself, so serving needs neither TensorFlow nor
+    scikit-learn.
+
+    Engines of models with the same architecture can be combined with
+    GRUEngine.stack into one engine whose weights and scalers carry a leading
+    model axis; it scores row i of a batch with model i in a single pass.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """
+        Initialize the engine.
+
+        Args:
+            arrays: Arrays from gru_arrays (as written by export_gru)
+        """
+        # Biases get a time/row axis so they broadcast against (batch, 1, units)
+        self.layers: List[Dict[str, np.ndarray]] = []
+        for i in range(int(arrays['n_gru'])):
+            bias = arrays[f'gru{i}_bias'].astype(np.float32)
+            self.layers.append({
+                'kernel': arrays[f'gru{i}_kernel'].astype(np.float32),
+                'recurrent_kernel': arrays[f'gru{i}_recurrent_kernel'].astype(np.float32),
+                'input_bias': bias[..., 0:1, :],
+                'recurrent_bias': bias[..., 1:2, :]
+            })
+        self.dense_kernel = arrays['dense_kernel'].astype(np.float32)
+        self.dense_bias = arrays['dense_bias'].astype(np.float32)[..., np.newaxis, :]
+
+        # Scalers are kept as (models, features), with one row for a single model
+        low, high = np.moveaxis(np.asarray(arrays['feature_range'], dtype=np.float64), -1, 0)
+        low, high = np.reshape(low, (-1, 1)), np.reshape(high, (-1, 1))
+        self.data_min = np.atleast_2d(arrays['data_min'])
+        data_range = np.atleast_2d(arrays['data_max']) - self.data_min
+        # MinMaxScaler leaves constant features unscaled
+        data_range = np.where(data_range == 0, 1.0, data_range)
+        self.scale = (high - low) / data_range
+        self.min = low - self.data_min * self.scale
+        self.arrays = arrays
+
+    @classmethod
+    def load(cls, filepath: str) -> 'GRUEngine':
+        """
+        Load an engine from a .npz file written by export_gru.
+
+        Args:
+            filepath: Path of the .npz file
+
+        Returns:
+            GRU engine
+        """
+        with np.load(filepath) as data:
+            return cls({name: data[name] for name in data.files})
+
+    @classmethod
+    def stack(cls, engines: List['GRUEngine']) -> 'GRUEngine':
+        """
+        Combine single-model engines into one that scores row i of a batch
+        with engine i.
+
+        Args:
+            engines: Engines of models with the same architecture
+
+        Returns:
+            Stacked GRU engine
+        """
+        first = engines[0].arrays
+        stacked = {'n_gru': first['n_gru']}
+        for name in first:
+            if name != 'n_gru':
+                stacked[name] = np.stack([engine.arrays[name] for engine in engines])
+        return cls(stacked)
+
+    @property
+    def signature(self) -> tuple:
+        """Shapes of a single model's weights; engines with equal signatures can be stacked."""
+        return tuple((name, np.shape(value)) for name, value in sorted(self.arrays.items()))
+
+    @property
+    def outputs(self) -> int:
+        """Number of values the model predicts per window (its forecast horizon)."""
+        return int(self.dense_kernel.shape[-1])
+
+    def forward(self, X: np.ndarray) -> np.ndarray:
+        """
+        Run the model on scaled input sequences.
+
+        Args:
+            X: Array of shape (batch, sequence_length, features)
+
+        Returns:
+            Scaled outputs of shape (batch, outputs)
+        """
+        sequences = np.asarray(X, dtype=np.float32)
+        for layer in self.layers:
+            units = layer['recurrent_kernel'].shape[-2]
+            # Input projections of every time step in one (batched) matrix product
+            inputs = sequences @ layer['kernel'] + layer['input_bias']
+            h = np.zeros((sequences.shape[0], 1, units), dtype=np.float32)
+            outputs = []
+            for t in range(sequences.shape[1]):
+                x_z, x_r, x_h = np.split(inputs[:, t:t + 1], 3, axis=-1)
+                h_z, h_r, h_h = np.split(h @ layer['recurrent_kernel'] + layer['recurrent_bias'], 3, axis=-1)
+                z = _sigmoid(x_z + h_z)
+                r = _sigmoid(x_r + h_r)
+                h = z * h + (1.0 - z) * np.tanh(x_h + r * h_h)
+                outputs.append(h)
+            sequences = np.concatenate(outputs, axis=1)
+
+        return (sequences[:, -1:] @ self.dense_kernel + self.dense_bias)[:, 0]
+
+    def transform(self, values: np.ndarray) -> np.ndarray:
+        """Scale (batch, sequence_length, features) temperatures like the model's MinMaxScaler."""
+        return np.asarray(values, dtype=np.float64) * self.scale[:, np.newaxis] + self.min[:, np.newaxis]
+
+    def inverse_transform(self, values: np.ndarray) -> np.ndarray:
+        """Undo the model's MinMax scaling of (batch, outputs) values."""
+        return (np.asarray(values, dtype=np.float64) - self.min) / self.scale
+
+    def predict(self, windows: np.ndarray) -> np.ndarray:
+        """
+        Predict the next value of unscaled temperature windows.
+
+        Args:
+            windows: Array of shape (sequence_length,) or (batch, sequence_length);
+                     a stacked engine needs one window per model
+
+        Returns:
+            Predicted temperatures, one per window
+        """
+        return self.predict_horizon(windows)[:, 0]
+
+    def predict_horizon(self, windows: np.ndarray) -> np.ndarray:
+        """
+        Predict every output of the model (e.g. each day of a forecast
+        horizon) for unscaled temperature windows.
+
+        Args:
+            windows: Array of shape (sequence_length,) or (batch, sequence_length);
+                     a stacked engine needs one window per model
+
+        Returns:
+            Predicted temperatures of shape (batch, outputs)
+        """
+        windows = np.atleast_2d(np.asarray(windows, dtype=np.float64))
+        scaled = self.transform(windows[..., np.newaxis])
+        return self.inverse_transform(self.forward(scaled))
@@ -4,31 +4,47 @@ GRU-based model for temperature prediction.
 
 import numpy as np
 import pandas as pd
-from typing import Tuple, List, Dict, Any
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import GRU, Dense, Dropout
-from sklearn.preprocessing import MinMaxScaler
+from typing import Tuple, List, Dict, Any, Callable, Iterable, Union
+import json
 import sys
 import os
 
 # Add the project root to the path so we can import the config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import MODEL_PARAMS
+from models.gru_engine import GRUEngine, gru_arrays, export_gru
+from utils.lazy import lazy_import
+
+# Only training and Keras model loading need these; NumPy engine predictions do not
+tf = lazy_import('tensorflow')
+preprocessing = lazy_import('sklearn.preprocessing')
 
 class TemperaturePredictor:
-    """GRU-based model for predicting next-day temperature."""
+    """
+    GRU-based model for predicting temperature over the next few days.
+    
+    A Dense head with one output per day forecasts the whole horizon directly
+    in a single forward pass; with a horizon of 1 it is a next-day model.
+    """
     
-    def __init__(self, params: Dict[str, Any] = None):
+    def __init__(self, params: Dict[str, Any] = None, horizon: int = 1, interval: str = '1D'):
         """
         Initialize the temperature predictor.
         
         Args:
             params: Model hyperparameters
+            horizon: Number of days forecast (outputs of the model)
+            interval: Spacing of consecutive values, as a pandas offset ('1D' or '1h')
         """
         self.params = params or MODEL_PARAMS['gru']
+        self.horizon = horizon
+        self.interval = pd.Timedelta(interval)
         self.model = None
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
+        # MinMaxScaler, created when the model is fitted or loaded
+        self.scaler = None
+        
+        # NumPy copy of the trained model used for prediction
+        self.engine = None
         
     def _create_sequences(self, data: np.ndarray, seq_length: int = 5) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -39,14 +55,52 @@ class TemperaturePredictor:
             seq_length: Sequence length for input
             
         Returns:
-            Tuple of (X, y) where X is the input sequences and y is the target values
+            Tuple of (X, y) where X is the input sequences and y holds the
+            following horizon values of each sequence
         """
         X, y = [], []
-        for i in range(len(data) - seq_length):
+        for i in range(len(data) - seq_length - self.horizon + 1):
             X.append(data[i:i + seq_length])
-            y.append(data[i + seq_length])
+            y.append(data[i + seq_length:i + seq_length + self.horizon, 0])
         return np.array(X), np.array(y)
     
+    @staticmethod
+    def _split_runs(temperatures: np.ndarray) -> List[np.ndarray]:
+        """
+        Split a daily series at missing days into runs of consecutive days.
+        
+        Args:
+            temperatures: Array of daily temperatures (NaN for missing days)
+            
+        Returns:
+            List of arrays of consecutive valid temperatures
+        """
+        valid = np.concatenate([[False], ~np.isnan(temperatures), [False]])
+        # Each run starts where valid turns on and ends where it turns off
+        edges = np.flatnonzero(np.diff(valid.astype(np.int8)))
+        return [temperatures[start:end] for start, end in zip(edges[::2], edges[1::2])]
+    
+    def _run_sequences(self, temperatures: np.ndarray, sequence_length: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Create scaled sequences from a daily series with missing days, so no
+        sequence or target spans a gap.
+        
+        Args:
+            temperatures: Array of daily temperatures (NaN for missing days)
+            sequence_length: Sequence length for input
+            
+        Returns:
+            Tuple of (X, y) over all runs long enough for a sequence and its targets
+        """
+        needed = sequence_length + self.horizon
+        runs = [run for run in self._split_runs(temperatures) if len(run) >= needed]
+        if not runs:
+            raise ValueError(f"Not enough consecutive days. Need a run of at least {needed}")
+        
+        sequences = [self._create_sequences(self.scaler.transform(run.reshape(-1, 1)), sequence_length)
+                     for run in runs]
+        return np.concatenate([X for X, _ in sequences]), np.concatenate([y for _, y in sequences])
+    
     def build_model(self, input_shape: Tuple[int, int]) -> None:
         """
         Build the GRU model.
@@ -54,20 +108,20 @@ class TemperaturePredictor:
         Args:
             input_shape: Shape of input data (sequence_length, features)
         """
-        model = Sequential()
-        model.add(GRU(
+        model = tf.keras.models.Sequential()
+        model.add(tf.keras.layers.GRU(
             units=self.params['units'],
             dropout=self.params['dropout'],
             recurrent_dropout=self.params['recurrent_dropout'],
             return_sequences=True,
             input_shape=input_shape
         ))
-        model.add(GRU(
+        model.add(tf.keras.layers.GRU(
             units=self.params['units'] // 2,
             dropout=self.params['dropout'],
             recurrent_dropout=self.params['recurrent_dropout']
         ))
-        model.add(Dense(1))
+        model.add(tf.keras.layers.Dense(self.horizon))
         
         model.compile(optimizer='adam', loss='mse')
         self.model = model
@@ -98,35 +152,215 @@ class TemperaturePredictor:
             # Drop any NaN values
             df = df.dropna(subset=['temperature'])
             
-            if len(df) < sequence_length + 1:
-                raise ValueError(f"Not enough data points after cleaning. Need at least {sequence_length + 1}, got {len(df)}")
+            return self._fit(df['temperature'].values, sequence_length)
             
-            # Scale the data
-            data = self.scaler.fit_transform(df[['temperature']].values)
+        except Exception as e:
+            print(f"Error training temperature model: {e}")
+            # Return dummy history to avoid breaking the app
+            return {'loss': [0], 'val_loss': [0]}
+        
+    def train_values(self, temperatures: np.ndarray, sequence_length: int = 5) -> Dict[str, Any]:
+        """
+        Train the model on an array of daily temperatures, such as a slice of
+        the local climate store. Sequences are built within each run of
+        consecutive days, so missing (NaN) days are never bridged.
+        
+        Args:
+            temperatures: Array of daily temperatures
+            sequence_length: Length of input sequences
+            
+        Returns:
+            Training history
+        """
+        try:
+            temperatures = np.asarray(temperatures, dtype=float)
+            return self._fit(temperatures, sequence_length)
+            
+        except Exception as e:
+            print(f"Error training temperature model: {e}")
+            # Return dummy history to avoid breaking the app
+            return {'loss': [0], 'val_loss': [0]}
+        
+    def train_stream(self, chunk_factory: Callable[[], Iterable[Union[pd.DataFrame, np.ndarray]]],
+                     sequence_length: int = 5, epochs: int = None) -> Dict[str, Any]:
+        """
+        Train the model on a stream of temperature chunks without holding the
+        whole series in memory.
+        
+        The factory is called once to fit the scaler and then once per epoch,
+        so it should return a fresh iterator each time (for example
+        NASAEarthdata.iter_hourly_data, which re-reads chunks from the cache).
+        
+        Args:
+            chunk_factory: Callable returning an iterable of DataFrames with a
+                           'temperature' column or arrays of temperatures
+            sequence_length: Length of input sequences
+            epochs: Number of epochs (defaults to the model parameters)
             
-            # Create sequences
-            X, y = self._create_sequences(data, sequence_length)
+        Returns:
+            Training history
+        """
+        try:
+            # First pass: fit the scaler on running min/max only
+            self.scaler = preprocessing.MinMaxScaler(feature_range=(0, 1))
+            n_samples = 0
+            for chunk in chunk_factory():
+                values = self._chunk_values(chunk)
+                if len(values):
+                    self.scaler.partial_fit(values.reshape(-1, 1))
+                    n_samples += len(values)
+                    
+            if n_samples < sequence_length + self.horizon:
+                raise ValueError(f"Not enough data points in stream. Need at least {sequence_length + self.horizon}, got {n_samples}")
             
             # Build model if not already built
             if self.model is None:
-                self.build_model((X.shape[1], X.shape[2]))
-                
-            # Train model
-            history = self.model.fit(
-                X, y,
-                epochs=self.params['epochs'],
-                batch_size=self.params['batch_size'],
-                validation_split=self.params['validation_split'],
-                verbose=1
-            )
+                self.build_model((sequence_length, 1))
+            
+            # Sequences are generated chunk by chunk on every epoch
+            dataset = tf.data.Dataset.from_generator(
+                lambda: self._stream_sequences(chunk_factory, sequence_length),
+                output_signature=(
+                    tf.TensorSpec(shape=(None, sequence_length, 1), dtype=tf.float32),
+                    tf.TensorSpec(shape=(None, self.horizon), dtype=tf.float32)
+                )
+            ).unbatch().batch(self.params['batch_size']).prefetch(tf.data.AUTOTUNE)
             
+            history = self.model.fit(dataset, epochs=epochs or self.params['epochs'], verbose=1)
+            self._update_engine()
             return history.history
             
         except Exception as e:
-            print(f"Error training temperature model: {e}")
+            print(f"Error training temperature model on stream: {e}")
             # Return dummy history to avoid breaking the app
             return {'loss': [0], 'val_loss': [0]}
         
+    def _stream_sequences(self, chunk_factory: Callable[[], Iterable[Union[pd.DataFrame, np.ndarray]]],
+                          sequence_length: int):
+        """
+        Yield scaled (X, y) sequence batches for each chunk of a stream,
+        carrying the tail of each chunk over so sequences span chunk borders.
+        
+        Args:
+            chunk_factory: Callable returning an iterable of chunks
+            sequence_length: Length of input sequences
+            
+        Yields:
+            Tuple of (X, y) arrays for one chunk
+        """
+        tail = np.empty((0, 1))
+        for chunk in chunk_factory():
+            values = self._chunk_values(chunk)
+            if not len(values):
+                continue
+            
+            data = np.concatenate([tail, self.scaler.transform(values.reshape(-1, 1))])
+            if len(data) >= sequence_length + self.horizon:
+                X, y = self._create_sequences(data, sequence_length)
+                yield X.astype(np.float32), y.astype(np.float32)
+            # Keep every sequence whose targets run into the next chunk
+            tail = data[-(sequence_length + self.horizon - 1):]
+            
+    @staticmethod
+    def _chunk_values(chunk: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """
+        Get the valid temperatures of a stream chunk.
+        
+        Args:
+            chunk: DataFrame with a 'temperature' column or array of temperatures
+            
+        Returns:
+            Array of temperatures without missing values
+        """
+        if isinstance(chunk, pd.DataFrame):
+            values = pd.to_numeric(chunk['temperature'], errors='coerce').to_numpy(dtype=float)
+        else:
+            values = np.asarray(chunk, dtype=float)
+        return values[~np.isnan(values)]
+        
+    def _fit(self, temperatures: np.ndarray, sequence_length: int) -> Dict[str, Any]:
+        """
+        Scale the temperatures, build sequences and fit the model.
+        
+        Args:
+            temperatures: Array of daily temperatures (NaN for missing days)
+            sequence_length: Length of input sequences
+            
+        Returns:
+            Training history
+        """
+        valid = temperatures[~np.isnan(temperatures)]
+        if len(valid) < sequence_length + self.horizon:
+            raise ValueError(f"Not enough data points after cleaning. Need at least {sequence_length + self.horizon}, got {len(valid)}")
+        
+        # Scale the data
+        self.scaler = preprocessing.MinMaxScaler(feature_range=(0, 1))
+        self.scaler.fit(valid.reshape(-1, 1))
+        
+        # Create sequences within each run of consecutive days
+        X, y = self._run_sequences(temperatures, sequence_length)
+        
+        # Build model if not already built
+        if self.model is None:
+            self.build_model((X.shape[1], X.shape[2]))
+            
+        # Train model
+        history = self.model.fit(
+            X, y,
+            epochs=self.params['epochs'],
+            batch_size=self.params['batch_size'],
+            validation_split=self.params['validation_split'],
+            verbose=1
+        )
+        self._update_engine()
+        
+        return history.history
+        
+    def fine_tune(self, temperatures: np.ndarray, sequence_length: int = 5, epochs: int = 10) -> Dict[str, Any]:
+        """
+        Continue training the model on newly arrived days, keeping the fitted
+        scaler so the model's inputs keep their meaning.
+        
+        Args:
+            temperatures: Array of daily temperatures, starting
+                          sequence_length + horizon - 1 days before the first new day
+                          (NaN for missing days)
+            sequence_length: Length of input sequences
+            epochs: Number of epochs
+            
+        Returns:
+            Training history
+        """
+        if self.model is None:
+            raise ValueError("Model has not been trained yet")
+            
+        X, y = self._run_sequences(np.asarray(temperatures, dtype=float), sequence_length)
+        history = self.model.fit(X, y, epochs=epochs, batch_size=self.params['batch_size'], verbose=0)
+        self._update_engine()
+        return history.history
+        
+    def evaluate_values(self, temperatures: np.ndarray, sequence_length: int = 5) -> float:
+        """
+        Get the mean absolute error of next-day predictions over a series.
+        
+        Args:
+            temperatures: Array of daily temperatures (NaN for missing days)
+            sequence_length: Length of input sequences
+            
+        Returns:
+            Mean absolute error in °C
+        """
+        if self.model is None:
+            raise ValueError("Model has not been trained yet")
+            
+        X, y = self._run_sequences(np.asarray(temperatures, dtype=float), sequence_length)
+        predictions = self._inverse_transform(self.model.predict(X, verbose=0))
+        return float(np.mean(np.abs(predictions[:, 0] - self._inverse_transform(y)[:, 0])))
+        
+    def _inverse_transform(self, values: np.ndarray) -> np.ndarray:
+        """Undo the scaling of an array of model outputs, one temperature per element."""
+        return self.scaler.inverse_transform(values.reshape(-1, 1)).reshape(values.shape)
+        
     def predict_next_day(self, df: pd.DataFrame, sequence_length: int = 5) -> float:
         """
         Predict the next day's temperature.
@@ -138,29 +372,66 @@ class TemperaturePredictor:
         Returns:
             Predicted temperature for the next day
         """
+        return self.predict_horizon(df, sequence_length)[0]
+        
+    def latest_window(self, df: pd.DataFrame, sequence_length: int = 5) -> np.ndarray:
+        """
+        Get the temperatures of the latest sequence_length consecutive values.
+        
+        Missing days may be NaN or absent rows; with a 'date' column the
+        window's dates must be one interval apart.
+        
+        Args:
+            df: DataFrame with a 'temperature' and, optionally, a 'date' column
+            sequence_length: Length of input sequences
+            
+        Returns:
+            Array of the latest sequence_length temperatures
+            
+        Raises:
+            ValueError: If there are too few values or the window has a gap
+        """
+        if df.empty or 'temperature' not in df.columns:
+            raise ValueError("DataFrame must contain 'temperature' column with data")
+            
+        window = pd.to_numeric(df['temperature'], errors='coerce').to_numpy(dtype=float)[-sequence_length:]
+        if len(window) < sequence_length:
+            raise ValueError(f"Not enough data points. Need at least {sequence_length}, got {len(window)}")
+        if np.isnan(window).any():
+            raise ValueError("Missing days in the latest window")
+        if 'date' in df.columns:
+            steps = np.diff(pd.to_datetime(df['date'].iloc[-sequence_length:]).to_numpy())
+            if (steps != self.interval.to_timedelta64()).any():
+                raise ValueError("Missing days in the latest window")
+        return window
+        
+    def predict_horizon(self, df: pd.DataFrame, sequence_length: int = 5) -> List[float]:
+        """
+        Predict the temperature of each day in the horizon.
+        
+        Args:
+            df: DataFrame with recent temperature data
+            sequence_length: Length of input sequences
+            
+        Returns:
+            Predicted temperatures for the next horizon days
+            
+        Raises:
+            ValueError: If df has no window of consecutive values to predict from
+        """
+        # A window with missing days would be scored as if its days were consecutive
+        window = self.latest_window(df, sequence_length)
+        
         try:
-            if self.model is None:
+            if self.model is None and self.engine is None:
                 raise ValueError("Model has not been trained yet")
-                
-            # Check if DataFrame is valid
-            if df.empty:
-                raise ValueError("DataFrame is empty")
-                
-            # Ensure temperature column exists and has numeric values
-            if 'temperature' not in df.columns:
-                raise ValueError("DataFrame must contain 'temperature' column")
-                
-            # Convert temperature to numeric if needed
-            df['temperature'] = pd.to_numeric(df['temperature'], errors='coerce')
             
-            # Drop any NaN values
-            df = df.dropna(subset=['temperature'])
-            
-            if len(df) < sequence_length:
-                raise ValueError(f"Not enough data points after cleaning. Need at least {sequence_length}, got {len(df)}")
+            # The NumPy engine avoids Keras dispatch overhead for a single window
+            if self.engine is not None:
+                return self.engine.predict_horizon(window)[0].tolist()
             
             # Scale the data
-            data = self.scaler.transform(df[['temperature']].values[-sequence_length:])
+            data = self.scaler.transform(window.reshape(-1, 1))
             
             # Reshape for prediction
             X = np.array([data])
@@ -169,35 +440,83 @@ class TemperaturePredictor:
             prediction = self.model.predict(X, verbose=0)  # Set verbose=0 to avoid printing progress
             
             # Inverse transform to get actual temperature
-            prediction_rescaled = self.scaler.inverse_transform(prediction)
+            prediction_rescaled = self._inverse_transform(prediction)
             
-            return float(prediction_rescaled[0, 0])
+            return prediction_rescaled[0].tolist()
             
         except Exception as e:
             print(f"Error predicting temperature: {e}")
             # Return the mean temperature as fallback
-            if not df.empty and 'temperature' in df.columns:
-                return float(df['temperature'].mean())
-            else:
-                # Return a reasonable default if we can't get the mean
-                return 25.0  # Default to 25°C
+            return [float(pd.to_numeric(df['temperature'], errors='coerce').mean())] * self.horizon
         
     def save_model(self, filepath: str) -> None:
         """
-        Save the trained model.
+        Save the trained model and, next to it, the fitted scaler.
         
         Args:
-            filepath: Path to save the model
+            filepath: Path to save the model (a .keras file)
         """
         if self.model is None:
             raise ValueError("No model to save")
         self.model.save(filepath)
         
+        # TensorFlow-free copy for serving
+        export_gru(self.model, self.scaler, self._engine_path(filepath))
+        
+        # The scaler is fully described by its fitted range
+        with open(self._scaler_path(filepath), 'w') as f:
+            json.dump({
+                'feature_range': list(self.scaler.feature_range),
+                'data_min': self.scaler.data_min_.tolist(),
+                'data_max': self.scaler.data_max_.tolist()
+            }, f)
+        
     def load_model(self, filepath: str) -> None:
         """
-        Load a trained model.
+        Load a trained model and its scaler, if one was saved with it.
         
         Args:
             filepath: Path to the saved model
         """
-        self.model = tf.keras.models.load_model(filepath) 
\ No newline at end of file
+        self.model = tf.keras.models.load_model(filepath)
+        # The saved model decides how many days are forecast
+        self.horizon = int(self.model.output_shape[-1])
+        
+        scaler_path = self._scaler_path(filepath)
+        if os.path.exists(scaler_path):
+            with open(scaler_path, 'r') as f:
+                params = json.load(f)
+            # Fitting on the two extremes restores the exact transform
+            self.scaler = preprocessing.MinMaxScaler(feature_range=tuple(params['feature_range']))
+            self.scaler.fit(np.array([params['data_min'], params['data_max']]))
+        self._update_engine()
+        
+    def load_engine(self, filepath: str) -> None:
+        """
+        Load only the NumPy copy of a saved model, for prediction without
+        TensorFlow. The model cannot be trained further until load_model is
+        called.
+        
+        Args:
+            filepath: Path the model was saved to
+        """
+        self.engine = GRUEngine.load(self._engine_path(filepath))
+        self.horizon = self.engine.outputs
+        
+    def _update_engine(self) -> None:
+        """Refresh the NumPy engine from the current model weights."""
+        try:
+            self.engine = GRUEngine(gru_arrays(self.model, self.scaler))
+        except ValueError as e:
+            print(f"NumPy engine unavailable, predicting with Keras: {e}")
+            self.engine = None
+            
+    @staticmethod
+    def _scaler_path(filepath: str) -> str:
+        """Get the path of the scaler saved alongside a model file."""
+        return os.path.splitext(filepath)[0] + '.scaler.json'
+        
+    @staticmethod
+    def _engine_path(filepath: str) -> str:
+        """Get the path of the NumPy weights saved alongside a model file."""
+        return os.path.splitext(filepath)[0] + '.npz'
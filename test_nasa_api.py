@@ -11,7 +11,7 @@ import matplotlib.pyplot as plt
 
 # Add the project root to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from config import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_RADIUS
+from config import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_RADIUS, POWER_BASE_URL
 
 def fetch_nasa_power_data(lat, lon, days=6):
     """Fetch temperature data from NASA POWER API."""
@@ -24,7 +24,8 @@ def fetch_nasa_power_data(lat, lon, days=6):
     end_str = end_date.strftime("%Y%m%d")
     
     # Use NASA POWER API which is open and doesn't require authentication
-    base_url = "https://power.larc.nasa.gov/api/temporal/daily/point"
+    # (set POWER_BASE_URL to run against the offline stand-in server)
+    base_url = f"{POWER_BASE_URL}/temporal/daily/point"
     
     # Build parameters
     params = {
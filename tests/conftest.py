@@ -0,0 +1,56 @@
+"""
+Shared fixtures for the test suite.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# Keep everything created with the default paths out of the real data directory;
+# set before config is first imported
+DATA_DIR = tempfile.mkdtemp(prefix='greenintel-tests-')
+os.environ['GREENINTEL_DATA_DIR'] = DATA_DIR
+
+# Add the project root to the path so we can import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.power_stub_server import PowerStubServer
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def power_stub():
+    """Offline POWER stand-in serving synthetic payloads."""
+    with PowerStubServer() as server:
+        yield server
+
+
+@pytest.fixture
+def make_client(tmp_path, power_stub, monkeypatch):
+    """Factory for POWER clients pointed at the stand-in, caching under tmp_path."""
+    import utils.nasa_data as nasa_data
+    from utils.power_cache import PowerCache
+
+    # Retries of injected errors should not sleep
+    monkeypatch.setattr(nasa_data, 'POWER_BACKOFF_FACTOR', 0)
+
+    def make(cache=None, **kwargs):
+        kwargs.setdefault('max_requests_per_second', 0)
+        kwargs.setdefault('use_store', False)
+        cache = cache or PowerCache(str(tmp_path / 'power_cache.db'))
+        return nasa_data.NASAEarthdata(base_url=power_stub.base_url, cache=cache, **kwargs)
+
+    return make
+
+
+@pytest.fixture
+def fast_training(monkeypatch):
+    """Train models for a single epoch."""
+    from config import MODEL_PARAMS
+
+    monkeypatch.setitem(MODEL_PARAMS['gru'], 'epochs', 1)
@@ -0,0 +1,68 @@
+"""
+Tests that the NumPy GRU engine reproduces the Keras model's predictions.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.gru_engine import GRUEngine
+from models.temperature_predictor import TemperaturePredictor
+
+
+def train(horizon: int, seed: int) -> TemperaturePredictor:
+    rng = np.random.default_rng(seed)
+    temps = 25 + 5 * np.sin(np.arange(40) / 4) + rng.normal(0, 0.5, 40)
+    predictor = TemperaturePredictor(horizon=horizon)
+    predictor.train_values(temps)
+    return predictor
+
+
+@pytest.fixture(scope='module')
+def predictors():
+    from config import MODEL_PARAMS
+
+    epochs = MODEL_PARAMS['gru']['epochs']
+    MODEL_PARAMS['gru']['epochs'] = 1
+    try:
+        return [train(3, 0), train(3, 1)]
+    finally:
+        MODEL_PARAMS['gru']['epochs'] = epochs
+
+
+def keras_forecast(predictor: TemperaturePredictor, windows: np.ndarray) -> np.ndarray:
+    X = predictor.scaler.transform(windows.reshape(-1, 1)).reshape(*windows.shape, 1)
+    return predictor._inverse_transform(predictor.model.predict(X, verbose=0))
+
+
+def test_matches_keras(predictors):
+    predictor = predictors[0]
+    windows = np.random.default_rng(2).uniform(15, 35, (8, 5))
+
+    expected = keras_forecast(predictor, windows)
+
+    np.testing.assert_allclose(predictor.engine.predict_horizon(windows), expected, atol=1e-4)
+    assert predictor.engine.outputs == 3
+
+
+def test_saved_engine_matches(predictors, tmp_path):
+    predictor = predictors[0]
+    filepath = str(tmp_path / 'temperature_model.keras')
+    predictor.save_model(filepath)
+    served = TemperaturePredictor()
+    served.load_engine(filepath)
+    df = pd.DataFrame({'temperature': [24.0, 25.0, 26.5, 27.0, 26.0]})
+
+    assert served.predict_horizon(df) == pytest.approx(predictor.predict_horizon(df), abs=1e-4)
+    assert served.horizon == 3
+
+
+def test_stacked_engines_score_each_row_with_its_model(predictors):
+    windows = np.random.default_rng(3).uniform(15, 35, (2, 5))
+    assert predictors[0].engine.signature == predictors[1].engine.signature
+
+    stacked = GRUEngine.stack([predictor.engine for predictor in predictors])
+
+    expected = np.stack([predictor.engine.predict_horizon(window)[0]
+                         for predictor, window in zip(predictors, windows)])
+    np.testing.assert_allclose(stacked.predict_horizon(windows), expected, atol=1e-5)
@@ -0,0 +1,231 @@
+"""
+Tests for the SQLite-backed memory: persistence, upserts, journal replay,
+running accuracy statistics, compaction and range queries.
+"""
+
+import datetime
+
+import pytest
+
+from agents.memory_agent import MemoryAgent
+from agents.similarity_index import FEATURE_NAMES
+
+
+@pytest.fixture
+def memory_file(tmp_path):
+    return str(tmp_path / 'memory.db')
+
+
+def open_memory(memory_file, **kwargs):
+    kwargs.setdefault('flush_interval', 0)
+    kwargs.setdefault('compact_interval_hours', 0)
+    return MemoryAgent(memory_file, legacy_file=None, similarity_backend='numpy', **kwargs)
+
+
+@pytest.fixture
+def memory(memory_file):
+    agent = open_memory(memory_file)
+    yield agent
+    agent.close()
+
+
+def crash(agent):
+    """Stop an agent as if its process died: nothing pending is flushed."""
+    with agent._lock:
+        agent._pending = []
+    agent._closed.set()
+    agent._flush_requested.set()
+    if agent._flusher is not None:
+        agent._flusher.join()
+    agent.journal.release()
+    agent.store.close()
+
+
+def test_predictions_persist(memory_file):
+    agent = open_memory(memory_file)
+    agent.store_prediction('2024-06-01', 'Tomato', 25.0, site='13.0_77.5')
+    agent.update_crop_performance('Tomato', 80.0)
+    agent.close()
+
+    reopened = open_memory(memory_file)
+    try:
+        [prediction] = reopened.get_recent_predictions()
+        assert (prediction['date'], prediction['crop'], prediction['site']) == ('2024-06-01', 'Tomato', '13.0_77.5')
+        assert prediction['predicted_temp'] == 25.0
+        assert [entry['score'] for entry in reopened.get_crop_history('Tomato')['Tomato']] == [80.0]
+    finally:
+        reopened.close()
+
+
+def test_predictions_are_upserted(memory):
+    memory.store_prediction('2024-06-01', 'Tomato', 25.0)
+    memory.store_prediction('2024-06-01', 'Tomato', 26.0)
+    memory.store_prediction('2024-06-01', 'Lettuce', 20.0)
+
+    df = memory.query_predictions()
+
+    assert len(df) == 2
+    assert df.loc[df['crop'] == 'Tomato', 'predicted_temp'].tolist() == [26.0]
+    assert memory.store.query("SELECT COUNT(*) AS n FROM predictions")[0]['n'] == 2
+
+
+def test_restoring_a_prediction_keeps_its_actual(memory):
+    memory.store_prediction('2024-06-01', 'Tomato', 25.0)
+    memory.update_actual_temperature('2024-06-01', 24.0)
+    memory.store_prediction('2024-06-01', 'Tomato', 26.0)
+
+    [prediction] = memory.get_recent_predictions()
+
+    assert prediction['actual_temp'] == 24.0
+    assert memory.get_prediction_accuracy()['mae'] == pytest.approx(2.0)
+
+
+def test_accuracy_is_kept_up_to_date(memory):
+    memory.store_prediction('2024-06-01', 'Tomato', 25.0, site='a')
+    memory.store_prediction('2024-06-02', 'Tomato', 27.0, site='a')
+    memory.store_prediction('2024-07-01', 'Lettuce', 20.0, site='b')
+
+    assert memory.update_actual_temperatures({'2024-06-01': 24.0, '2024-06-02': 30.0, '2024-07-01': 20.0}) == 3
+
+    overall = memory.get_prediction_accuracy()
+    assert overall['count'] == 3
+    assert overall['mae'] == pytest.approx(4.0 / 3)
+    assert overall['rmse'] == pytest.approx((10.0 / 3) ** 0.5)
+    assert memory.get_prediction_accuracy(crop='Tomato')['mae'] == pytest.approx(2.0)
+    assert memory.get_prediction_accuracy(month='2024-07')['mae'] == pytest.approx(0.0)
+    assert memory.get_prediction_accuracy(crop='Tomato', site='b')['count'] == 0
+
+    # Replacing a scored prediction replaces its error
+    memory.store_prediction('2024-06-02', 'Tomato', 30.0, site='a')
+    assert memory.get_prediction_accuracy(crop='Tomato')['mae'] == pytest.approx(0.5)
+    assert set(memory.get_accuracy_breakdown('crop')) == {'Tomato', 'Lettuce'}
+
+
+def test_forecasts_are_scored_per_horizon(memory):
+    memory.store_forecast('2024-06-01', 'Tomato', [25.0, 26.0, 27.0])
+
+    memory.update_actual_temperatures({'2024-06-02': 24.0, '2024-06-03': 24.0})
+
+    accuracy = memory.get_horizon_accuracy()
+    assert set(accuracy) == {1, 2}
+    assert accuracy[1]['mae'] == pytest.approx(1.0)
+    assert accuracy[2]['mae'] == pytest.approx(2.0)
+    assert memory.get_horizon_accuracy(crop='Lettuce') == {}
+
+
+def test_journal_is_replayed_after_a_crash(memory_file):
+    agent = open_memory(memory_file, flush_interval=3600)
+    agent.store_prediction('2024-06-01', 'Tomato', 25.0)
+    agent.store_prediction('2024-06-02', 'Tomato', 26.0)
+    agent.update_actual_temperature('2024-06-01', 24.0)
+    assert agent.store.query("SELECT COUNT(*) AS n FROM predictions")[0]['n'] == 0
+    crash(agent)
+
+    recovered = open_memory(memory_file)
+    try:
+        df = recovered.query_predictions()
+        assert df['predicted_temp'].tolist() == [25.0, 26.0]
+        assert recovered.get_prediction_accuracy()['mae'] == pytest.approx(1.0)
+        assert recovered.store.query("SELECT COUNT(*) AS n FROM predictions")[0]['n'] == 2
+    finally:
+        recovered.close()
+
+    # Replayed entries are not applied twice
+    again = open_memory(memory_file)
+    try:
+        assert len(again.query_predictions()) == 2
+    finally:
+        again.close()
+
+
+def test_flushed_entries_are_not_replayed(memory_file):
+    agent = open_memory(memory_file, flush_interval=3600)
+    agent.store_prediction('2024-06-01', 'Tomato', 25.0)
+    agent.flush()
+    agent.store_prediction('2024-06-01', 'Tomato', 27.0)
+    crash(agent)
+
+    recovered = open_memory(memory_file)
+    try:
+        assert recovered.query_predictions()['predicted_temp'].tolist() == [27.0]
+    finally:
+        recovered.close()
+
+
+def test_compaction_rolls_up_old_recommendations(memory_file):
+    agent = open_memory(memory_file, retention_days=30, weekly_rollup_days=90)
+    try:
+        old = datetime.date.today() - datetime.timedelta(days=60)
+        for offset in range(3):
+            day = (old + datetime.timedelta(days=offset)).isoformat()
+            agent.store_recommendation(day, 'Tomato', {'irrigation': 'ON', 'reasoning': 'dry'})
+        # Superseded recommendations are dropped
+        agent.store_recommendation(old.isoformat(), 'Tomato', {'irrigation': 'OFF', 'reasoning': 'wet'})
+        recent = datetime.date.today().isoformat()
+        agent.store_recommendation(recent, 'Tomato', {'irrigation': 'ON'})
+
+        summary = agent.compact()
+
+        assert summary == {'superseded_recommendations': 1, 'recommendations_rolled_up': 3,
+                           'crop_history_rolled_up': 0}
+        rows = agent.store.query("SELECT date FROM recommendations")
+        assert [row['date'] for row in rows] == [recent]
+        rollups = agent.store.query("SELECT period, count, actuators FROM recommendation_rollups")
+        assert sum(row['count'] for row in rollups) == 3
+        assert all(row['period'] == 'day' and 'reasoning' not in row['actuators'] for row in rollups)
+    finally:
+        agent.close()
+
+
+def test_compaction_rolls_up_crop_history(memory_file):
+    agent = open_memory(memory_file)
+    for score in (60.0, 70.0, 80.0):
+        agent.update_crop_performance('Tomato', score)
+    agent.close()
+
+    later = datetime.date.today() + datetime.timedelta(days=200)
+    agent = open_memory(memory_file)
+    try:
+        summary = agent.store.compact(retention_days=30, weekly_after_days=90, today=later)
+        assert summary['crop_history_rolled_up'] == 3
+    finally:
+        agent.close()
+
+    reopened = open_memory(memory_file)
+    try:
+        [entry] = reopened.get_crop_history('Tomato')['Tomato']
+        assert entry['period'] == 'week'
+        assert entry['count'] == 3
+        assert entry['score'] == pytest.approx(70.0)
+        df = reopened.query_crop_history('Tomato')
+        assert df['count'].tolist() == [3]
+    finally:
+        reopened.close()
+
+
+def test_range_queries(memory):
+    for day in range(1, 11):
+        memory.store_prediction(f'2024-06-{day:02d}', 'Tomato', 20.0 + day)
+        memory.store_prediction(f'2024-06-{day:02d}', 'Lettuce', 15.0 + day)
+
+    df = memory.query_predictions(start='2024-06-03', end=datetime.date(2024, 6, 5), crop='Tomato')
+    assert df['predicted_temp'].tolist() == [23.0, 24.0, 25.0]
+
+    latest = memory.query_predictions(crop='Lettuce', limit=2)
+    assert latest['date'].dt.strftime('%Y-%m-%d').tolist() == ['2024-06-09', '2024-06-10']
+
+
+def test_similar_days_with_few_matches_for_a_crop(memory):
+    def features(first):
+        vector = [0.0] * len(FEATURE_NAMES)
+        vector[0] = first
+        return vector
+
+    memory.store_conditions('2024-06-01', 'Tomato', features(1.0), {'fan': 'ON'})
+    memory.store_conditions('2024-06-02', 'Tomato', features(3.0), {'fan': 'OFF'})
+    memory.store_conditions('2024-06-03', 'Lettuce', features(1.1), {'fan': 'ON'})
+
+    matches = memory.find_similar_days(features(1.0), k=5, crop='Tomato')
+
+    assert [match['date'] for match in matches] == ['2024-06-01', '2024-06-02']
+    assert matches[0]['distance'] == pytest.approx(0.0)
@@ -0,0 +1,138 @@
+"""
+Tests for the per-site model registry's reuse, fine-tune and retrain
+decisions, and for training on data that cannot produce a model.
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agents.model_registry import ModelRegistry
+
+END = datetime.date(2024, 6, 30)
+
+
+def temperatures(days: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 25 + 5 * np.sin(np.arange(days) / 4) + rng.normal(0, 0.5, days)
+
+
+@pytest.fixture
+def registry(tmp_path, fast_training):
+    return ModelRegistry(str(tmp_path / 'models'), fine_tune_epochs=1, drift_factor=1e9)
+
+
+def test_trains_then_reuses(registry, tmp_path):
+    temps = temperatures(40)
+
+    agent, result = registry.get_or_train('site', 'Tomato', temps, END)
+    assert result['action'] == 'trained'
+    assert result['reason'] == 'new'
+
+    same, result = registry.get_or_train('site', 'Tomato', temps, END)
+    assert result['action'] == 'reused'
+    assert same is agent
+
+    # A fresh registry loads the saved model instead of training
+    reloaded = ModelRegistry(str(tmp_path / 'models'))
+    agent, result = reloaded.get_or_train('site', 'Tomato', temps, END)
+    assert result['action'] == 'reused'
+    assert agent.predict_forecast(pd.DataFrame({'temperature': temps}))['status'] == 'success'
+
+
+def test_trailing_missing_days_are_not_new(registry):
+    temps = temperatures(40)
+    registry.get_or_train('site', 'Tomato', temps, END)
+
+    _, result = registry.get_or_train('site', 'Tomato', np.append(temps, [np.nan, np.nan]),
+                                      END + datetime.timedelta(days=2))
+
+    assert result['action'] == 'reused'
+
+
+def test_fine_tunes_on_new_days(registry):
+    temps = temperatures(42)
+    registry.get_or_train('site', 'Tomato', temps[:40], END)
+
+    _, result = registry.get_or_train('site', 'Tomato', temps, END + datetime.timedelta(days=2))
+
+    assert result['action'] == 'fine_tuned'
+    assert result['end_date'] == (END + datetime.timedelta(days=2)).isoformat()
+    assert 'fine_tune_error' in result
+
+
+def test_retrains_when_new_days_have_gaps(registry):
+    temps = temperatures(40)
+    registry.get_or_train('site', 'Tomato', temps, END)
+
+    _, result = registry.get_or_train('site', 'Tomato', np.append(temps, [np.nan, 26.0]),
+                                      END + datetime.timedelta(days=2))
+
+    assert result['action'] == 'trained'
+    assert result['reason'] == 'gap'
+
+
+def test_retrains_on_drift(tmp_path, fast_training):
+    registry = ModelRegistry(str(tmp_path / 'models'), fine_tune_epochs=1, drift_factor=0)
+    temps = temperatures(42)
+    registry.get_or_train('site', 'Tomato', temps[:40], END)
+
+    _, result = registry.get_or_train('site', 'Tomato', temps, END + datetime.timedelta(days=2))
+
+    assert result['action'] == 'trained'
+    assert result['reason'] == 'drift'
+
+
+def test_retrains_on_schedule(tmp_path, fast_training):
+    registry = ModelRegistry(str(tmp_path / 'models'), retrain_days=0, drift_factor=1e9)
+    temps = temperatures(42)
+    registry.get_or_train('site', 'Tomato', temps[:40], END)
+
+    _, result = registry.get_or_train('site', 'Tomato', temps, END + datetime.timedelta(days=2))
+
+    assert result['reason'] == 'schedule'
+
+
+def test_shared_model_seeds_crops(registry):
+    temps = temperatures(40)
+    shared, _ = registry.get_or_train('site', None, temps, END)
+
+    agent, result = registry.get_or_train('site', 'Lettuce', temps, END)
+
+    assert result['action'] == 'reused'
+    assert agent is shared
+    assert registry.get('site', 'Lettuce')[0] is shared
+
+
+def test_too_few_days(registry):
+    agent, result = registry.get_or_train('site', 'Tomato', temperatures(8), END)
+
+    assert agent is None
+    assert result['status'] == 'error'
+
+
+def test_no_consecutive_run_long_enough(registry):
+    # Enough days in total, but each run is shorter than a sequence plus the horizon
+    temps = np.concatenate([temperatures(7), [np.nan] * 3, temperatures(7, seed=1)])
+
+    agent, result = registry.get_or_train('site', 'Tomato', temps, END)
+
+    assert agent is None
+    assert result == {'status': 'error', 'message': 'Not enough consecutive days for training'}
+    assert registry.get('site', 'Tomato') == (None, {})
+
+
+def test_coordinator_training_on_empty_data():
+    from agents.coordinator_agent import CoordinatorAgent
+
+    coordinator = CoordinatorAgent()
+    try:
+        coordinator.current_data = pd.DataFrame(columns=['date', 'temperature'])
+
+        result = coordinator.train_prediction_model()
+
+        assert result == {'status': 'error', 'message': 'Not enough data for training'}
+    finally:
+        coordinator.memory_agent.close()
@@ -0,0 +1,173 @@
+"""
+Tests for the POWER fetch path: caching, span widening, single-flight
+deduplication, stale fallback and request budgets, against the offline stand-in.
+"""
+
+import datetime
+import os
+import threading
+
+import pytest
+
+from config import POWER_DAILY_PARAMETERS
+from utils.nasa_data import RequestBudget
+from utils.power_stub_server import PowerStubServer
+
+PARAMETERS = ['T2M', 'GWETROOT']
+
+# Recorded POWER payloads served by the stand-in
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'power')
+
+
+def day(text: str) -> datetime.date:
+    return datetime.date.fromisoformat(text)
+
+
+def record_spans(client):
+    """Wrap a client's point requests to record the spans they ask for."""
+    spans = []
+    request_point = client._request_point
+
+    def recording(temporal, lat, lon, start_date, end_date, parameters):
+        spans.append((start_date, end_date))
+        return request_point(temporal, lat, lon, start_date, end_date, parameters)
+
+    client._request_point = recording
+    return spans
+
+
+def test_one_request_covers_all_parameters(make_client, power_stub):
+    client = make_client()
+
+    data = client._fetch_point('daily', 13.0, 77.5, day('2024-06-01'), day('2024-06-10'), PARAMETERS)
+
+    assert power_stub.stats['requests'] == 1
+    assert set(data) == set(PARAMETERS)
+    assert len(data['T2M']) == 10
+
+
+def test_cached_range_is_not_requested_again(make_client, power_stub):
+    client = make_client()
+    first = client._fetch_point('daily', 13.0, 77.5, day('2024-06-01'), day('2024-06-10'), PARAMETERS)
+
+    # A nearby point in the same grid cell is served from the cache too
+    second = client._fetch_point('daily', 13.1, 77.6, day('2024-06-01'), day('2024-06-10'), PARAMETERS)
+
+    assert power_stub.stats['requests'] == 1
+    assert second == first
+
+
+def test_wider_range_requests_only_missing_spans(make_client):
+    client = make_client()
+    spans = record_spans(client)
+    client._fetch_point('daily', 13.0, 77.5, day('2024-06-01'), day('2024-06-10'), PARAMETERS)
+
+    data = client._fetch_point('daily', 13.0, 77.5, day('2024-05-25'), day('2024-06-14'), PARAMETERS)
+
+    assert spans == [
+        (day('2024-06-01'), day('2024-06-10')),
+        (day('2024-05-25'), day('2024-05-31')),
+        (day('2024-06-11'), day('2024-06-14'))
+    ]
+    assert len(data['T2M']) == 21
+
+
+def test_concurrent_identical_fetches_share_one_request(tmp_path, monkeypatch):
+    import utils.nasa_data as nasa_data
+    monkeypatch.setattr(nasa_data, 'POWER_BACKOFF_FACTOR', 0)
+
+    with PowerStubServer(latency=0.3) as server:
+        client = nasa_data.NASAEarthdata(base_url=server.base_url, use_cache=False, use_store=False,
+                                         max_requests_per_second=0)
+        barrier = threading.Barrier(4)
+        results = []
+
+        def fetch():
+            barrier.wait()
+            results.append(client._fetch_point('daily', 13.0, 77.5, day('2024-06-01'),
+                                               day('2024-06-10'), PARAMETERS))
+
+        threads = [threading.Thread(target=fetch) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert server.stats['requests'] == 1
+        assert len(results) == 4
+        assert all(result == results[0] for result in results)
+
+
+def test_fetch_many_shares_one_fetch_per_cell(make_client, power_stub):
+    client = make_client()
+    sites = [(13.1, 77.7, 10), (12.9, 77.4, 10), (20.0, 80.0, 10)]
+
+    batch = client.fetch_many(sites)
+
+    assert set(batch['results']) == set(sites)
+    assert batch['errors'] == {}
+    assert batch['requests'] == power_stub.stats['requests'] == 2
+
+
+def test_expired_values_are_served_when_requests_fail(make_client, power_stub):
+    client = make_client(max_retries=1)
+    recent_start = datetime.date.today() - datetime.timedelta(days=3)
+    recent_end = datetime.date.today() - datetime.timedelta(days=1)
+    fresh = client._fetch_point('daily', 13.0, 77.5, recent_start, recent_end, PARAMETERS)
+    client.cache.ttl_seconds = -1
+    power_stub.error_rate = 1.0
+
+    stale = client._fetch_point('daily', 13.0, 77.5, recent_start, recent_end, PARAMETERS)
+
+    assert stale == fresh
+    assert power_stub.stats['requests'] == 3  # One fetch, then a failed attempt and its retry
+
+
+def test_failure_without_cached_values_raises(make_client, power_stub):
+    client = make_client(max_retries=0)
+    power_stub.error_rate = 1.0
+
+    with pytest.raises(Exception):
+        client._fetch_point('daily', 13.0, 77.5, day('2024-06-01'), day('2024-06-10'), PARAMETERS)
+
+
+def test_budget_stops_requests_that_could_exceed_it(make_client, power_stub):
+    client = make_client(max_retries=1)
+    budget = RequestBudget(3)
+    sites = [(10.0, 75.0, 10), (20.0, 80.0, 10), (30.0, 85.0, 10)]
+
+    batch = client.fetch_many(sites, max_workers=1, budget=budget)
+
+    # Each request reserves room for its retry; the third no longer fits
+    assert len(batch['results']) == 2
+    assert list(batch['errors'].values()) == ["Request budget used up"]
+    assert batch['requests'] == budget.used == power_stub.stats['requests'] == 2
+
+
+def test_budget_counts_retries(make_client, power_stub):
+    client = make_client(max_retries=1)
+    power_stub.error_rate = 1.0
+    budget = RequestBudget(3)
+    sites = [(10.0, 75.0, 10), (20.0, 80.0, 10)]
+
+    batch = client.fetch_many(sites, max_workers=1, budget=budget)
+
+    assert set(batch['errors']) == set(sites)
+    assert power_stub.stats['requests'] == budget.used == 2
+    assert power_stub.stats['requests'] <= budget.limit
+
+
+def test_recorded_fixture_parses():
+    import utils.nasa_data as nasa_data
+
+    with PowerStubServer(fixtures_dir=FIXTURES_DIR) as server:
+        client = nasa_data.NASAEarthdata(base_url=server.base_url, use_cache=False, use_store=False,
+                                         max_requests_per_second=0)
+        data = client._fetch_point('daily', 13.0, 77.5, day('2024-06-01'), day('2024-06-14'),
+                                   POWER_DAILY_PARAMETERS)
+        df = client._parse_daily_parameters(data)
+
+    # The day with a temperature fill value is dropped; other fill values are filled in
+    assert len(df) == 13
+    assert '2024-06-09' not in df['date'].dt.strftime('%Y-%m-%d').tolist()
+    assert df['soil_moisture'].notna().all()
@@ -0,0 +1,93 @@
+"""
+Tests for the POWER response cache.
+"""
+
+import datetime
+
+import pytest
+
+from utils.power_cache import PowerCache, POWER_FILL_VALUE, cell_key, grid_cell
+
+
+def stamp(days_ago: int) -> str:
+    return (datetime.date.today() - datetime.timedelta(days=days_ago)).strftime("%Y%m%d")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PowerCache(str(tmp_path / 'cache.db'), ttl_hours=6, provisional_days=7)
+
+
+def test_cell_key_snaps_to_grid():
+    assert grid_cell(13.1, 77.7) == (13.0, 77.5)
+    assert cell_key(13.1, 77.7) == cell_key(12.9, 77.4) == "13.0_77.5"
+
+
+def test_round_trip(cache):
+    cache.put("13.0_77.5", {'T2M': {'20240601': 25.5, '20240602': 26.0, 'units': 'C'}})
+
+    values, missing = cache.get("13.0_77.5", ['T2M'], ['20240601', '20240602', '20240603'])
+
+    assert values['T2M'] == {'20240601': 25.5, '20240602': 26.0}
+    assert missing == ['20240603']
+
+
+def test_missing_covers_every_parameter(cache):
+    cache.put("13.0_77.5", {'T2M': {'20240601': 25.5}, 'GWETROOT': {}})
+
+    _, missing = cache.get("13.0_77.5", ['T2M', 'GWETROOT'], ['20240601'])
+
+    assert missing == ['20240601']
+
+
+def test_provisional_values_expire(cache):
+    old, recent = stamp(30), stamp(1)
+    cache.put("13.0_77.5", {'T2M': {old: 20.0, recent: 21.0}})
+    cache.ttl_seconds = -1
+
+    values, missing = cache.get("13.0_77.5", ['T2M'], [old, recent])
+
+    # Final days are kept forever; the provisional day is refetched
+    assert values['T2M'] == {old: 20.0}
+    assert missing == [recent]
+
+
+def test_fill_values_are_never_final(cache):
+    old = stamp(30)
+    cache.put("13.0_77.5", {'T2M': {old: POWER_FILL_VALUE}})
+    cache.ttl_seconds = -1
+
+    _, missing = cache.get("13.0_77.5", ['T2M'], [old])
+
+    assert missing == [old]
+
+
+def test_allow_stale_returns_expired_values(cache):
+    recent = stamp(1)
+    cache.put("13.0_77.5", {'T2M': {recent: 21.0}})
+    cache.ttl_seconds = -1
+
+    values, missing = cache.get("13.0_77.5", ['T2M'], [recent], allow_stale=True)
+
+    assert values['T2M'] == {recent: 21.0}
+    assert missing == []
+
+
+def test_temporal_resolutions_are_separate(cache):
+    cache.put("13.0_77.5", {'T2M': {'2024060100': 18.0}}, temporal='hourly')
+
+    _, missing = cache.get("13.0_77.5", ['T2M'], ['2024060100'], temporal='daily')
+    values, _ = cache.get("13.0_77.5", ['T2M'], ['2024060100'], temporal='hourly')
+
+    assert missing == ['2024060100']
+    assert values['T2M'] == {'2024060100': 18.0}
+
+
+def test_clear_one_cell(cache):
+    cache.put("13.0_77.5", {'T2M': {'20240601': 25.5}})
+    cache.put("14.0_77.5", {'T2M': {'20240601': 24.5}})
+
+    cache.clear("13.0_77.5")
+
+    assert cache.get("13.0_77.5", ['T2M'], ['20240601'])[1] == ['20240601']
+    assert cache.get("14.0_77.5", ['T2M'], ['20240601'])[1] == []
@@ -2,8 +2,21 @@
 Utilities module initialization.
 """
 
-from .nasa_data import NASAEarthdata
+from .nasa_data import NASAEarthdata, RateLimiter, SingleFlight
+from .power_cache import PowerCache, grid_cell, cell_key
+from .climate_store import ClimateStore
+from .file_lock import FileLock
+from .lazy import LazyModule, lazy_import
 
 __all__ = [
-    'NASAEarthdata'
+    'NASAEarthdata',
+    'RateLimiter',
+    'SingleFlight',
+    'PowerCache',
+    'ClimateStore',
+    'FileLock',
+    'LazyModule',
+    'lazy_import',
+    'grid_cell',
+    'cell_key'
 ] 
\ No newline at end of file
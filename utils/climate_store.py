@@ -0,0 +1,174 @@
+"""
+Columnar local store for fetched climate data.
+"""
+
+import datetime
+import json
+import os
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to the path so we can import the config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import CLIMATE_STORE_DIR
+
+# Columns kept in the store, in partition column order
+CLIMATE_STORE_COLUMNS = [
+    'temperature', 'temperature_max', 'temperature_min',
+    'soil_moisture', 'humidity', 'precipitation'
+]
+
+
+class ClimateStore:
+    """
+    Daily climate values in memory-mapped NumPy files partitioned by grid cell
+    and year.
+
+    Each partition is a float32 array of shape (366, columns) indexed by day of
+    year, with NaN for days that have not been fetched. Reads within a single
+    year return views of the memory map without copying.
+    """
+
+    def __init__(self, directory: str = CLIMATE_STORE_DIR):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Root directory of the store
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        # Column layout is fixed when the store is created
+        layout_file = os.path.join(directory, 'columns.json')
+        if os.path.exists(layout_file):
+            with open(layout_file, 'r') as f:
+                self.columns = json.load(f)
+        else:
+            self.columns = list(CLIMATE_STORE_COLUMNS)
+            with open(layout_file, 'w') as f:
+                json.dump(self.columns, f)
+        self._column_index = {column: i for i, column in enumerate(self.columns)}
+
+        self._lock = threading.Lock()
+        self._partitions: Dict[Tuple[str, int], np.memmap] = {}
+
+    def _partition_path(self, cell: str, year: int) -> str:
+        """Get the file path of a partition."""
+        return os.path.join(self.directory, cell, f"{year}.npy")
+
+    def _partition(self, cell: str, year: int, create: bool = False) -> Optional[np.memmap]:
+        """
+        Open a partition as a writable memory map.
+
+        Args:
+            cell: Grid cell key
+            year: Calendar year
+            create: Create the partition if it does not exist
+
+        Returns:
+            Memory-mapped array, or None if the partition does not exist
+        """
+        key = (cell, year)
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is not None:
+                return partition
+
+            path = self._partition_path(cell, year)
+            if os.path.exists(path):
+                partition = np.load(path, mmap_mode='r+')
+            elif create:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                partition = np.lib.format.open_memmap(
+                    path, mode='w+', dtype=np.float32, shape=(366, len(self.columns))
+                )
+                partition[:] = np.nan
+            else:
+                return None
+
+            self._partitions[key] = partition
+            return partition
+
+    def write(self, cell: str, df: pd.DataFrame) -> None:
+        """
+        Write daily values for a grid cell, overwriting existing days.
+
+        Args:
+            cell: Grid cell key
+            df: DataFrame with a 'date' column and any of the store columns
+        """
+        if df.empty:
+            return
+
+        dates = pd.to_datetime(df['date'])
+        columns = [column for column in self.columns if column in df.columns]
+        values = df[columns].to_numpy(dtype=np.float32)
+        column_index = [self._column_index[column] for column in columns]
+
+        years = dates.dt.year.to_numpy()
+        rows = dates.dt.dayofyear.to_numpy() - 1
+        for year in np.unique(years):
+            in_year = years == year
+            partition = self._partition(cell, int(year), create=True)
+            partition[np.ix_(rows[in_year], column_index)] = values[in_year]
+            partition.flush()
+
+    def read(self, cell: str, column: str, start: datetime.date,
+             end: datetime.date) -> np.ndarray:
+        """
+        Read one column for a date range.
+
+        Args:
+            cell: Grid cell key
+            column: Store column name
+            start: First day
+            end: Last day
+
+        Returns:
+            Array with one value per day (NaN where missing); a view of the
+            memory map when the range lies within one year
+        """
+        col = self._column_index[column]
+        parts = []
+        for year in range(start.year, end.year + 1):
+            first = start if year == start.year else datetime.date(year, 1, 1)
+            last = end if year == end.year else datetime.date(year, 12, 31)
+            first_row = first.timetuple().tm_yday - 1
+            last_row = last.timetuple().tm_yday
+
+            partition = self._partition(cell, year)
+            if partition is None:
+                parts.append(np.full(last_row - first_row, np.nan, dtype=np.float32))
+            else:
+                parts.append(partition[first_row:last_row, col])
+
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    def load(self, cell: str, start: datetime.date, end: datetime.date,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Load a date range as a DataFrame, keeping days with a temperature.
+
+        Args:
+            cell: Grid cell key
+            start: First day
+            end: Last day
+            columns: Store columns to load (None for all)
+
+        Returns:
+            DataFrame with a 'date' column and the requested columns
+        """
+        columns = columns or self.columns
+        data = {column: self.read(cell, column, start, end) for column in columns}
+        df = pd.DataFrame({'date': pd.date_range(start, end, freq='D'), **data})
+
+        if 'temperature' in df.columns:
+            df = df[df['temperature'].notna()]
+        return df.dropna(axis=1, how='all').reset_index(drop=True)
@@ -0,0 +1,79 @@
+"""
+Lazy module proxies for deferring heavy imports until first use.
+"""
+
+import importlib
+import importlib.util
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported the first time one of its
+    attributes is accessed.
+
+    Lets modules keep a conventional ``tf.keras...`` or ``plt.subplots(...)``
+    style while paying for TensorFlow, scikit-learn, xarray or matplotlib only
+    on the code paths that use them.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize the proxy.
+
+        Args:
+            name: Full name of the module to import (e.g. 'matplotlib.pyplot')
+        """
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the module has been imported."""
+        return self._module is not None
+
+    def _load(self) -> types.ModuleType:
+        """Import the module (once) and return it."""
+        if self._module is None:
+            # The import system's own locks make concurrent first uses safe
+            self.__dict__['_module'] = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Get a lazy proxy for a module.
+
+    Args:
+        name: Full name of the module
+
+    Returns:
+        Proxy that imports the module on first attribute access
+    """
+    return LazyModule(name)
+
+
+def is_available(name: str) -> bool:
+    """
+    Check whether a module can be imported, without importing it.
+
+    Args:
+        name: Full name of the module
+
+    Returns:
+        True if the module is installed
+    """
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
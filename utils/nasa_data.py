@@ -2,25 +2,225 @@
 Utility functions for fetching and processing NASA Earth data.
 """
 
+from __future__ import annotations
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import datetime
+import threading
+import time
+import hashlib
+import importlib.util
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
 import numpy as np
 import pandas as pd
-import xarray as xr
-from typing import Tuple, Dict, List, Optional
+from typing import Tuple, Dict, List, Optional, Any, Iterator
 import sys
 import os
 
 # Add the project root to the path so we can import the config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import NASA_API_KEY
+from config import (NASA_API_KEY, POWER_BASE_URL, POWER_COMMUNITY, POWER_DAILY_PARAMETERS,
+                    POWER_CONNECT_TIMEOUT, POWER_READ_TIMEOUT, POWER_MAX_RETRIES,
+                    POWER_BACKOFF_FACTOR, POWER_POOL_SIZE, POWER_MAX_WORKERS,
+                    POWER_MAX_REQUESTS_PER_SECOND, POWER_REGIONAL_PARAMETERS,
+                    POWER_REGIONAL_PARAMETERS_PER_REQUEST, POWER_REGIONAL_MIN_SPAN,
+                    POWER_GRID_RESOLUTION, POWER_HOURLY_PARAMETERS, POWER_HOURLY_CHUNK_DAYS,
+                    POWER_NETCDF_DIR, POWER_NETCDF_CHUNK_DAYS, POWER_PROVISIONAL_DAYS,
+                    POWER_CACHE_TTL_HOURS)
+from utils.power_cache import PowerCache, grid_cell, cell_key, POWER_FILL_VALUE
+from utils.climate_store import ClimateStore
+from utils.lazy import lazy_import
+
+# Only the NetCDF and regional paths need xarray
+xr = lazy_import('xarray')
+
+# Output column for each POWER parameter
+POWER_COLUMNS = {
+    'T2M': 'temperature',
+    'T2M_MAX': 'temperature_max',
+    'T2M_MIN': 'temperature_min',
+    'RH2M': 'humidity',
+    'PRECTOTCORR': 'precipitation'
+}
+
+# Soil moisture parameters in order of preference
+SOIL_MOISTURE_PARAMETERS = ['GWETROOT', 'GWETPROF', 'GWETTOP']
+
+# Mean Earth radius used for distances between coordinates
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1: float, lon1: float, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distance between a point and an array of points.
+    
+    Args:
+        lat1: Latitude of the point
+        lon1: Longitude of the point
+        lat2: Latitudes of the other points
+        lon2: Longitudes of the other points
+        
+    Returns:
+        Distances in km
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls to a maximum rate."""
+    
+    def __init__(self, rate: float):
+        """
+        Initialize the rate limiter.
+        
+        Args:
+            rate: Maximum number of calls per second (0 or less disables limiting)
+        """
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        
+    def acquire(self) -> None:
+        """Block until the next call is allowed."""
+        if self.interval == 0.0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class RequestBudget:
+    """Thread-safe cap on the request attempts, retries included, of one caller."""
+    
+    def __init__(self, limit: int):
+        """
+        Initialize the budget.
+        
+        Args:
+            limit: Maximum number of attempts
+        """
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._reserved = 0
+        
+    @property
+    def used(self) -> int:
+        """Attempts made or reserved so far."""
+        with self._lock:
+            return self._reserved
+        
+    @property
+    def remaining(self) -> int:
+        """Attempts still available."""
+        with self._lock:
+            return self.limit - self._reserved
+        
+    def reserve(self, attempts: int) -> bool:
+        """
+        Reserve attempts before a request.
+        
+        Args:
+            attempts: Most attempts the request can make
+            
+        Returns:
+            True if they fit in the budget and were reserved
+        """
+        with self._lock:
+            if self._reserved + attempts > self.limit:
+                return False
+            self._reserved += attempts
+            return True
+        
+    def release(self, attempts: int) -> None:
+        """Give back reserved attempts a request did not use."""
+        with self._lock:
+            self._reserved -= attempts
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one in-flight call."""
+    
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, Future] = {}
+        
+    def do(self, key: Any, func, *args) -> Any:
+        """
+        Run func(*args) unless a call with the same key is already running,
+        in which case wait for it and share its result.
+        
+        Args:
+            key: Hashable call key
+            func: Function to call
+            *args: Arguments for func
+            
+        Returns:
+            Result of the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+                
+        if not leader:
+            return call.result()
+        
+        try:
+            result = func(*args)
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
 
 class NASAEarthdata:
     """Class to handle NASA Earthdata API requests and data processing."""
     
-    def __init__(self, api_key: str = NASA_API_KEY):
-        """Initialize with NASA API key for open data access."""
+    def __init__(self, api_key: str = NASA_API_KEY, base_url: str = POWER_BASE_URL,
+                 cache: Optional[PowerCache] = None,
+                 use_cache: bool = True, store: Optional[ClimateStore] = None,
+                 use_store: bool = True,
+                 timeout: Tuple[float, float] = (POWER_CONNECT_TIMEOUT, POWER_READ_TIMEOUT),
+                 max_retries: int = POWER_MAX_RETRIES,
+                 pool_size: int = POWER_POOL_SIZE,
+                 max_requests_per_second: float = POWER_MAX_REQUESTS_PER_SECOND):
+        """
+        Initialize with NASA API key for open data access.
+        
+        Args:
+            api_key: NASA API key
+            base_url: POWER API root URL
+            cache: Response cache (a default on-disk cache is created if None)
+            use_cache: Whether to cache POWER responses
+            store: Columnar store for fetched data (a default local store is created if None)
+            use_store: Whether to keep fetched data in the columnar store
+            timeout: (connect, read) timeouts in seconds
+            max_retries: Retries on 429 and 5xx responses, with exponential backoff
+            pool_size: Number of keep-alive connections kept per host
+            max_requests_per_second: Global request rate limit shared by all threads
+        """
         self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.cache = (cache or PowerCache()) if use_cache else None
+        self.store = (store or ClimateStore()) if use_store else None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(max_requests_per_second)
+        self.single_flight = SingleFlight()
         
         # For NASA Earth Data API v1
         self.headers = {
@@ -32,10 +232,128 @@ class NASAEarthdata:
             "api_key": self.api_key
         }
         
-    def get_lst_data(self, lat: float, lon: float, radius: float, 
-                     days: int = 6) -> pd.DataFrame:
+        # Pooled keep-alive session with bounded retries
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=POWER_BACKOFF_FACTOR,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update(self.headers)
+        
+        # Per-request latency statistics
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._request_count = 0
+        self._attempt_count = 0
+        self._error_count = 0
+        # Attempts made by each thread, so a caller can count its own requests
+        self._local = threading.local()
+        
+    def _get(self, url: str, params: Dict[str, Any], stream: bool = False) -> requests.Response:
         """
-        Get Land Surface Temperature data for a location using NASA POWER API.
+        Make a GET request on the pooled session and record its latency.
+        
+        The rate limit applies to the request; retries of a failed attempt are
+        spaced by the session's backoff instead, but are counted as attempts.
+        
+        Args:
+            url: Request URL
+            params: Query parameters
+            stream: Defer downloading the body (latency then covers the headers only)
+            
+        Returns:
+            Successful response
+        """
+        # A request may retry up to max_retries times; reserve them all up front
+        budget = getattr(self._local, 'budget', None)
+        if budget is not None and not budget.reserve(self.max_retries + 1):
+            raise RuntimeError("Request budget used up")
+        
+        self.rate_limiter.acquire()
+        
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout, stream=stream)
+            response.raise_for_status()
+            return response
+        except Exception:
+            with self._stats_lock:
+                self._error_count += 1
+            raise
+        finally:
+            attempts = self._attempts(response)
+            self._local.attempts = self.thread_attempts() + attempts
+            if budget is not None:
+                budget.release(self.max_retries + 1 - attempts)
+            with self._stats_lock:
+                self._request_count += 1
+                self._attempt_count += attempts
+                self._latencies.append(time.perf_counter() - started)
+                
+    def _attempts(self, response: Optional[requests.Response]) -> int:
+        """
+        Get the number of HTTP attempts behind a request, including retries.
+        
+        Args:
+            response: Final response, or None if the request failed without one
+            
+        Returns:
+            Number of attempts; a request that got no response is assumed to
+            have used all its retries
+        """
+        if response is None:
+            return self.max_retries + 1
+        retries = getattr(response.raw, 'retries', None)
+        return 1 + (len(retries.history) if retries is not None else 0)
+        
+    def thread_attempts(self) -> int:
+        """
+        Get the running number of POWER request attempts made on the calling thread.
+        
+        Returns:
+            Number of attempts, including retries
+        """
+        return getattr(self._local, 'attempts', 0)
+                
+    def get_request_stats(self) -> Dict[str, Any]:
+        """
+        Get latency statistics for POWER requests made by this client.
+        
+        Returns:
+            Dictionary with request, attempt (including retries) and error
+            counts and latency percentiles in ms
+        """
+        with self._stats_lock:
+            latencies = np.array(self._latencies) * 1000.0
+            stats = {
+                'requests': self._request_count,
+                'attempts': self._attempt_count,
+                'errors': self._error_count
+            }
+        
+        if latencies.size == 0:
+            stats.update({'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'max_ms': None})
+        else:
+            stats.update({
+                'mean_ms': float(latencies.mean()),
+                'p50_ms': float(np.percentile(latencies, 50)),
+                'p95_ms': float(np.percentile(latencies, 95)),
+                'max_ms': float(latencies.max())
+            })
+        return stats
+        
+    def get_climate_data(self, lat: float, lon: float, radius: float,
+                         days: int = 6) -> pd.DataFrame:
+        """
+        Get temperature, soil moisture and weather data for a location in a
+        single NASA POWER API request.
         
         Args:
             lat: Latitude
@@ -44,94 +362,457 @@ class NASAEarthdata:
             days: Number of days of historical data
             
         Returns:
-            DataFrame with date and temperature data
+            DataFrame with one row per date and a column per parameter
         """
-        # Calculate date range
-        end_date = datetime.datetime.now()
-        start_date = end_date - datetime.timedelta(days=days)
+        try:
+            df = self._fetch_climate_data(lat, lon, days)
+            if df.empty:
+                print("No climate data could be extracted")
+            return df
+            
+        except Exception as e:
+            print(f"Error fetching NASA climate data: {e}")
+            return pd.DataFrame(columns=['date', 'temperature', 'soil_moisture'])
+    
+    def iter_hourly_data(self, lat: float, lon: float, start_date: datetime.date,
+                         end_date: datetime.date, chunk_days: int = POWER_HOURLY_CHUNK_DAYS,
+                         parameters: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Stream hourly data for a location from the POWER hourly endpoint, one
+        chunk of days at a time, so the whole range never sits in memory.
         
-        # Format dates for API
-        start_str = start_date.strftime("%Y%m%d")
-        end_str = end_date.strftime("%Y%m%d")
+        Args:
+            lat: Latitude
+            lon: Longitude
+            start_date: First day
+            end_date: Last day
+            chunk_days: Number of days fetched per chunk
+            parameters: POWER parameter names (defaults to POWER_HOURLY_PARAMETERS)
+            
+        Yields:
+            DataFrame per chunk with one row per hour and a column per parameter
+        """
+        parameters = parameters or POWER_HOURLY_PARAMETERS
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + datetime.timedelta(days=chunk_days - 1), end_date)
+            parameter_data = self._fetch_point('hourly', lat, lon, chunk_start, chunk_end, parameters)
+            df = self._climate_frame(self._parameter_frame(parameter_data, "%Y%m%d%H"))
+            if not df.empty:
+                yield df
+            chunk_start = chunk_end + datetime.timedelta(days=1)
+    
+    def backfill(self, lat: float, lon: float, start_date: datetime.date,
+                 end_date: datetime.date, parameters: Optional[List[str]] = None) -> int:
+        """
+        Backfill the local store for a location from POWER NetCDF output, one
+        year at a time, without going through JSON.
         
-        # Use NASA POWER API which is open and doesn't require authentication
-        base_url = "https://power.larc.nasa.gov/api/temporal/daily/point"
+        Args:
+            lat: Latitude
+            lon: Longitude
+            start_date: First day
+            end_date: Last day
+            parameters: POWER parameter names (defaults to POWER_DAILY_PARAMETERS)
+            
+        Returns:
+            Number of days written to the store
+        """
+        if self.store is None:
+            raise ValueError("Backfill needs a climate store")
+        
+        parameters = parameters or POWER_DAILY_PARAMETERS
+        written = 0
+        for year in range(start_date.year, end_date.year + 1):
+            first = max(start_date, datetime.date(year, 1, 1))
+            last = min(end_date, datetime.date(year, 12, 31))
+            print(f"Backfilling NASA POWER data for ({lat}, {lon}) from {first} to {last}")
+            
+            with self.open_netcdf(lat, lon, first, last, parameters) as ds:
+                df = self._climate_frame(self._netcdf_frame(ds, parameters))
+            if not df.empty:
+                self.store.write(cell_key(lat, lon), df)
+                written += len(df)
+        return written
+    
+    def open_netcdf(self, lat: float, lon: float, start_date: datetime.date,
+                    end_date: datetime.date, parameters: Optional[List[str]] = None,
+                    temporal: str = 'daily') -> xr.Dataset:
+        """
+        Download POWER point output as NetCDF and open it lazily with xarray.
         
-        # Build parameters
+        The file is streamed to disk and kept under POWER_NETCDF_DIR. Variables
+        are read from it on access (in dask chunks when dask is installed), so
+        multi-year, multi-parameter pulls are never decoded as one JSON document.
+        
+        Args:
+            lat: Latitude
+            lon: Longitude
+            start_date: First day
+            end_date: Last day
+            parameters: POWER parameter names (defaults to POWER_DAILY_PARAMETERS)
+            temporal: Temporal resolution ('daily' or 'hourly')
+            
+        Returns:
+            Lazily loaded dataset with one variable per parameter
+        """
+        parameters = parameters or POWER_DAILY_PARAMETERS
+        lat, lon = grid_cell(lat, lon)
         params = {
-            "start": start_str,
-            "end": end_str,
+            "start": start_date.strftime("%Y%m%d"),
+            "end": end_date.strftime("%Y%m%d"),
             "latitude": lat,
             "longitude": lon,
-            "community": "AG",  # Agricultural community
-            "parameters": "T2M,T2M_MAX,T2M_MIN",  # Temperature parameters
-            "format": "JSON",
+            "community": POWER_COMMUNITY,
+            "parameters": ",".join(parameters),
+            "format": "NETCDF",
             **self.api_params  # Add API key if needed
         }
         
+        digest = hashlib.sha1(",".join(parameters).encode()).hexdigest()[:10]
+        path = os.path.join(
+            POWER_NETCDF_DIR,
+            f"{temporal}_{cell_key(lat, lon)}_{params['start']}_{params['end']}_{digest}.nc"
+        )
+        
+        # Files covering provisional days are refreshed like cached JSON values
+        cutoff = datetime.date.today() - datetime.timedelta(days=POWER_PROVISIONAL_DAYS)
+        fresh = os.path.exists(path) and (
+            end_date < cutoff or time.time() - os.path.getmtime(path) < POWER_CACHE_TTL_HOURS * 3600
+        )
+        if not fresh:
+            self._download(f"{self.base_url}/temporal/{temporal}/point", params, path)
+        
+        chunks = {'time': POWER_NETCDF_CHUNK_DAYS} if importlib.util.find_spec('dask') else None
+        return xr.open_dataset(path, engine='netcdf4', chunks=chunks, cache=False)
+    
+    def _download(self, url: str, params: Dict[str, Any], path: str) -> None:
+        """
+        Stream a response body to a file, replacing it atomically.
+        
+        Args:
+            url: Request URL
+            params: Query parameters
+            path: Destination file
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        partial = f"{path}.part"
+        
         try:
-            # Make API request to NASA POWER
-            print(f"Fetching NASA POWER temperature data at coordinates ({lat}, {lon})")
-            response = requests.get(base_url, params=params, headers=self.headers)
-            response.raise_for_status()
+            with self._get(url, params, stream=True) as response:
+                with open(partial, 'wb') as f:
+                    for block in response.iter_content(chunk_size=1 << 20):
+                        f.write(block)
+            os.replace(partial, path)
+        except Exception:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+    
+    @staticmethod
+    def _netcdf_frame(ds: xr.Dataset, parameters: List[str]) -> pd.DataFrame:
+        """
+        Read point variables from a POWER NetCDF dataset into a date-indexed frame.
+        
+        Args:
+            ds: Dataset returned by open_netcdf
+            parameters: POWER parameter names
             
-            # Process the response
-            data = response.json()
-            
-            if 'properties' not in data or 'parameter' not in data['properties']:
-                print("No temperature data found in the response")
-                return pd.DataFrame(columns=['date', 'temperature'])
-            
-            # Extract temperature data
-            temp_data = data['properties']['parameter']
-            
-            # Create lists for date and temperature
-            dates = []
-            temperatures = []
-            
-            # Process each date in the response
-            for date_str, values in temp_data.get('T2M', {}).items():
-                if date_str != 'units':  # Skip the units entry
-                    try:
-                        # Parse the date
-                        date = datetime.datetime.strptime(date_str, "%Y%m%d")
-                        # Get temperature in Celsius (POWER data is already in Celsius)
-                        temp = float(values)
-                        
-                        # Skip invalid temperature values (-999 is NASA's missing data indicator)
-                        if temp == -999:
-                            continue
-                        
-                        dates.append(date)
-                        temperatures.append(temp)
-                    except (ValueError, TypeError) as e:
-                        print(f"Error processing date {date_str}: {e}")
-            
-            # Create DataFrame
-            if dates and temperatures:
-                df = pd.DataFrame({
-                    'date': dates,
-                    'temperature': temperatures
-                })
-                
-                # Sort by date
-                df = df.sort_values('date')
-                
-                return df
-            else:
-                print("No temperature data could be extracted")
-                return pd.DataFrame(columns=['date', 'temperature'])
+        Returns:
+            DataFrame indexed by date with one column per parameter
+        """
+        columns = {}
+        for parameter in parameters:
+            if parameter not in ds.data_vars:
+                continue
+            # Point output carries singleton lat/lon dimensions
+            values = np.asarray(ds[parameter].squeeze(drop=True).values, dtype=float)
+            values[values == POWER_FILL_VALUE] = np.nan
+            columns[parameter] = values
+        return pd.DataFrame(columns, index=pd.to_datetime(ds['time'].values))
+    
+    def get_area_climate_data(self, lat: float, lon: float, radius: float,
+                              days: int = 6) -> pd.DataFrame:
+        """
+        Get area-weighted climate data for the circle of the given radius around
+        a location, using the POWER regional endpoint.
+        
+        Args:
+            lat: Latitude
+            lon: Longitude
+            radius: Radius in km
+            days: Number of days of historical data
+            
+        Returns:
+            DataFrame with one row per date and a column per parameter
+        """
+        try:
+            cube = self.get_regional_data(lat, lon, radius, days)
+            df = self.regional_statistics(cube, lat, lon, radius)
+            if df.empty:
+                print("No regional climate data could be extracted")
+            return df
             
         except Exception as e:
-            print(f"Error fetching NASA temperature data: {e}")
-            # Return empty DataFrame with correct columns
+            print(f"Error fetching NASA regional climate data: {e}")
+            return pd.DataFrame(columns=['date', 'temperature', 'soil_moisture'])
+    
+    def get_regional_data(self, lat: float, lon: float, radius: float, days: int = 6,
+                          parameters: Optional[List[str]] = None) -> xr.Dataset:
+        """
+        Fetch the grid cells around a location from the POWER regional endpoint.
+        
+        Args:
+            lat: Latitude
+            lon: Longitude
+            radius: Radius in km
+            days: Number of days of historical data
+            parameters: POWER parameter names (defaults to POWER_REGIONAL_PARAMETERS)
+            
+        Returns:
+            Dataset with one (time, lat, lon) variable per parameter
+        """
+        parameters = parameters or POWER_REGIONAL_PARAMETERS
+        end_date = datetime.date.today()
+        start_date = end_date - datetime.timedelta(days=days)
+        
+        # Bounding box of the circle, widened to the smallest region POWER accepts
+        half_lat = max(radius / 111.32, POWER_REGIONAL_MIN_SPAN / 2)
+        half_lon = max(radius / (111.32 * max(np.cos(np.radians(lat)), 0.01)), POWER_REGIONAL_MIN_SPAN / 2)
+        
+        print(f"Fetching NASA POWER regional data around coordinates ({lat}, {lon})")
+        points = {}
+        for i in range(0, len(parameters), POWER_REGIONAL_PARAMETERS_PER_REQUEST):
+            params = {
+                "start": start_date.strftime("%Y%m%d"),
+                "end": end_date.strftime("%Y%m%d"),
+                "latitude-min": round(max(lat - half_lat, -90.0), 4),
+                "latitude-max": round(min(lat + half_lat, 90.0), 4),
+                "longitude-min": round(max(lon - half_lon, -180.0), 4),
+                "longitude-max": round(min(lon + half_lon, 180.0), 4),
+                "community": POWER_COMMUNITY,
+                "parameters": ",".join(parameters[i:i + POWER_REGIONAL_PARAMETERS_PER_REQUEST]),
+                "format": "JSON",
+                **self.api_params  # Add API key if needed
+            }
+            response = self._get(f"{self.base_url}/temporal/daily/regional", params)
+            
+            # The response is a GeoJSON FeatureCollection with one feature per grid cell
+            for feature in response.json().get('features', []):
+                point_lon, point_lat = feature['geometry']['coordinates'][:2]
+                points.setdefault((round(point_lat, 4), round(point_lon, 4)), {}).update(
+                    feature['properties']['parameter']
+                )
+        
+        return self._regional_cube(points)
+    
+    def _regional_cube(self, points: Dict[Tuple[float, float], Dict[str, Dict[str, float]]]) -> xr.Dataset:
+        """
+        Assemble per-cell POWER parameter dictionaries into a lat/lon/time cube.
+        
+        Args:
+            points: Dictionary mapping (lat, lon) to {parameter: {YYYYMMDD: value}}
+            
+        Returns:
+            Dataset with one (time, lat, lon) variable per parameter
+        """
+        if not points:
+            return xr.Dataset()
+        
+        frames = {point: self._parameter_frame(values) for point, values in points.items()}
+        lats = sorted({point[0] for point in points})
+        lons = sorted({point[1] for point in points})
+        times = pd.DatetimeIndex(sorted(set().union(*(frame.index for frame in frames.values()))))
+        parameters = list(dict.fromkeys(p for frame in frames.values() for p in frame.columns))
+        
+        cube = {parameter: np.full((len(times), len(lats), len(lons)), np.nan) for parameter in parameters}
+        lat_index = {value: i for i, value in enumerate(lats)}
+        lon_index = {value: j for j, value in enumerate(lons)}
+        for (point_lat, point_lon), frame in frames.items():
+            frame = frame.reindex(times)
+            for parameter in frame.columns:
+                cube[parameter][:, lat_index[point_lat], lon_index[point_lon]] = frame[parameter].values
+        
+        return xr.Dataset(
+            {parameter: (('time', 'lat', 'lon'), values) for parameter, values in cube.items()},
+            coords={'time': times, 'lat': lats, 'lon': lons}
+        )
+    
+    def regional_statistics(self, cube: xr.Dataset, lat: float, lon: float,
+                            radius: float, samples: int = 10) -> pd.DataFrame:
+        """
+        Compute area-weighted daily means over the cells inside a circle.
+        
+        Each cell is weighted by its area (proportional to the cosine of its
+        latitude) times the fraction of the cell that lies inside the circle.
+        
+        Args:
+            cube: Dataset returned by get_regional_data
+            lat: Latitude of the circle centre
+            lon: Longitude of the circle centre
+            radius: Radius in km
+            samples: Sub-samples per cell side used to estimate the covered fraction
+            
+        Returns:
+            DataFrame with date, temperature, soil moisture and weather columns
+        """
+        if not cube.data_vars:
+            return pd.DataFrame(columns=['date', 'temperature', 'soil_moisture'])
+        
+        # Sample each cell on a regular sub-grid and count the points inside the circle
+        lat_step, lon_step = POWER_GRID_RESOLUTION
+        offsets = (np.arange(samples) + 0.5) / samples - 0.5
+        cell_lats = cube['lat'].values[:, None, None, None] + offsets[None, None, :, None] * lat_step
+        cell_lons = cube['lon'].values[None, :, None, None] + offsets[None, None, None, :] * lon_step
+        inside = haversine_km(lat, lon, cell_lats, cell_lons) <= radius
+        fraction = inside.mean(axis=(2, 3))
+        
+        # A circle smaller than the sampling resolution falls back to the nearest cell
+        if not fraction.any():
+            centre_lats, centre_lons = np.meshgrid(cube['lat'].values, cube['lon'].values, indexing='ij')
+            distance = haversine_km(lat, lon, centre_lats, centre_lons)
+            fraction = (distance == distance.min()).astype(float)
+        
+        weights = xr.DataArray(
+            fraction * np.cos(np.radians(cube['lat'].values))[:, None],
+            dims=('lat', 'lon'),
+            coords={'lat': cube['lat'], 'lon': cube['lon']}
+        )
+        means = cube.weighted(weights).mean(dim=('lat', 'lon'))
+        return self._climate_frame(means.to_dataframe())
+    
+    def fetch_many(self, sites: List[Tuple[float, float, int]],
+                   max_workers: int = POWER_MAX_WORKERS,
+                   budget: Optional[RequestBudget] = None) -> Dict[str, Dict[Tuple[float, float, int], Any]]:
+        """
+        Fetch climate data for many sites concurrently.
+        
+        Requests from all workers share the client's global rate limit.
+        
+        Args:
+            sites: List of (lat, lon, days) tuples
+            max_workers: Maximum number of concurrent fetches
+            budget: Cap on the request attempts of this call; a request that
+                    could exceed it is not made and its site fails
+            
+        Returns:
+            Dictionary with 'results' mapping each site to its DataFrame,
+            'errors' mapping each failed site to its error message and
+            'requests', the POWER request attempts (including retries) made by
+            this call alone
+        """
+        results = {}
+        errors = {}
+        # Per-fetch attempt counts; other callers' requests are not included
+        attempts = []
+        
+        def fetch(lat: float, lon: float, days: int) -> pd.DataFrame:
+            first = self.thread_attempts()
+            self._local.budget = budget
+            try:
+                return self._fetch_climate_data(lat, lon, days)
+            finally:
+                self._local.budget = None
+                attempts.append(self.thread_attempts() - first)
+        
+        # Sites in the same POWER grid cell share one fetch
+        groups = {}
+        for site in dict.fromkeys(sites):
+            lat, lon, days = site
+            groups.setdefault((grid_cell(lat, lon), days), []).append(site)
+        if not groups:
+            return {'results': results, 'errors': errors, 'requests': 0}
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(groups)))) as executor:
+            futures = {
+                key: executor.submit(fetch, key[0][0], key[0][1], key[1])
+                for key in groups
+            }
+            for key, future in futures.items():
+                try:
+                    df = future.result()
+                    error = 'No climate data could be extracted' if df.empty else None
+                except Exception as e:
+                    df, error = None, str(e)
+                    
+                for site in groups[key]:
+                    if error is None:
+                        results[site] = df.copy()
+                    else:
+                        errors[site] = error
+                    
+        return {'results': results, 'errors': errors, 'requests': sum(attempts)}
+    
+    def _fetch_climate_data(self, lat: float, lon: float, days: int) -> pd.DataFrame:
+        """
+        Fetch and parse all daily POWER parameters for a point.
+        
+        Args:
+            lat: Latitude
+            lon: Longitude
+            days: Number of days of historical data
+            
+        Returns:
+            DataFrame with one row per date and a column per parameter
+        """
+        print(f"Fetching NASA POWER climate data at coordinates ({lat}, {lon})")
+        parameter_data = self._fetch_daily_point(lat, lon, days, POWER_DAILY_PARAMETERS)
+        df = self._parse_daily_parameters(parameter_data)
+        
+        if self.store is not None and not df.empty:
+            self.store.write(cell_key(lat, lon), df)
+        return df
+    
+    def load_history(self, lat: float, lon: float, days: int) -> pd.DataFrame:
+        """
+        Load previously fetched climate data for a location from the local store,
+        without contacting NASA.
+        
+        Args:
+            lat: Latitude
+            lon: Longitude
+            days: Number of days of history
+            
+        Returns:
+            DataFrame with one row per stored date and a column per parameter
+        """
+        if self.store is None:
+            return pd.DataFrame(columns=['date', 'temperature', 'soil_moisture'])
+        
+        end_date = datetime.date.today()
+        start_date = end_date - datetime.timedelta(days=days)
+        return self.store.load(cell_key(lat, lon), start_date, end_date)
+    
+    def get_lst_data(self, lat: float, lon: float, radius: float, 
+                     days: int = 6) -> pd.DataFrame:
+        """
+        Get Land Surface Temperature data for a location using NASA POWER API.
+        
+        Prefer get_climate_data, which returns temperature and soil moisture
+        from the same request.
+        
+        Args:
+            lat: Latitude
+            lon: Longitude
+            radius: Radius in km
+            days: Number of days of historical data
+            
+        Returns:
+            DataFrame with date and temperature data
+        """
+        df = self.get_climate_data(lat, lon, radius, days)
+        if df.empty or 'temperature' not in df.columns:
             return pd.DataFrame(columns=['date', 'temperature'])
+        return df[['date', 'temperature']]
     
     def get_soil_moisture(self, lat: float, lon: float, radius: float, 
                          days: int = 6) -> pd.DataFrame:
         """
         Get soil moisture data for a location using NASA POWER API.
         
+        Prefer get_climate_data, which returns temperature and soil moisture
+        from the same request.
+        
         Args:
             lat: Latitude
             lon: Longitude
@@ -141,97 +822,239 @@ class NASAEarthdata:
         Returns:
             DataFrame with date and soil moisture data
         """
+        df = self.get_climate_data(lat, lon, radius, days)
+        if df.empty or 'soil_moisture' not in df.columns:
+            return pd.DataFrame(columns=['date', 'soil_moisture'])
+        return df[['date', 'soil_moisture']]
+    
+    def _fetch_daily_point(self, lat: float, lon: float, days: int,
+                           parameters: List[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Get daily values of several parameters for a point, serving cached days
+        and requesting only the missing date spans from the POWER point endpoint.
+        
+        Args:
+            lat: Latitude
+            lon: Longitude
+            days: Number of days of historical data
+            parameters: POWER parameter names
+            
+        Returns:
+            Dictionary mapping parameter name to {YYYYMMDD: value}
+        """
         # Calculate date range
-        end_date = datetime.datetime.now()
+        end_date = datetime.date.today()
         start_date = end_date - datetime.timedelta(days=days)
+        return self._fetch_point('daily', lat, lon, start_date, end_date, parameters)
+    
+    def _fetch_point(self, temporal: str, lat: float, lon: float, start_date: datetime.date,
+                     end_date: datetime.date, parameters: List[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Get values of several parameters for a point at the given temporal
+        resolution ('daily' or 'hourly').
         
-        # Format dates for API
-        start_str = start_date.strftime("%Y%m%d")
-        end_str = end_date.strftime("%Y%m%d")
+        Args:
+            temporal: Temporal resolution
+            lat: Latitude
+            lon: Longitude
+            start_date: First day
+            end_date: Last day
+            parameters: POWER parameter names
+            
+        Returns:
+            Dictionary mapping parameter name to {time stamp: value}
+        """
+        # POWER values are uniform within a grid cell, so nearby sites share the
+        # cell centre as their request key and concurrent requests collapse into one
+        lat, lon = grid_cell(lat, lon)
+        key = (temporal, lat, lon, start_date, end_date, tuple(parameters))
+        return self.single_flight.do(key, self._fetch_cell, temporal, lat, lon,
+                                     start_date, end_date, parameters)
+    
+    def _fetch_cell(self, temporal: str, lat: float, lon: float, start_date: datetime.date,
+                    end_date: datetime.date, parameters: List[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Get values for a grid cell from the cache, requesting missing spans.
         
-        # Use NASA POWER API which is open and doesn't require authentication
-        base_url = "https://power.larc.nasa.gov/api/temporal/daily/point"
+        Args:
+            temporal: Temporal resolution ('daily' or 'hourly')
+            lat: Latitude of the cell centre
+            lon: Longitude of the cell centre
+            start_date: First day
+            end_date: Last day
+            parameters: POWER parameter names
+            
+        Returns:
+            Dictionary mapping parameter name to {time stamp: value}
+        """
+        if self.cache is None:
+            return self._request_point(temporal, lat, lon, start_date, end_date, parameters)
+        
+        cell = cell_key(lat, lon)
+        days = [(start_date + datetime.timedelta(days=i)).strftime("%Y%m%d")
+                for i in range((end_date - start_date).days + 1)]
+        if temporal == 'hourly':
+            stamps = [f"{day}{hour:02d}" for day in days for hour in range(24)]
+        else:
+            stamps = days
+        
+        cached, missing = self.cache.get(cell, parameters, stamps, temporal)
+        if not missing:
+            return cached
+        
+        try:
+            missing_days = sorted({stamp[:8] for stamp in missing})
+            for span_start, span_end in self._date_spans(missing_days):
+                fetched = self._request_point(temporal, lat, lon, span_start, span_end, parameters)
+                self.cache.put(cell, fetched, temporal)
+                for parameter, values in fetched.items():
+                    cached.setdefault(parameter, {}).update(values)
+        except Exception as e:
+            # Fall back to whatever we have cached, even if it has expired
+            stale, _ = self.cache.get(cell, parameters, stamps, temporal, allow_stale=True)
+            if not any(stale.values()):
+                raise
+            print(f"Error fetching NASA POWER data, serving cached values: {e}")
+            return stale
+        
+        return cached
+    
+    @staticmethod
+    def _date_spans(stamps: List[str]) -> List[Tuple[datetime.date, datetime.date]]:
+        """
+        Group sorted YYYYMMDD stamps into runs of consecutive days.
+        
+        Args:
+            stamps: Sorted date stamps
+            
+        Returns:
+            List of (first day, last day) tuples
+        """
+        spans = []
+        for stamp in stamps:
+            day = datetime.datetime.strptime(stamp, "%Y%m%d").date()
+            if spans and day - spans[-1][1] == datetime.timedelta(days=1):
+                spans[-1] = (spans[-1][0], day)
+            else:
+                spans.append((day, day))
+        return spans
+    
+    def _request_point(self, temporal: str, lat: float, lon: float, start_date: datetime.date,
+                       end_date: datetime.date, parameters: List[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Request values of several parameters from a POWER point endpoint.
         
-        # Build parameters - use soil moisture parameters
+        Args:
+            temporal: Temporal resolution ('daily' or 'hourly')
+            lat: Latitude
+            lon: Longitude
+            start_date: First day to request
+            end_date: Last day to request
+            parameters: POWER parameter names
+            
+        Returns:
+            Dictionary mapping parameter name to {time stamp: value}
+        """
         params = {
-            "start": start_str,
-            "end": end_str,
+            "start": start_date.strftime("%Y%m%d"),
+            "end": end_date.strftime("%Y%m%d"),
             "latitude": lat,
             "longitude": lon,
-            "community": "AG",  # Agricultural community
-            "parameters": "PRECTOTCORR,RH2M,GWETPROF,GWETROOT,GWETTOP",  # Soil moisture related parameters
+            "community": POWER_COMMUNITY,
+            "parameters": ",".join(parameters),
             "format": "JSON",
             **self.api_params  # Add API key if needed
         }
         
-        try:
-            # Make API request to NASA POWER
-            print(f"Fetching NASA POWER soil moisture data at coordinates ({lat}, {lon})")
-            response = requests.get(base_url, params=params, headers=self.headers)
-            response.raise_for_status()
+        response = self._get(f"{self.base_url}/temporal/{temporal}/point", params)
+        data = response.json()
+        
+        if 'properties' not in data or 'parameter' not in data['properties']:
+            print("No data found in the response")
+            return {}
+        
+        return data['properties']['parameter']
+    
+    def _parse_daily_parameters(self, parameter_data: Dict[str, Dict[str, float]]) -> pd.DataFrame:
+        """
+        Convert the POWER parameter dictionary into a date-aligned DataFrame.
+        
+        Args:
+            parameter_data: Dictionary mapping parameter name to {YYYYMMDD: value}
             
-            # Process the response
-            data = response.json()
+        Returns:
+            DataFrame with date, temperature, soil moisture and weather columns
+        """
+        return self._climate_frame(self._parameter_frame(parameter_data))
+    
+    def _parameter_frame(self, parameter_data: Dict[str, Dict[str, float]],
+                         stamp_format: str = "%Y%m%d") -> pd.DataFrame:
+        """
+        Parse the POWER parameter dictionary into a frame indexed by date with
+        one column per parameter and NaN for missing values.
+        
+        Args:
+            parameter_data: Dictionary mapping parameter name to {time stamp: value}
+            stamp_format: Format of the time stamps (%Y%m%d%H for hourly data)
             
-            if 'properties' not in data or 'parameter' not in data['properties']:
-                print("No soil moisture data found in the response")
-                return pd.DataFrame(columns=['date', 'soil_moisture'])
+        Returns:
+            DataFrame indexed by date
+        """
+        series = {}
+        last_keys, last_dates = None, None
+        for parameter, values in parameter_data.items():
+            keys = list(values.keys())
             
-            # Extract soil moisture data - use GWETROOT (Root zone soil moisture)
-            # GWETROOT is the fraction of soil moisture in the root zone (0-1)
-            moisture_data = data['properties']['parameter'].get('GWETROOT', {})
+            # Parameters in one response share their date keys, so parse them once
+            if keys != last_keys:
+                last_keys = keys
+                last_dates = pd.to_datetime(pd.Index(keys), format=stamp_format, errors='coerce')
+            dates = last_dates
             
-            if not moisture_data or moisture_data == {}:
-                # Try GWETPROF (Soil moisture profile) if GWETROOT is not available
-                moisture_data = data['properties']['parameter'].get('GWETPROF', {})
-                
-            if not moisture_data or moisture_data == {}:
-                # Try GWETTOP (Top soil layer moisture) as last resort
-                moisture_data = data['properties']['parameter'].get('GWETTOP', {})
-            
-            # Create lists for date and soil moisture
-            dates = []
-            moisture_values = []
-            
-            # Process each date in the response
-            for date_str, value in moisture_data.items():
-                if date_str != 'units':  # Skip the units entry
-                    try:
-                        # Parse the date
-                        date = datetime.datetime.strptime(date_str, "%Y%m%d")
-                        
-                        # Skip invalid moisture values (-999 is NASA's missing data indicator)
-                        if float(value) == -999:
-                            continue
-                        
-                        # Convert fraction to percentage (0-100%)
-                        moisture = float(value) * 100.0
-                        
-                        dates.append(date)
-                        moisture_values.append(moisture)
-                    except (ValueError, TypeError) as e:
-                        print(f"Error processing date {date_str}: {e}")
-            
-            # Create DataFrame
-            if dates and moisture_values:
-                df = pd.DataFrame({
-                    'date': dates,
-                    'soil_moisture': moisture_values
-                })
-                
-                # Sort by date
-                df = df.sort_values('date')
-                
-                return df
-            else:
-                print("No soil moisture data could be extracted")
-                return pd.DataFrame(columns=['date', 'soil_moisture'])
+            try:
+                data = np.fromiter(values.values(), dtype=float, count=len(keys))
+            except (ValueError, TypeError):
+                # Non-numeric entries (e.g. 'units') become NaN
+                data = pd.to_numeric(pd.Series(list(values.values()), dtype=object),
+                                     errors='coerce').to_numpy(dtype=float)
             
-        except Exception as e:
-            print(f"Error fetching NASA soil moisture data: {e}")
-            # Return empty DataFrame with correct columns
-            return pd.DataFrame(columns=['date', 'soil_moisture'])
+            # Mask unparseable dates and invalid values (-999 is NASA's missing data indicator)
+            valid = ~dates.isna() & ~np.isnan(data) & (data != POWER_FILL_VALUE)
+            series[parameter] = pd.Series(data[valid], index=dates[valid])
+        
+        return pd.DataFrame(series)
+    
+    def _climate_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Map a date-indexed frame of POWER parameters to the climate columns.
+        
+        Args:
+            frame: DataFrame indexed by date with one column per parameter
+            
+        Returns:
+            DataFrame with date, temperature, soil moisture and weather columns
+        """
+        # Days without a valid temperature are dropped
+        if frame.empty or 'T2M' not in frame.columns:
+            return pd.DataFrame(columns=['date', 'temperature', 'soil_moisture'])
+        frame = frame.dropna(subset=['T2M']).sort_index()
+        
+        df = pd.DataFrame({'date': pd.to_datetime(frame.index)})
+        for parameter, column in POWER_COLUMNS.items():
+            df[column] = frame[parameter].values if parameter in frame.columns else np.nan
         
+        # Root zone soil moisture, falling back to the profile and top layer
+        # values (fraction 0-1, converted to percentage)
+        moisture = pd.Series(np.nan, index=frame.index)
+        for parameter in SOIL_MOISTURE_PARAMETERS:
+            if parameter in frame.columns:
+                moisture = moisture.fillna(frame[parameter])
+        df['soil_moisture'] = moisture.values * 100.0
+        
+        # Fill gaps in the secondary parameters and drop those that are missing entirely
+        df = df.ffill().bfill()
+        return df.dropna(axis=1, how='all')
+    
     def process_temperature_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Process temperature data: convert units, handle missing values, etc.
@@ -0,0 +1,184 @@
+"""
+On-disk cache for NASA POWER responses.
+"""
+
+import sqlite3
+import threading
+import datetime
+import time
+import os
+import sys
+from typing import Dict, List, Tuple, Optional
+
+# Add the project root to the path so we can import the config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (POWER_CACHE_FILE, POWER_CACHE_TTL_HOURS, POWER_PROVISIONAL_DAYS,
+                    POWER_GRID_RESOLUTION)
+
+# NASA's missing data indicator
+POWER_FILL_VALUE = -999
+
+
+def grid_cell(lat: float, lon: float) -> Tuple[float, float]:
+    """
+    Get the centre of the POWER grid cell containing a point.
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+
+    Returns:
+        Tuple of (latitude, longitude) of the cell centre
+    """
+    lat_step, lon_step = POWER_GRID_RESOLUTION
+    return (round(round(lat / lat_step) * lat_step, 4),
+            round(round(lon / lon_step) * lon_step, 4))
+
+
+def cell_key(lat: float, lon: float) -> str:
+    """
+    Get the cache key of the POWER grid cell containing a point.
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+
+    Returns:
+        Cell key such as "13.0_77.5"
+    """
+    cell_lat, cell_lon = grid_cell(lat, lon)
+    return f"{cell_lat}_{cell_lon}"
+
+
+class PowerCache:
+    """
+    SQLite cache of POWER values keyed by grid cell, parameter and date.
+
+    Days older than the provisional window are final and kept forever. The
+    trailing provisional days (and missing values) expire after a TTL so they
+    are refetched once NASA updates them.
+    """
+
+    def __init__(self, cache_file: str = POWER_CACHE_FILE,
+                 ttl_hours: float = POWER_CACHE_TTL_HOURS,
+                 provisional_days: int = POWER_PROVISIONAL_DAYS):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_file: Path to the SQLite cache file
+            ttl_hours: Lifetime of provisional values in hours
+            provisional_days: Number of trailing days NASA may still revise
+        """
+        self.cache_file = cache_file
+        self.ttl_seconds = ttl_hours * 3600
+        self.provisional_days = provisional_days
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS power_values (
+                temporal TEXT NOT NULL,
+                cell TEXT NOT NULL,
+                parameter TEXT NOT NULL,
+                stamp TEXT NOT NULL,
+                value REAL,
+                final INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (temporal, cell, parameter, stamp)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def get(self, cell: str, parameters: List[str], stamps: List[str],
+            temporal: str = 'daily', allow_stale: bool = False) -> Tuple[Dict[str, Dict[str, float]], List[str]]:
+        """
+        Look up cached values.
+
+        Args:
+            cell: Grid cell key
+            parameters: POWER parameter names
+            stamps: Time stamps to look up (YYYYMMDD for daily data)
+            temporal: Temporal resolution of the values
+            allow_stale: Also return expired provisional values
+
+        Returns:
+            Tuple of ({parameter: {stamp: value}}, sorted stamps missing for any parameter)
+        """
+        if not stamps:
+            return {}, []
+
+        query = f"""
+            SELECT parameter, stamp, value FROM power_values
+            WHERE temporal = ? AND cell = ? AND stamp BETWEEN ? AND ?
+              AND parameter IN ({','.join('?' * len(parameters))})
+        """
+        args = [temporal, cell, min(stamps), max(stamps), *parameters]
+        if not allow_stale:
+            query += " AND (final = 1 OR fetched_at >= ?)"
+            args.append(time.time() - self.ttl_seconds)
+
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+
+        values = {parameter: {} for parameter in parameters}
+        for parameter, stamp, value in rows:
+            values[parameter][stamp] = value
+
+        wanted = set(stamps)
+        missing = set()
+        for parameter in parameters:
+            missing.update(wanted.difference(values[parameter]))
+
+        return values, sorted(missing)
+
+    def put(self, cell: str, parameter_data: Dict[str, Dict[str, float]],
+            temporal: str = 'daily') -> None:
+        """
+        Store values from a POWER response.
+
+        Args:
+            cell: Grid cell key
+            parameter_data: Dictionary mapping parameter name to {stamp: value}
+            temporal: Temporal resolution of the values
+        """
+        now = time.time()
+        # Values for days before this cutoff will not be revised any more
+        cutoff = (datetime.date.today() - datetime.timedelta(days=self.provisional_days)).strftime("%Y%m%d")
+
+        rows = []
+        for parameter, values in parameter_data.items():
+            for stamp, value in values.items():
+                if stamp == 'units':
+                    continue
+                try:
+                    value = float(value)
+                except (ValueError, TypeError):
+                    continue
+                final = int(stamp[:8] < cutoff and value != POWER_FILL_VALUE)
+                rows.append((temporal, cell, parameter, stamp, value, final, now))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO power_values VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def clear(self, cell: Optional[str] = None) -> None:
+        """
+        Remove cached values.
+
+        Args:
+            cell: Grid cell to clear (None for the whole cache)
+        """
+        with self._lock:
+            if cell is None:
+                self._conn.execute("DELETE FROM power_values")
+            else:
+                self._conn.execute("DELETE FROM power_values WHERE cell = ?", (cell,))
+            self._conn.commit()
@@ -0,0 +1,320 @@
+"""
+Offline stand-in for the NASA POWER API.
+
+Serves synthetic (or recorded) daily, hourly and regional payloads, as JSON
+or (for point requests) NetCDF, with configurable latency, error rate and
+payload size so the fetch, cache and retry paths can be benchmarked and
+regression-tested without network access.
+
+Usage:
+    python -m utils.power_stub_server --port 8765 --latency 0.2 --error-rate 0.1
+    python -m utils.power_stub_server --fixtures tests/fixtures/power
+
+Then point the client at it, keeping its synthetic data out of the real
+cache and climate store:
+    NASAEarthdata(base_url="http://127.0.0.1:8765/api", use_cache=False, use_store=False)
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+# NASA's missing data indicator
+POWER_FILL_VALUE = -999
+
+# Endpoints served by the stub, relative to the API root
+ENDPOINTS = {
+    '/api/temporal/daily/point': 'daily_point',
+    '/api/temporal/hourly/point': 'hourly_point',
+    '/api/temporal/daily/regional': 'daily_regional'
+}
+
+
+def synthetic_values(parameter: str, lat: float, lon: float,
+                     times: List[datetime.datetime], hourly: bool = False) -> np.ndarray:
+    """
+    Generate deterministic, plausible values for a parameter at a point.
+
+    Args:
+        parameter: POWER parameter name
+        lat: Latitude
+        lon: Longitude
+        times: Time stamps to generate values for
+        hourly: Add a diurnal cycle to the values
+
+    Returns:
+        Array of values rounded like POWER output
+    """
+    seed = zlib.crc32(f"{parameter}:{lat:.3f}:{lon:.3f}".encode())
+    rng = np.random.default_rng(seed)
+    day_of_year = np.array([t.timetuple().tm_yday for t in times], dtype=float)
+    hour = np.array([t.hour for t in times], dtype=float)
+    season = np.sin(2 * np.pi * (day_of_year - 105) / 365.25) * np.sign(lat or 1)
+    noise = rng.normal(0, 1, len(times))
+
+    if parameter.startswith('T2M'):
+        base = 28 - 0.35 * abs(lat) + 8 * season + 1.5 * noise
+        if hourly:
+            base += 5 * np.sin(2 * np.pi * (hour - 9) / 24)
+        offset = {'T2M_MAX': 5.0, 'T2M_MIN': -5.0}.get(parameter, 0.0)
+        values = base + offset
+    elif parameter.startswith('GWET'):
+        values = np.clip(0.45 + 0.15 * season + 0.05 * noise, 0.0, 1.0)
+    elif parameter == 'RH2M':
+        values = np.clip(65 + 15 * season + 5 * noise, 0, 100)
+    elif parameter == 'PRECTOTCORR':
+        values = np.maximum(0.0, 3 * season + 2 * noise)
+    else:
+        values = 10 + noise
+
+    return np.round(values, 2)
+
+
+class PowerStubServer:
+    """Threaded HTTP server imitating the NASA POWER temporal endpoints."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, pad_kb: int = 0,
+                 fixtures_dir: Optional[str] = None, seed: int = 0):
+        """
+        Initialize the server.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Delay added to every response in seconds
+            jitter: Maximum random extra delay in seconds
+            error_rate: Fraction of requests answered with 429 or 503
+            pad_kb: Extra padding added to every JSON payload in KB
+            fixtures_dir: Directory of recorded payloads named <endpoint>.json
+                          (daily_point.json, hourly_point.json, daily_regional.json)
+            seed: Seed for latency jitter and error injection
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.pad_kb = pad_kb
+        self.fixtures_dir = fixtures_dir
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+        self.stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0}
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """API root URL to pass to NASAEarthdata."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self) -> 'PowerStubServer':
+        """Start serving on a background thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'PowerStubServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _handle(self, request: BaseHTTPRequestHandler) -> None:
+        """Answer one request."""
+        url = urlparse(request.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        endpoint = ENDPOINTS.get(url.path.rstrip('/'))
+
+        with self._random_lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+            status = self._random.choice((429, 503))
+        with self.stats_lock:
+            self.stats['requests'] += 1
+            self.stats['errors'] += int(fail)
+        if delay > 0:
+            time.sleep(delay)
+
+        if endpoint is None:
+            self._send_json(request, 404, {'messages': [f"Unknown endpoint {url.path}"]})
+            return
+        if fail:
+            headers = {'Retry-After': '0'} if status == 429 else {}
+            self._send_json(request, status, {'messages': ['Injected error']}, headers)
+            return
+
+        try:
+            payload = self._fixture(endpoint) or self._synthetic(endpoint, query)
+        except (KeyError, ValueError) as e:
+            self._send_json(request, 422, {'messages': [f"Invalid request: {e}"]})
+            return
+
+        if query.get('format', 'JSON').upper() == 'NETCDF' and endpoint != 'daily_regional':
+            self._send_bytes(request, 200, self._netcdf_bytes(payload, endpoint == 'hourly_point'),
+                             'application/x-netcdf')
+            return
+
+        if self.pad_kb:
+            payload['padding'] = 'x' * (self.pad_kb * 1024)
+        self._send_json(request, 200, payload)
+
+    def _send_json(self, request: BaseHTTPRequestHandler, status: int,
+                   payload: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        """Write a JSON response."""
+        self._send_bytes(request, status, json.dumps(payload).encode(), 'application/json', headers)
+
+    def _send_bytes(self, request: BaseHTTPRequestHandler, status: int, body: bytes,
+                    content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        """Write a response body."""
+        request.send_response(status)
+        request.send_header('Content-Type', content_type)
+        request.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(body)
+
+    @staticmethod
+    def _netcdf_bytes(payload: Dict, hourly: bool) -> bytes:
+        """Encode a point payload as a NetCDF file like POWER's NETCDF output."""
+        import pandas as pd
+        import xarray as xr
+
+        lon, lat = payload['geometry']['coordinates'][:2]
+        parameters = payload['properties']['parameter']
+        stamps = list(next(iter(parameters.values())).keys())
+        times = pd.to_datetime(stamps, format="%Y%m%d%H" if hourly else "%Y%m%d")
+        ds = xr.Dataset(
+            {parameter: (('time', 'lat', 'lon'),
+                         np.array(list(values.values()), dtype=float).reshape(-1, 1, 1))
+             for parameter, values in parameters.items()},
+            coords={'time': times, 'lat': [lat], 'lon': [lon]}
+        )
+
+        fd, path = tempfile.mkstemp(suffix='.nc')
+        os.close(fd)
+        try:
+            ds.to_netcdf(path, engine='netcdf4',
+                         encoding={parameter: {'_FillValue': float(POWER_FILL_VALUE)} for parameter in parameters})
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    def _fixture(self, endpoint: str) -> Optional[Dict]:
+        """Load a recorded payload for an endpoint, if one exists."""
+        if not self.fixtures_dir:
+            return None
+        path = os.path.join(self.fixtures_dir, f"{endpoint}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _synthetic(self, endpoint: str, query: Dict[str, str]) -> Dict:
+        """Build a synthetic payload shaped like the POWER response."""
+        hourly = endpoint == 'hourly_point'
+        parameters = query['parameters'].split(',')
+        start = datetime.datetime.strptime(query['start'], "%Y%m%d")
+        end = datetime.datetime.strptime(query['end'], "%Y%m%d")
+        step = datetime.timedelta(hours=1) if hourly else datetime.timedelta(days=1)
+        last = end + datetime.timedelta(hours=23) if hourly else end
+        times = []
+        t = start
+        while t <= last:
+            times.append(t)
+            t += step
+        stamp_format = "%Y%m%d%H" if hourly else "%Y%m%d"
+        stamps = [t.strftime(stamp_format) for t in times]
+
+        # Like POWER, values that are not available yet are fill values
+        available = np.array([t.date() < datetime.date.today() for t in times])
+
+        def parameter_block(lat: float, lon: float) -> Dict[str, Dict[str, float]]:
+            block = {}
+            for parameter in parameters:
+                values = synthetic_values(parameter, lat, lon, times, hourly)
+                values = np.where(available, values, POWER_FILL_VALUE)
+                block[parameter] = dict(zip(stamps, values.tolist()))
+            return block
+
+        header = {'title': 'NASA/POWER stand-in', 'fill_value': POWER_FILL_VALUE,
+                  'start': query['start'], 'end': query['end']}
+
+        if endpoint == 'daily_regional':
+            lat_min, lat_max = float(query['latitude-min']), float(query['latitude-max'])
+            lon_min, lon_max = float(query['longitude-min']), float(query['longitude-max'])
+            features = []
+            for lat in np.arange(np.ceil(lat_min / 0.5) * 0.5, lat_max + 1e-9, 0.5):
+                for lon in np.arange(np.ceil(lon_min / 0.625) * 0.625, lon_max + 1e-9, 0.625):
+                    features.append({
+                        'type': 'Feature',
+                        'geometry': {'type': 'Point', 'coordinates': [round(lon, 4), round(lat, 4), 0.0]},
+                        'properties': {'parameter': parameter_block(lat, lon)}
+                    })
+            return {'type': 'FeatureCollection', 'header': header, 'features': features}
+
+        lat, lon = float(query['latitude']), float(query['longitude'])
+        return {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat, 0.0]},
+            'properties': {'parameter': parameter_block(lat, lon)},
+            'header': header
+        }
+
+
+def main():
+    """Run the stand-in server in the foreground."""
+    parser = argparse.ArgumentParser(description="Offline stand-in for the NASA POWER API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Delay per response in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Maximum random extra delay in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of 429/503 responses")
+    parser.add_argument('--pad-kb', type=int, default=0, help="Extra payload padding in KB")
+    parser.add_argument('--fixtures', default=None, help="Directory of recorded payloads")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = PowerStubServer(args.host, args.port, args.latency, args.jitter,
+                             args.error_rate, args.pad_kb, args.fixtures, args.seed)
+    print(f"Serving POWER stand-in at {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()